@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+磁盘 I/O 对事件循环延迟影响的基准测试
+
+在写入大结果到文件缓存的同时，持续发起小结果调用，统计小调用的延迟分布（p50/p99/最大值）。
+分别以“在事件循环中直接写入”（旧行为）和“I/O 线程池写入”两种方式运行，便于对比。
+
+用法:
+    python benchmark_io.py [--size-mb 10] [--writes 10] [--backend files]
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+
+from mcp_bridge import MCPManager  # noqa: E402
+
+
+SMALL_CONFIG = {"max_output_bytes": 1000}
+LARGE_CONFIG = {"max_output_bytes": 1000, "max_memory_cache_size": 0}
+
+
+def make_large_result(size_mb: int, seed: int) -> str:
+    """生成约 size_mb MB 且每次内容不同的文本结果（避免内容去重跳过写入）"""
+    line = f"{seed:08d} " + "lorem ipsum dolor sit amet consectetur adipiscing elit " * 2 + "\n"
+    return line * (size_mb * 1024 * 1024 // len(line))
+
+
+def percentile(samples, ratio: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def run_case(manager: MCPManager, offload: bool, size_mb: int, writes: int,
+                   interval: float = 0.002, write_interval: float = 0.05) -> dict:
+    """运行一轮：后台依次写入大结果，前台按固定间隔发起小调用并记录延迟"""
+    async def cache(content, config):
+        if offload:
+            return await manager.run_io(manager.cache_result, content, config)
+        return manager.cache_result(content, config)
+
+    payloads = [make_large_result(size_mb, i + (1000 if offload else 0)) for i in range(writes)]
+    done = asyncio.Event()
+    latencies = []
+
+    async def writer():
+        for content in payloads:
+            await cache(content, LARGE_CONFIG)
+            await asyncio.sleep(write_interval)
+        done.set()
+
+    async def small_calls():
+        loop = asyncio.get_running_loop()
+        scheduled = loop.time()
+        while not done.is_set():
+            scheduled += interval
+            await asyncio.sleep(max(0, scheduled - loop.time()))
+            await cache({"ok": True}, SMALL_CONFIG)
+            # 延迟 = 完成时间 - 计划发起时间，包含事件循环被阻塞的时间
+            latencies.append((loop.time() - scheduled) * 1000)
+            scheduled = max(scheduled, loop.time())
+
+    start = time.perf_counter()
+    await asyncio.gather(writer(), small_calls())
+    return {
+        "elapsed_s": time.perf_counter() - start,
+        "calls": len(latencies),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="文件缓存写入期间小调用的延迟基准测试")
+    parser.add_argument("--size-mb", type=int, default=10, help="每个大结果的大小（MB，默认 10）")
+    parser.add_argument("--writes", type=int, default=10, help="大结果写入次数（默认 10）")
+    parser.add_argument("--backend", choices=["files", "sqlite"], default="files", help="文件缓存存储后端")
+    args = parser.parse_args()
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="mcp-bridge-bench-"))
+    manager = MCPManager()
+    manager.cache_dir = cache_dir
+    # 只测量 I/O 线程池的效果：序列化不交给计算进程池
+    manager.apply_settings({"settings": {"cache_backend": args.backend, "search_index_eager_bytes": 0,
+                                         "cpu_workers": 0}})
+
+    print(f"=== 文件缓存写入期间的小调用延迟（{args.writes} × {args.size_mb}MB，后端 {args.backend}）===\n")
+    try:
+        for offload, label in [(False, "事件循环内写入"), (True, "I/O 线程池写入")]:
+            result = await run_case(manager, offload, args.size_mb, args.writes)
+            print(f"{label}: 小调用 {result['calls']} 次，"
+                  f"p50 {result['p50_ms']:.2f}ms，p99 {result['p99_ms']:.2f}ms，最大 {result['max_ms']:.2f}ms，"
+                  f"总耗时 {result['elapsed_s']:.2f}s")
+    finally:
+        manager.close_storage()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
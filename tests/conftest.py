@@ -0,0 +1,68 @@
+"""
+测试公共设施：导入 utils/mcp_bridge.py，提供使用临时缓存目录的管理器与测试用 MCP 服务配置
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "utils"))
+
+import mcp_bridge  # noqa: E402
+
+FAKE_SERVER = str(Path(__file__).resolve().parent / "fake_server.py")
+
+# 结果一律写入文件缓存层（不进入内存缓存）
+FILE_TIER_CONFIG = {"max_output_bytes": 10, "max_memory_cache_size": 0, "result_cache_ttl": 300}
+
+
+def run(coro):
+    """在新的事件循环中运行协程（测试不依赖 pytest-asyncio）"""
+    return asyncio.run(coro)
+
+
+def make_manager(cache_dir: Path, **settings) -> "mcp_bridge.MCPManager":
+    """创建使用指定缓存目录与全局设置的管理器"""
+    manager = mcp_bridge.MCPManager()
+    manager.cache_dir = cache_dir
+    manager.apply_settings({"settings": settings})
+    return manager
+
+
+def server_config(**overrides) -> dict:
+    """测试用 stdio 服务配置（tests/fake_server.py）"""
+    config = {"command": sys.executable, "args": [FAKE_SERVER], "timeout": 30}
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path) -> Path:
+    path = tmp_path / "cache"
+    path.mkdir()
+    return path
+
+
+def fake_server_pids() -> List[int]:
+    """当前进程启动的、仍在运行的 fake_server.py 子进程（读取 /proc，不含僵尸进程）"""
+    pids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            cmdline = (entry / "cmdline").read_bytes()
+        except OSError:
+            continue
+        fields = stat.rsplit(")", 1)[1].split()
+        if int(fields[1]) == os.getpid() and fields[0] != "Z" and b"fake_server.py" in cmdline:
+            pids.append(int(entry.name))
+    return pids
+
+
+linux_only = pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="需要 /proc")
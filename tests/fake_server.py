@@ -0,0 +1,65 @@
+"""
+测试用 MCP 服务（stdio）
+
+环境变量 FAKE_START_DELAY 为启动前等待的秒数；设置 FAKE_FAST_ONCE 为文件路径时，
+第一个创建该文件的进程不等待（用于构造会话池中部分成员已启动的情形）
+"""
+
+import asyncio
+import os
+import time
+
+from mcp.server.fastmcp import Context, FastMCP
+
+mcp = FastMCP("fake")
+
+
+@mcp.tool()
+def echo(text: str) -> str:
+    """原样返回"""
+    return text
+
+
+@mcp.tool()
+def big(n: int = 1000) -> str:
+    """返回 n 行文本"""
+    return "\n".join(f"line {i} hello" for i in range(n))
+
+
+@mcp.tool()
+async def slow(ctx: Context, seconds: float = 1.0, marker: str = "", log: str = "") -> str:
+    """
+    等待指定秒数后返回；指定 marker 时在完成后创建该文件（调用被取消则不会创建）
+    
+    指定 log 时向该文件追加本次请求的 ID：开始时写入 "start <ID>"，被取消时写入 "cancelled <ID>"
+    """
+    if log:
+        with open(log, "a") as f:
+            f.write(f"start {ctx.request_id}\n")
+    try:
+        await asyncio.sleep(seconds)
+    except asyncio.CancelledError:
+        if log:
+            with open(log, "a") as f:
+                f.write(f"cancelled {ctx.request_id}\n")
+        raise
+    if marker:
+        open(marker, "w").close()
+    return f"slept {seconds}"
+
+
+@mcp.tool()
+def pid() -> str:
+    """返回进程号"""
+    return str(os.getpid())
+
+
+if __name__ == "__main__":
+    fast_once = os.environ.get("FAKE_FAST_ONCE")
+    try:
+        if not fast_once:
+            raise FileExistsError
+        os.close(os.open(fast_once, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        time.sleep(float(os.environ.get("FAKE_START_DELAY", "0")))
+    mcp.run()
@@ -0,0 +1,37 @@
+"""大结果的序列化交给计算进程池：是否交出按粗略估计的大小决定"""
+
+from conftest import make_manager, mcp_bridge
+
+
+def test_estimate_counts_text_of_content_blocks():
+    text = "x" * 5000
+    result = {"content": [{"type": "text", "text": text}], "isError": False}
+    estimate = mcp_bridge.estimate_content_size(result)
+    assert 5000 <= estimate < 5200
+    assert mcp_bridge.estimate_content_size(text) == 5000
+
+
+def test_small_results_are_not_pickled(cache_dir, monkeypatch):
+    manager = make_manager(cache_dir, cpu_workers=1, cpu_offload_min_bytes=1 << 20)
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("小结果不应为估计大小而序列化")
+    
+    monkeypatch.setattr(mcp_bridge.pickle, "dumps", fail)
+    try:
+        envelope = manager._create_envelope({"content": [{"type": "text", "text": "hello"}]})
+        assert envelope.kind == "json"
+    finally:
+        manager.close_storage()
+
+
+def test_large_results_are_serialized_in_pool(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=1, cpu_offload_min_bytes=1024)
+    content = {"content": [{"type": "text", "text": "line\\n" * 2000}]}
+    try:
+        envelope = manager._create_envelope(content)
+        assert envelope.value == content
+        assert envelope.data == mcp_bridge.ResultEnvelope.from_content(content).data
+        assert manager.cpu_offload_stats["serialize"] == 1
+    finally:
+        manager.close_storage()
@@ -0,0 +1,101 @@
+"""调用期限：超时立即返回 504，并向服务发送 notifications/cancelled 取消执行"""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import make_manager, mcp_bridge, run, server_config
+
+
+def test_timeout_cancels_call_on_server(tmp_path, cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    marker = tmp_path / "finished"
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(max_consecutive_timeouts=0)}})
+        started = time.monotonic()
+        with pytest.raises(mcp_bridge.ToolTimeoutError) as excinfo:
+            await manager.invoke_tool("slow", {"seconds": 1.5, "marker": str(marker)}, "fake", timeout=0.3)
+        assert time.monotonic() - started < 1.0
+        assert mcp_bridge.format_execute_error(excinfo.value)[0] == 504
+        
+        # 服务收到取消通知后中止了执行；会话仍然可用
+        await asyncio.sleep(2.0)
+        assert not marker.exists()
+        echo = await manager.invoke_tool("echo", {"text": "still alive"}, "fake")
+        assert echo["result"]["content"][0]["text"] == "still alive"
+        assert manager.call_metrics["fake"]["timeouts"] == 1
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
+
+
+def test_timeout_precedence(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        config = server_config(tool_timeouts={"slow": 0.2})
+        await manager.init_all_servers({"mcpServers": {"fake": config}})
+        # 工具级期限生效
+        with pytest.raises(mcp_bridge.ToolTimeoutError):
+            await manager.invoke_tool("slow", {"seconds": 0.5}, "fake")
+        # 请求级期限优先于工具级
+        result = await manager.invoke_tool("slow", {"seconds": 0.5}, "fake", timeout=5)
+        assert "slept" in result["result"]["content"][0]["text"]
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
+
+
+def test_cancel_targets_request_received_by_server(tmp_path, cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    log = tmp_path / "requests.log"
+    sent = []
+    send_cancel = manager._send_cancel_notification
+    
+    async def record_cancel(session, request_id, reason):
+        sent.append(request_id)
+        await send_cancel(session, request_id, reason)
+    
+    manager._send_cancel_notification = record_cancel
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(max_consecutive_timeouts=0)}})
+        # 先完成一次调用，使请求 ID 不再是初始值
+        await manager.invoke_tool("slow", {"seconds": 0, "log": str(log)}, "fake")
+        with pytest.raises(mcp_bridge.ToolTimeoutError):
+            await manager.invoke_tool("slow", {"seconds": 1.5, "log": str(log)}, "fake", timeout=0.3)
+        await asyncio.sleep(0.5)
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
+    
+    started = [line.split()[1] for line in log.read_text().splitlines() if line.startswith("start")]
+    cancelled = [line.split()[1] for line in log.read_text().splitlines() if line.startswith("cancelled")]
+    assert len(started) == 2 and started[0] != started[1]
+    assert [str(request_id) for request_id in sent] == [started[1]]
+    assert cancelled == [started[1]]
+
+
+def test_cancel_skipped_without_integer_request_id(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    notifications = []
+    
+    class UnknownSession:
+        _request_id = "unknown"  # SDK 内部实现变化后的私有属性
+        
+        async def call_tool(self, tool_name, args):
+            await asyncio.sleep(1)
+        
+        async def send_notification(self, notification):
+            notifications.append(notification)
+    
+    member = {"session": UnknownSession(), "index": 0}
+    with pytest.raises(mcp_bridge.ToolTimeoutError):
+        run(manager._call_with_deadline("fake", member, "slow", {}, 0.1))
+    assert notifications == []
+    manager.close_storage()
@@ -0,0 +1,57 @@
+"""文件缓存：内容寻址去重与压缩存储（files 与 sqlite 两种后端）"""
+
+import pytest
+
+from conftest import FILE_TIER_CONFIG, make_manager, mcp_bridge
+
+BACKENDS = ["files", "sqlite"]
+COMPRESSIONS = ["none", "zlib"] + (["zstd"] if mcp_bridge.zstd is not None else [])
+
+
+def make_text(lines=20000):
+    return "\n".join(f"{i:06d} lorem ipsum dolor sit amet {'needle' if i % 1000 == 7 else 'filler'}" for i in range(lines))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_identical_results_share_one_blob(cache_dir, backend):
+    manager = make_manager(cache_dir, cache_backend=backend, cpu_workers=0)
+    content = make_text(2000)
+    try:
+        first = manager.cache_result(content, FILE_TIER_CONFIG)["cache_id"]
+        second = manager.cache_result(content, FILE_TIER_CONFIG)["cache_id"]
+        assert first != second
+        assert manager.file_cache_dedup_hits == 1
+        assert manager.get_cache_info(first)["etag"] == manager.get_cache_info(second)["etag"]
+        assert manager.get_cached_result(second) == content
+        if backend == "files":
+            assert len(list(cache_dir.glob("*.blob"))) == 1
+        else:
+            sweep = manager._get_sqlite_cache().sweep(0, 0)
+            assert sweep["files_scanned"] == 1
+    finally:
+        manager.close_storage()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_compressed_entries_round_trip(cache_dir, backend, compression):
+    manager = make_manager(cache_dir, cache_backend=backend, file_cache_compression=compression,
+                           file_cache_compress_min_bytes=1024, cpu_workers=0)
+    content = make_text()
+    data = content.encode("utf-8")
+    try:
+        cache_id = manager.cache_result(content, FILE_TIER_CONFIG)["cache_id"]
+        metadata = manager._get_file_cache_metadata(cache_id)
+        assert metadata["compression"] == (None if compression == "none" else compression)
+        assert metadata["size"] == len(data)
+        if compression != "none":
+            assert metadata["stored_size"] < len(data) // 2
+        
+        assert manager.get_cached_result(cache_id) == content
+        assert manager.read_cached_bytes(cache_id, 500_000, 500_100) == data[500_000:500_100]
+        lines = manager.get_cache_lines(cache_id, 15001, 15002)["content"]
+        assert lines == "\n".join(content.split("\n")[15000:15002])
+        search = manager.search_in_cache(cache_id, keyword="needle", max_results=100)
+        assert search["total_matches"] == 20
+    finally:
+        manager.close_storage()
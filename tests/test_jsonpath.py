@@ -0,0 +1,68 @@
+"""JSONPath 查询：在缓存结果的序列化字节上求值，只解析被选中的值"""
+
+import pytest
+
+from conftest import FILE_TIER_CONFIG, make_manager, mcp_bridge
+
+DOCUMENT = {
+    "content": [{"type": "text", "text": "hello"}],
+    "items": [
+        {"name": "a", "size": 50, "tags": ["x"]},
+        {"name": "b", "size": 150, "tags": ["y", "z"]},
+        {"name": "c", "size": 300, "meta": {"name": "nested"}}
+    ]
+}
+
+
+def values(path, document=DOCUMENT, **kwargs):
+    data = mcp_bridge.dumps_json_bytes(document)
+    result = mcp_bridge.JsonPathQuery(path).evaluate(data, indented=True, **kwargs)
+    return [match["value"] for match in result["matches"]]
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("$.content[0].text", ["hello"]),
+    ("items[-1].name", ["c"]),
+    ("$.items[*].size", [50, 150, 300]),
+    ("$['items'][0,2].name", ["a", "c"]),
+    ("$.items[1:].name", ["b", "c"]),
+    ("$.items[::2].name", ["a", "c"]),
+    ("$..name", ["a", "b", "c", "nested"]),
+    ("$.items[?(@.size > 100)].name", ["b", "c"]),
+    ("$.items[?(@.size >= 100 && @.name =~ /^C$/i)].size", [300]),
+    ("$.missing", []),
+])
+def test_query_selects_values(path, expected):
+    assert values(path) == expected
+
+
+def test_match_paths_and_counts():
+    data = mcp_bridge.dumps_json_bytes(DOCUMENT)
+    result = mcp_bridge.JsonPathQuery("$.items[*].name").evaluate(data, max_results=1, indented=True)
+    assert result["total_matches"] == 3 and result["truncated"]
+    assert result["matches"] == [{"path": '$["items"][0]["name"]', "value": "a"}]
+
+
+@pytest.mark.parametrize("path", ["$.items[", "$.items[?(@.size >)]", "$$"])
+def test_invalid_paths_raise_value_error(path):
+    with pytest.raises(ValueError):
+        mcp_bridge.JsonPathQuery(path)
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_query_file_cached_result(cache_dir, backend):
+    manager = make_manager(cache_dir, cache_backend=backend, cpu_workers=0)
+    big = {"items": [{"id": i, "even": i % 2 == 0} for i in range(5000)]}
+    try:
+        cache_id = manager.cache_result(big, FILE_TIER_CONFIG)["cache_id"]
+        result = manager.query_cache(cache_id, mcp_bridge.JsonPathQuery("$.items[?(@.id >= 4990)].id"), max_results=3)
+        assert result["total_matches"] == 10
+        assert [m["value"] for m in result["matches"]] == [4990, 4991, 4992]
+        
+        counted = manager.query_cache(cache_id, mcp_bridge.JsonPathQuery("$.items[?(@.even == true)]"), count_only=True)
+        assert counted["total_matches"] == 2500 and counted["matches"] == []
+        
+        with pytest.raises(ValueError):
+            manager.query_cache("missing", mcp_bridge.JsonPathQuery("$.items"))
+    finally:
+        manager.close_storage()
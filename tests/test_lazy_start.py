@@ -0,0 +1,76 @@
+"""按需启动与空闲回收"""
+
+import asyncio
+
+import pytest
+
+from conftest import fake_server_pids, linux_only, make_manager, run, server_config
+
+
+def register_stopped(manager, name, config):
+    """登记一个尚未启动的服务（等同于有工具快照的 lazy 服务）"""
+    manager._activate_server(name, "stdio", config, [], tools=[])
+
+
+@linux_only
+def test_shutdown_during_lazy_start_reaps_children(tmp_path, cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    # 会话池中一个成员很快就绪，另一个仍在启动
+    env = {"FAKE_START_DELAY": "5", "FAKE_FAST_ONCE": str(tmp_path / "fast-once")}
+    
+    async def scenario():
+        register_stopped(manager, "fake", server_config(lazy=True, pool_size=2, env=env))
+        waking = asyncio.create_task(manager._ensure_running("fake"))
+        while len(fake_server_pids()) < 2:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(1.0)
+        
+        await manager.shutdown_server("fake")
+        assert fake_server_pids() == []
+        assert "fake" not in manager.clients
+        with pytest.raises(ValueError):
+            await waking
+    
+    run(scenario())
+    manager.close_storage()
+
+
+def test_lazy_server_boots_from_snapshot_and_idles_out(cache_dir):
+    config = {"mcpServers": {"fake": server_config(lazy=True, idle_timeout=60)}, "settings": {"cpu_workers": 0}}
+    
+    # 首次运行没有工具快照：正常启动一次并记录快照
+    first = make_manager(cache_dir, cpu_workers=0)
+    
+    async def first_boot():
+        await first.init_all_servers(config)
+        assert first.clients["fake"]["pool"]
+        await first.shutdown()
+    
+    run(first_boot())
+    first.close_storage()
+    
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        await manager.init_all_servers(config)
+        client_data = manager.clients["fake"]
+        assert client_data["pool"] == []
+        assert manager.get_stats()["servers"]["fake"]["state"] == "stopped"
+        assert "echo" in [tool["name"] for tool in manager.get_tools_by_server("fake")["tools"]]
+        
+        # 首次调用时启动，并发的调用共享同一次启动
+        results = await asyncio.gather(*[manager.invoke_tool("pid", {}, "fake") for _ in range(3)])
+        assert len({r["result"]["content"][0]["text"] for r in results}) == 1
+        assert manager.get_stats()["servers"]["fake"]["state"] == "running"
+        
+        # 空闲超过 idle_timeout 后关闭子进程，工具仍可列出，下次调用重新启动
+        manager.clients["fake"]["last_used"] -= 120
+        await manager.evict_idle_servers()
+        assert manager.clients["fake"]["pool"] == []
+        assert manager.get_tools_by_server("fake")["tools"]
+        echo = await manager.invoke_tool("echo", {"text": "awake"}, "fake")
+        assert echo["result"]["content"][0]["text"] == "awake"
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
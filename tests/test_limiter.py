@@ -0,0 +1,69 @@
+"""每个服务的并发限制：超出并发数的调用按 FIFO 排队，队列满时拒绝（HTTP 429）"""
+
+import asyncio
+
+import pytest
+
+from conftest import make_manager, mcp_bridge, run, server_config
+
+
+def test_waiters_are_served_in_arrival_order():
+    async def scenario():
+        limiter = mcp_bridge.ServerCallLimiter("fake", max_concurrency=1, max_queue_size=8)
+        await limiter.acquire()
+        order = []
+        
+        async def call(index):
+            await limiter.acquire()
+            order.append(index)
+            await asyncio.sleep(0.01)
+            limiter.release()
+        
+        tasks = []
+        for index in range(5):
+            tasks.append(asyncio.create_task(call(index)))
+            await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3, 4]
+        assert limiter.get_stats()["active"] == 0
+    
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        limiter = mcp_bridge.ServerCallLimiter("fake", max_concurrency=1, max_queue_size=8)
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire())
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        limiter.release()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert limiter.get_stats()["queued"] == 0
+    
+    run(scenario())
+
+
+def test_full_queue_is_rejected_with_429(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(max_concurrency=1, max_queue_size=1)}})
+        running = asyncio.create_task(manager.invoke_tool("slow", {"seconds": 0.5}, "fake"))
+        queued = asyncio.create_task(manager.invoke_tool("slow", {"seconds": 0.1}, "fake"))
+        await asyncio.sleep(0.1)
+        
+        with pytest.raises(mcp_bridge.ServerBusyError) as excinfo:
+            await manager.invoke_tool("echo", {"text": "x"}, "fake")
+        assert mcp_bridge.format_execute_error(excinfo.value)[0] == 429
+        
+        first, second = await asyncio.gather(running, queued)
+        assert second["queue_wait"] > 0.2
+        stats = manager.limiters["fake"].get_stats()
+        assert stats["rejected_calls"] == 1 and stats["total_calls"] == 2
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
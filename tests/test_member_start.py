@@ -0,0 +1,58 @@
+"""会话池成员的启动：启动被取消或中途失败时回收子进程，且不触发 cancel scope 错误"""
+
+import asyncio
+
+import pytest
+
+from conftest import fake_server_pids, linux_only, make_manager, run, server_config
+
+pytestmark = linux_only
+
+
+async def wait_for_child(timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not fake_server_pids():
+        assert asyncio.get_running_loop().time() < deadline, "子进程未启动"
+        await asyncio.sleep(0.05)
+
+
+def collect_loop_errors(errors):
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+
+def test_cancelled_start_reaps_child(cache_dir, capfd):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    config = server_config(env={"FAKE_START_DELAY": "5"})
+    errors = []
+    
+    async def scenario():
+        collect_loop_errors(errors)
+        start = asyncio.create_task(manager._start_member("stdio", config))
+        await wait_for_child()
+        await asyncio.sleep(0.3)
+        start.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await start
+        assert fake_server_pids() == []
+    
+    run(scenario())
+    manager.close_storage()
+    assert errors == []
+    assert "cancel scope" not in capfd.readouterr().err
+
+
+def test_failed_handshake_reaps_child(cache_dir, capfd):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    config = server_config(timeout=1, env={"FAKE_START_DELAY": "5"})
+    errors = []
+    
+    async def scenario():
+        collect_loop_errors(errors)
+        with pytest.raises(asyncio.TimeoutError):
+            await manager._start_member("stdio", config)
+        assert fake_server_pids() == []
+    
+    run(scenario())
+    manager.close_storage()
+    assert errors == []
+    assert "cancel scope" not in capfd.readouterr().err
@@ -0,0 +1,64 @@
+"""内存缓存层：字节预算、内容去重与淘汰降级"""
+
+import threading
+
+from conftest import make_manager, mcp_bridge
+
+
+def envelope(text):
+    return mcp_bridge.ResultEnvelope.from_content(text)
+
+
+def test_dedup_shares_one_blob():
+    tier = mcp_bridge.MemoryCacheTier(1 << 20)
+    assert tier.put("a", envelope("same"), 1e12) is True
+    assert tier.put("b", envelope("same"), 1e12) is False
+    stats = tier.get_stats()
+    assert (stats["items"], stats["blobs"], stats["dedup_hits"]) == (2, 1, 1)
+    assert tier.get("a") is tier.get("b")
+
+
+def test_eviction_demotes_outside_lock():
+    demoted = []
+    
+    def on_evict(env, aliases):
+        # 回调执行时其他线程可以获取内存缓存的锁
+        probe = []
+        
+        def try_lock():
+            acquired = tier.lock.acquire(blocking=False)
+            if acquired:
+                tier.lock.release()
+            probe.append(acquired)
+        
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        assert probe == [True]
+        # 降级完成前，被淘汰的别名仍可读取
+        assert tier.get("old") is env
+        demoted.append([cache_id for cache_id, _ in aliases])
+    
+    first = envelope("x" * 600)
+    tier = mcp_bridge.MemoryCacheTier(first.size + 100, on_evict)
+    tier.put("old", first, 1e12)
+    tier.put("new", envelope("y" * 600), 1e12)
+    assert demoted == [["old"]]
+    
+    tier.finish_demotion(["old"])
+    assert tier.get("old") is None
+
+
+def test_evicted_entry_readable_after_demotion(cache_dir):
+    manager = make_manager(cache_dir, memory_cache_max_bytes=2000, cpu_workers=0)
+    config = {"max_output_bytes": 10, "max_memory_cache_size": 1500}
+    try:
+        first = manager.cache_result("a" * 1200, config)
+        assert first["cache_type"] == "memory"
+        manager.cache_result("b" * 1200, config)
+        # 降级进行中或完成后都能读取
+        assert manager.get_cached_result(first["cache_id"]) == "a" * 1200
+    finally:
+        manager.close_storage()
+    assert manager.memory_cache.demoting == {}
+    assert manager.demoted_cache_items == 1
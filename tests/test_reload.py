@@ -0,0 +1,42 @@
+"""增量重载（blue/green）：配置变化的服务先启动新会话再切换，旧会话处理完在途调用后关闭"""
+
+import asyncio
+import time
+
+from conftest import make_manager, run, server_config
+
+
+def test_reload_swaps_changed_server_and_drains_inflight_call(cache_dir):
+    # 服务级 timeout 很小也不影响排空（排空期限由 drain_timeout 决定）
+    manager = make_manager(cache_dir, cpu_workers=0, drain_timeout=0)
+    old_config = server_config(description="old", timeout=2)
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": old_config, "other": server_config()}})
+        old_member = manager.clients["fake"]["pool"][0]
+        other_member = manager.clients["other"]["pool"][0]
+        old_pid = int((await manager.invoke_tool("pid", {}, "fake"))["result"]["content"][0]["text"])
+        
+        slow = asyncio.create_task(manager.invoke_tool("slow", {"seconds": 0.8}, "fake", timeout=5))
+        await asyncio.sleep(0.2)
+        summary = await manager.reload_config({
+            "settings": {"cpu_workers": 0, "drain_timeout": 0},
+            "mcpServers": {"fake": server_config(description="new", timeout=2), "other": server_config()}
+        })
+        assert summary["changed"] == ["fake"] and summary["unchanged"] == ["other"]
+        assert manager.clients["other"]["pool"][0] is other_member
+        
+        # 新调用路由到新会话，旧会话上的调用正常完成
+        new_pid = int((await manager.invoke_tool("pid", {}, "fake"))["result"]["content"][0]["text"])
+        assert new_pid != old_pid
+        assert "slept" in (await slow)["result"]["content"][0]["text"]
+        
+        # 在途调用结束后旧会话立即关闭（由事件通知，不等待 drain_timeout）
+        started = time.monotonic()
+        while not old_member["owner"].done():
+            await asyncio.sleep(0.02)
+        assert time.monotonic() - started < 3
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
@@ -0,0 +1,55 @@
+"""缓存结果接口：分段读取、字节范围与不存在的条目"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import FILE_TIER_CONFIG, make_manager, mcp_bridge
+
+
+@pytest.fixture
+def manager(cache_dir, monkeypatch):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    monkeypatch.setattr(mcp_bridge, "manager", manager)
+    yield manager
+    manager.close_storage()
+
+
+@pytest.fixture
+def client(manager):
+    # 不进入 lifespan（不读取配置、不启动服务）
+    return TestClient(mcp_bridge.app)
+
+
+def test_missing_entry_is_404(client):
+    assert client.post("/result", json={"cache_id": "missing"}).status_code == 404
+    assert client.get("/result/missing").status_code == 404
+    assert client.get("/result/missing", headers={"Range": "bytes=0-9"}).status_code == 404
+
+
+def test_array_pages_and_byte_ranges(client, manager):
+    items = [{"id": i, "name": f"item-{i}"} for i in range(500)]
+    cache_id = manager.cache_result(items, FILE_TIER_CONFIG)["cache_id"]
+    
+    body = client.post("/result", json={"cache_id": cache_id, "start": 10, "end": 13}).json()
+    assert body["result"] == items[10:13]
+    assert body["metadata"]["total_length"] == 500 and body["metadata"]["has_more"]
+    
+    data = mcp_bridge.ResultEnvelope.from_content(items).data
+    ranged = client.get(f"/result/{cache_id}", headers={"Range": "bytes=100-199"})
+    assert ranged.status_code == 206
+    assert ranged.content == data[100:200]
+
+
+def test_entry_gone_during_fallback_read_is_404(client, manager, monkeypatch):
+    cache_id = manager.cache_result(list(range(1000)), FILE_TIER_CONFIG)["cache_id"]
+    
+    # 模拟没有元素索引的旧格式数组，且条目在回退到完整解析前被清理
+    original_init = mcp_bridge.PageReader.__init__
+    
+    def without_item_index(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.item_count = None
+    
+    monkeypatch.setattr(mcp_bridge.PageReader, "__init__", without_item_index)
+    monkeypatch.setattr(manager, "_get_envelope", lambda cache_id: None)
+    assert client.post("/result", json={"cache_id": cache_id}).status_code == 404
@@ -0,0 +1,34 @@
+"""会话池：一个逻辑服务背后运行多个 stdio 子进程，调用分配给在途请求最少的成员"""
+
+import asyncio
+
+from conftest import make_manager, run, server_config
+
+
+def call_text(invocation):
+    return invocation["result"]["content"][0]["text"]
+
+
+def test_calls_go_to_least_busy_member(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(pool_size=2)}})
+        pool = manager.clients["fake"]["pool"]
+        pids = {member["process"].pid for member in pool}
+        assert len(pids) == 2
+        
+        slow = asyncio.create_task(manager.invoke_tool("slow", {"seconds": 0.5}, "fake"))
+        await asyncio.sleep(0.1)
+        busy = next(member for member in pool if member["inflight"])
+        free_pid = int(call_text(await manager.invoke_tool("pid", {}, "fake")))
+        assert free_pid in pids and free_pid != busy["process"].pid
+        await slow
+        
+        # 空闲时轮流使用各成员
+        seen = {int(call_text(await manager.invoke_tool("pid", {}, "fake"))) for _ in range(4)}
+        assert seen == pids
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
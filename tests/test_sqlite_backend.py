@@ -0,0 +1,78 @@
+"""SQLite 存储后端：跨管理器实例（重启 / 其他进程）读取与清理"""
+
+from conftest import FILE_TIER_CONFIG, make_manager, mcp_bridge, run
+
+
+def write_entry(cache_dir, content):
+    writer = make_manager(cache_dir, cache_backend="sqlite")
+    result = writer.cache_result(content, FILE_TIER_CONFIG)
+    writer.close_storage()
+    assert result["cache_type"] == "file"
+    return result["cache_id"]
+
+
+def test_reads_entry_written_by_another_manager(cache_dir):
+    content = "\n".join(f"line {i} needle" for i in range(2000))
+    cache_id = write_entry(cache_dir, content)
+    
+    reader = make_manager(cache_dir, cache_backend="sqlite")
+    try:
+        assert reader.sqlite_cache is None
+        assert reader.get_cached_result(cache_id) == content
+        assert reader.get_cache_info(cache_id)["size"] == len(content.encode("utf-8"))
+        lines = reader.get_cache_lines(cache_id, 1, 2)
+        assert lines["content"].startswith("line 0 needle")
+        assert reader.search_in_cache(cache_id, keyword="needle", max_results=3)["total_matches"] == 2000
+    finally:
+        reader.close_storage()
+
+
+def test_fresh_manager_sweep_sees_existing_entries(cache_dir):
+    write_entry(cache_dir, "x" * 50000)
+    
+    janitor = make_manager(cache_dir, cache_backend="sqlite")
+    try:
+        sweep = run(janitor.sweep_file_cache())
+        assert sweep["files_scanned"] == 1
+        assert sweep["disk_usage_bytes"] > 0
+    finally:
+        janitor.close_storage()
+
+
+def test_database_still_readable_after_switching_to_files(cache_dir):
+    cache_id = write_entry(cache_dir, "y" * 30000)
+    
+    reader = make_manager(cache_dir, cache_backend="files")
+    try:
+        assert reader.get_cached_result(cache_id) == "y" * 30000
+        # 新写入仍使用文件后端
+        assert reader._get_sqlite_cache() is None
+    finally:
+        reader.close_storage()
+
+
+def test_sweep_counts_blobs_not_aliases(cache_dir):
+    content = "z" * 40000
+    manager = make_manager(cache_dir, cache_backend="sqlite")
+    try:
+        first = manager.cache_result(content, FILE_TIER_CONFIG)
+        second = manager.cache_result(content, FILE_TIER_CONFIG)
+        assert first["cache_id"] != second["cache_id"]
+        sweep = run(manager.sweep_file_cache())
+        assert sweep["files_scanned"] == 1
+    finally:
+        manager.close_storage()
+
+
+def test_reads_without_incremental_blob_handles(cache_dir, monkeypatch):
+    monkeypatch.setattr(mcp_bridge, "SQLITE_HAS_BLOBOPEN", False)
+    content = "\n".join(f"row {i} needle" for i in range(3000))
+    cache_id = write_entry(cache_dir, content)
+    
+    reader = make_manager(cache_dir, cache_backend="sqlite")
+    try:
+        lines = reader.get_cache_lines(cache_id, 2000, 2001)
+        assert lines["content"].startswith("row 1999 needle")
+        assert reader.search_in_cache(cache_id, keyword="needle", max_results=1)["total_matches"] == 3000
+    finally:
+        reader.close_storage()
@@ -0,0 +1,107 @@
+"""warm_standby：备用会话的切换与回收"""
+
+import asyncio
+import time
+
+from conftest import fake_server_pids, linux_only, make_manager, run, server_config
+
+
+async def wait_until(predicate, timeout: float = 10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.05)
+
+
+@linux_only
+def test_shutdown_reaps_standby_still_starting(tmp_path, cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    # 正常成员立即就绪，备用会话启动缓慢
+    env = {"FAKE_START_DELAY": "5", "FAKE_FAST_ONCE": str(tmp_path / "fast-once")}
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(warm_standby=True, env=env)}})
+        client_data = manager.clients["fake"]
+        assert client_data["standby_task"] is not None
+        await wait_until(lambda: len(fake_server_pids()) == 2)
+        
+        await manager.shutdown_server("fake")
+        assert client_data["standby"] is None
+        assert fake_server_pids() == []
+    
+    run(scenario())
+    manager.close_storage()
+
+
+@linux_only
+def test_shutdown_cancels_background_restarts(tmp_path, cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    env = {"FAKE_START_DELAY": "5", "FAKE_FAST_ONCE": str(tmp_path / "fast-once")}
+    
+    async def scenario():
+        await manager.init_all_servers({"mcpServers": {"fake": server_config(env=env)}})
+        member = manager.clients["fake"]["pool"][0]
+        manager._restart_in_background("fake", member)
+        assert len(manager.restart_tasks) == 1
+        await wait_until(lambda: len(fake_server_pids()) == 2)
+        
+        await manager.shutdown()
+        assert manager.restart_tasks == set()
+        assert fake_server_pids() == []
+    
+    run(scenario())
+    manager.close_storage()
+
+
+def test_restart_switches_to_ready_standby(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        config = server_config(warm_standby=True)
+        await manager.init_all_servers({"mcpServers": {"fake": config}, "settings": {"cpu_workers": 0}})
+        client_data = manager.clients["fake"]
+        await wait_until(lambda: client_data["standby"] is not None)
+        standby_pid = client_data["standby"]["process"].pid
+        old_member = client_data["pool"][0]
+        
+        started = time.monotonic()
+        await manager.restart_server("fake", config)
+        assert time.monotonic() - started < 0.5
+        assert manager.clients["fake"]["pool"][0]["process"].pid == standby_pid
+        pid = await manager.invoke_tool("pid", {}, "fake")
+        assert int(pid["result"]["content"][0]["text"]) == standby_pid
+        
+        # 旧成员在后台关闭，随后补充新的备用会话
+        await wait_until(lambda: old_member["owner"].done())
+        await wait_until(lambda: manager.clients["fake"]["standby"] is not None)
+        assert manager.get_stats()["servers"]["fake"]["standby"] == "ready"
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
+
+
+def test_restart_with_standby_drains_inflight_call(cache_dir):
+    manager = make_manager(cache_dir, cpu_workers=0)
+    
+    async def scenario():
+        config = server_config(warm_standby=True)
+        await manager.init_all_servers({"mcpServers": {"fake": config}, "settings": {"cpu_workers": 0}})
+        client_data = manager.clients["fake"]
+        await wait_until(lambda: client_data["standby"] is not None)
+        old_member = client_data["pool"][0]
+        
+        slow = asyncio.create_task(manager.invoke_tool("slow", {"seconds": 0.8}, "fake", timeout=5))
+        await asyncio.sleep(0.2)
+        await manager.restart_server("fake", config)
+        assert manager.clients["fake"]["pool"][0] is not old_member
+        
+        # 切换到备用会话后，旧成员上的在途调用正常完成，之后旧成员才关闭
+        await asyncio.sleep(0.2)
+        assert not old_member["owner"].done()
+        assert "slept" in (await slow)["result"]["content"][0]["text"]
+        await wait_until(lambda: old_member["owner"].done())
+        await manager.shutdown()
+    
+    run(scenario())
+    manager.close_storage()
@@ -0,0 +1,61 @@
+"""多进程模式：监督者持有会话，各工作进程通过共享的缓存存储读取彼此的结果"""
+
+import json
+
+import pytest
+
+from conftest import mcp_bridge, run, server_config
+
+
+@pytest.fixture
+def supervisor(tmp_path, cache_dir):
+    config = {
+        "settings": {"cache_backend": "sqlite", "cpu_workers": 0},
+        "mcpServers": {"fake": server_config(max_output_bytes=100, max_memory_cache_size=0)}
+    }
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+    
+    manager = mcp_bridge.MCPManager()
+    manager.cache_dir = cache_dir
+    supervisor = mcp_bridge.WorkerSupervisor(manager, config_path)
+    supervisor.start()
+    yield supervisor
+    supervisor.stop()
+
+
+async def start_worker(supervisor, cache_dir):
+    worker = mcp_bridge.WorkerManager(mcp_bridge.SupervisorClient(supervisor.address, supervisor.authkey))
+    worker.cache_dir = cache_dir
+    await worker.load_config(supervisor.config_path)
+    await worker.run_io(worker.open_storage)
+    await worker.sync_catalog()
+    return worker
+
+
+def test_supervisor_opens_shared_store(supervisor):
+    assert supervisor.manager.sqlite_cache is not None
+    assert "fake" in supervisor.catalog()["servers"][0]["name"]
+
+
+def test_worker_reads_result_cached_by_another_worker(supervisor, cache_dir):
+    async def scenario():
+        first = await start_worker(supervisor, cache_dir)
+        second = await start_worker(supervisor, cache_dir)
+        try:
+            assert second.sqlite_cache is not None
+            cached = await first.execute_tool("big", {"n": 2000})
+            assert cached["cache_type"] == "file"
+            
+            content = second.get_cached_result(cached["cache_id"])
+            assert content["content"][0]["text"].count("hello") == 2000
+            assert second.get_cache_info(cached["cache_id"]) is not None
+            
+            # 监督者的清理任务看到工作进程写入的条目
+            sweep = await supervisor.manager.sweep_file_cache()
+            assert sweep["files_scanned"] == 1
+        finally:
+            first.close_storage()
+            second.close_storage()
+    
+    run(scenario())
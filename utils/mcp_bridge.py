@@ -10,16 +10,34 @@ import os
 import signal
 import sys
 import socket
+import struct
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Iterator, Callable, Awaitable
 from datetime import datetime
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 import uuid
 import threading
 import time
 import json
-from collections import OrderedDict
+import bisect
+import codecs
+import functools
+import heapq
+import hashlib
+import itertools
+import mmap
+import multiprocessing
+import pickle
+import re
+import secrets
+import sqlite3
+import zlib
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+from collections import OrderedDict, deque
 
 # 尝试导入版本信息
 try:
@@ -35,14 +53,34 @@ try:
 except ImportError:
     __version__ = "1.0.0"
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
+import anyio
+
+# 可选的高性能 JSON 后端
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 可选的 zstd 压缩（Python 3.14 标准库 compression.zstd 或 zstandard 包），未安装时文件缓存使用 zlib
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# SQLite 增量 BLOB 句柄（Python 3.11+），不可用时分段读取退回 substr()
+SQLITE_HAS_BLOBOPEN = hasattr(sqlite3.Connection, "blobopen")
 
 # MCP SDK 导入
 from mcp import ClientSession, StdioServerParameters
+from mcp import types as mcp_types
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 
@@ -247,6 +285,12 @@ def get_config_path() -> Path:
     return config_dir / "mcp-config.json"
 
 
+class MemoizeConfig(BaseModel):
+    """单个工具的结果记忆化配置"""
+    ttl: float = 60  # 结果有效期（秒）
+    max_entries: int = 256  # 该工具最多保留的不同参数组合数，超出后按 LRU 淘汰
+
+
 class MCPServerConfig(BaseModel):
     """MCP服务器配置"""
     enabled: bool = True
@@ -259,7 +303,10 @@ class MCPServerConfig(BaseModel):
     # sse 类型配置
     url: Optional[str] = None
     # 通用配置
-    timeout: int = 30
+    timeout: int = 30  # 启动超时，同时作为工具调用的默认超时（秒，<=0 表示不限制）
+    tool_timeouts: Dict[str, float] = {}  # 按工具名覆盖调用超时（秒）
+    max_consecutive_timeouts: int = 2  # 同一会话连续超时达到该次数后重建会话（<=0 表示不重建）
+    memoize: Dict[str, MemoizeConfig] = {}  # 按工具名开启结果记忆化（仅用于幂等工具），相同参数的调用直接返回上次结果
     description: str = ""
     # 缓存配置
     max_output_bytes: int = 1000  # 触发缓存的输出字节数阈值
@@ -267,11 +314,40 @@ class MCPServerConfig(BaseModel):
     cache_large_results: bool = True  # 是否启用大结果缓存
     result_cache_ttl: int = 300  # 缓存过期时间（秒）
     max_memory_cache_size: int = 10240  # 内存缓存阈值（字节），超过此大小使用文件缓存
+    # 并发控制
+    max_concurrency: int = 8  # 同时在途的工具调用上限（<=0 表示不限制）
+    max_queue_size: int = 64  # 并发已满时允许排队等待的调用数，超出后直接拒绝（HTTP 429）
+    # 会话池配置（仅 stdio）
+    pool_size: int = 1  # 启动的相同子进程数量，调用按最少在途请求负载均衡
+    health_check_interval: int = 30  # 会话池成员健康检查间隔（秒），<=0 表示关闭
+    warm_standby: bool = False  # 额外保持一个已初始化的备用会话，重启服务或成员崩溃时直接切换，随后在后台补充新的备用会话
+    # 按需启动
+    lazy: bool = False  # 启动时不启动子进程，工具列表来自上次运行保存的快照，首次调用时才启动
+    idle_timeout: int = 0  # 空闲超过该时长（秒）后关闭子进程，下次调用时重新启动（<=0 表示不回收）
+
+
+class BridgeSettings(BaseModel):
+    """桥接服务全局设置（配置文件顶层 settings 字段）"""
+    memory_cache_max_bytes: int = 64 * 1024 * 1024  # 内存缓存总字节预算，超出后按 LRU 降级到文件缓存
+    cache_sweep_interval: int = 60  # 后台清理过期缓存的间隔（秒），<=0 表示关闭
+    cache_sweep_batch_size: int = 200  # 每批处理的缓存文件数，批次之间让出事件循环
+    cache_disk_quota_bytes: int = 1024 * 1024 * 1024  # 文件缓存目录总大小上限，超出后从最旧的条目开始删除（<=0 表示不限制）
+    search_index_min_bytes: int = 4 * 1024 * 1024  # 文件缓存条目达到该大小后，首次搜索时在后台建立倒排索引（<=0 表示关闭）
+    search_index_eager_bytes: int = 32 * 1024 * 1024  # 达到该大小的条目在写入时即建立索引（<=0 表示只在首次搜索时建立）
+    file_cache_compression: str = "auto"  # 文件缓存压缩算法：auto（安装了 zstd 时用 zstd，否则 zlib）、zstd、zlib、none
+    file_cache_compress_min_bytes: int = 64 * 1024  # 达到该大小的文件缓存条目才压缩
+    cache_backend: str = "files"  # 文件缓存存储后端：files（每个条目一组文件）或 sqlite（缓存目录下单个 WAL 模式的 cache.db）
+    io_threads: int = 8  # 磁盘 I/O 线程池大小，缓存读写与配置文件读写都在该线程池中执行，不阻塞事件循环
+    cpu_workers: int = 2  # 计算进程池大小（无 GIL 的 Python 上为线程池），<=0 表示不使用，全部在 I/O 线程中执行
+    cpu_offload_min_bytes: int = 1024 * 1024  # 达到该大小的结果序列化、全文搜索、JSONPath 查询与索引建立交给计算进程池
+    shutdown_timeout: float = 5.0  # 关闭服务时等待会话正常关闭、stdio 子进程退出的期限（秒），超时后强制结束子进程
+    drain_timeout: float = 60.0  # 重载、热备切换或空闲回收替换下来的旧会话等待在途调用完成的期限（秒），至少 MIN_DRAIN_TIMEOUT 秒
 
 
 class Config(BaseModel):
     """配置文件结构"""
     mcpServers: Dict[str, MCPServerConfig]
+    settings: BridgeSettings = BridgeSettings()
 
 
 class ExecuteRequest(BaseModel):
@@ -279,6 +355,13 @@ class ExecuteRequest(BaseModel):
     name: str
     arguments: Dict[str, Any] = {}
     serverName: Optional[str] = None  # 可选的服务名称，用于指定特定服务下的工具
+    timeout: Optional[float] = None  # 可选的本次调用超时（秒），优先级高于服务与工具级配置
+
+
+class BatchExecuteRequest(BaseModel):
+    """批量执行工具请求"""
+    calls: List[ExecuteRequest]
+    stream: bool = False  # 是否以 NDJSON 流式返回，每完成一项立即输出
 
 
 class ConfigUpdateRequest(BaseModel):
@@ -302,9 +385,13 @@ class GetResultRequest(BaseModel):
 class SearchCacheRequest(BaseModel):
     """搜索缓存内容请求"""
     cache_id: str
-    keyword: str
+    keyword: Optional[str] = None
+    keywords: List[str] = []  # 多个关键词（与 keyword 合并），一次扫描同时匹配
+    regex: Optional[bool] = False  # 关键词按正则表达式解释
+    whole_word: Optional[bool] = False  # 只匹配完整单词
     case_sensitive: Optional[bool] = False
     max_results: Optional[int] = 50
+    context_lines: Optional[int] = 0  # 为每个返回的匹配附带前后若干行上下文
 
 
 class GetCacheContextRequest(BaseModel):
@@ -314,186 +401,2307 @@ class GetCacheContextRequest(BaseModel):
     context_lines: Optional[int] = 3
 
 
-class MCPManager:
-    """MCP服务管理器"""
+class GetCacheLinesRequest(BaseModel):
+    """按行范围读取缓存请求"""
+    cache_id: str
+    start_line: int = 1  # 起始行号（从1开始，包含）
+    end_line: Optional[int] = None  # 结束行号（包含），None 表示到最后一行
+
+
+class QueryCacheRequest(BaseModel):
+    """按 JSONPath 查询缓存内容请求"""
+    cache_id: str
+    path: str  # JSONPath 子集，如 $.content[0].text 或 $.items[?(@.size > 100)].name
+    max_results: Optional[int] = 100  # 最多返回的匹配值数（总匹配数始终精确统计）
+    count_only: Optional[bool] = False  # 只统计匹配数，不返回值
+
+
+def dumps_json_bytes(content: Any) -> bytes:
+    """将内容序列化为带缩进的 UTF-8 JSON 字节（安装了 orjson 时使用 orjson）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson 不支持的类型（如超出 64 位的整数）回退到标准库
+            pass
+    return json.dumps(content, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def loads_json_bytes(data: bytes) -> Any:
+    """解析 UTF-8 JSON 字节"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def estimate_content_size(content: Any) -> int:
+    """
+    粗略估计工具结果序列化后的大小：累加其中字符串与字节串的长度（不序列化，开销与元素个数成正比），
+    用于决定是否把序列化交给计算进程池
+    """
+    size = 0
+    stack = [content]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (str, bytes, bytearray)):
+            size += len(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        else:
+            size += 8
+    return size
+
+
+def build_line_offsets(data: Any) -> array:
+    """计算每行的起始字节偏移（按 \\n 分行，与 str.split('\\n') 的行划分一致）"""
+    offsets = array('Q', [0])
+    offsets.extend(match.end() for match in re.finditer(b"\n", data))
+    return offsets
+
+
+CHAR_CHECKPOINT_INTERVAL = 4096  # 分页索引中字符→字节检查点的间隔（字符数）
+ARRAY_ITEM_SEPARATOR = re.compile(rb",\n  (?=[^ ])")  # 缩进 JSON 中顶层数组元素之间的分隔
+
+
+def build_page_table(envelope: "ResultEnvelope") -> array:
+    """
+    构建分页索引表（8 字节无符号整数数组）
     
-    def __init__(self):
-        self.clients: Dict[str, Dict[str, Any]] = {}
-        self.tool_call_history: Dict[str, int] = {}
-        self.sessions: Dict[str, ClientSession] = {}
-        self.config_cache: Dict[str, Any] = {}  # 缓存配置用于重启单个服务
-        
-        # 缓存系统相关
-        self.memory_cache: OrderedDict = OrderedDict()  # 内存缓存
-        self.cache_lock = threading.RLock()  # 缓存访问锁
-        self.max_memory_cache_items = 100  # 最大内存缓存条目数
+    布局为 [总字符数, 检查点间隔, 检查点数, 元素偏移数, 检查点..., 元素偏移...]：
+    检查点间隔为 0 表示纯 ASCII（字符偏移即字节偏移）；
+    元素偏移数为 0 表示不是可按元素分页的 JSON 数组，否则最后一项为结束哨兵。
+    """
+    data = envelope.data
+    table = array('Q', [0, 0, 0, 0])
+    if data.isascii():
+        table[0] = len(data)
+    else:
+        text = envelope.text
+        table[0] = len(text)
+        table[1] = CHAR_CHECKPOINT_INTERVAL
+        byte_offset = 0
+        for i in range(0, len(text), CHAR_CHECKPOINT_INTERVAL):
+            table.append(byte_offset)
+            byte_offset += len(text[i:i + CHAR_CHECKPOINT_INTERVAL].encode('utf-8'))
+        table[2] = len(table) - 4
     
-    async def load_config(self, config_path: Path) -> Dict[str, Any]:
-        """加载配置文件"""
-        try:
-            if not config_path.exists():
-                print(f"配置文件不存在，正在创建默认配置: {config_path}")
-                
-                default_config = {
-                    "mcpServers": {
-                        "example_service": {
-                            "enabled": True,
-                            "command": "path/to/your/mcp/server/executable",
-                            "args": ["--port", "8080"],
-                            "description": "这是一个示例服务，请替换成你自己的配置。它能...",
-                            "env": {}
-                        }
-                    }
-                }
-                
-                config_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(default_config, f, indent=2, ensure_ascii=False)
-                
-                print(f"✓ 默认配置已创建: {config_path}")
-                self.config_cache = default_config  # 缓存配置
-                return default_config
-            
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                self.config_cache = config  # 缓存配置
-                return config
-        
-        except Exception as e:
-            print(f"读取配置失败: {e}")
-            return {"mcpServers": {}}
+    if envelope.kind == "json":
+        if data == b"[]":
+            table.append(0)
+            table[3] = 1
+        elif data.startswith(b"[\n  ") and data.endswith(b"\n]"):
+            # 元素 i 的字节范围为 [offsets[i], offsets[i + 1] - 4)，减去的是 ",\n  " 分隔符
+            item_offsets = array('Q', [4])
+            item_offsets.extend(match.end() for match in ARRAY_ITEM_SEPARATOR.finditer(data))
+            item_offsets.append(len(data) + 2)
+            if not envelope._has_value or len(envelope.value) == len(item_offsets) - 1:
+                table.extend(item_offsets)
+                table[3] = len(item_offsets)
+    return table
+
+
+class MappedReader:
+    """缓存结果的只读视图基类：数据与索引可以是内存中的字节/数组，也可以是文件的 mmap 视图"""
     
-    async def init_server(self, server_name: str, server_config: Dict[str, Any]):
-        """初始化单个MCP服务器"""
-        if server_name in self.clients:
-            print(f"服务器 {server_name} 已初始化")
-            return
+    def __init__(self, data: Any, table: Any, resources: Optional[List[Any]] = None):
+        self.data = data
+        self.table = table
+        self.resources = resources or []  # 关闭时需要释放的文件与 mmap 对象（按打开顺序）
+    
+    def close(self):
+        if isinstance(self.table, memoryview):
+            self.table.release()
+        close_resources(self.resources)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LineReader(MappedReader):
+    """基于行偏移索引按行读取缓存结果，读取任意行范围只访问对应的字节，与结果总大小无关"""
+    
+    def __init__(self, data: Any, table: Any, resources: Optional[List[Any]] = None):
+        super().__init__(data, table, resources)
+        self.total_lines = len(table)
+    
+    def read(self, start_line: int, end_line: int) -> str:
+        """读取 [start_line, end_line] 行（从1开始，包含两端），行之间以 \\n 连接"""
+        if start_line > end_line:
+            return ""
+        start = self.table[start_line - 1]
+        # 结束位置为下一行起始处减去换行符，最后一行直到数据末尾
+        stop = self.table[end_line] - 1 if end_line < self.total_lines else len(self.data)
+        return bytes(self.data[start:stop]).decode('utf-8', errors='replace')
+
+
+class PageReader(MappedReader):
+    """基于分页索引读取缓存结果的字符范围或数组元素范围，开销与页大小成正比"""
+    
+    def __init__(self, data: Any, table: Any, resources: Optional[List[Any]] = None,
+                 kind: Optional[str] = None, digest: Optional[str] = None):
+        super().__init__(data, table, resources)
+        self.kind = kind
+        self.digest = digest
+        self.total_chars = table[0]
+        self.char_step = table[1]
+        self.checkpoint_count = table[2]
+        item_slots = table[3]
+        self.item_count: Optional[int] = item_slots - 1 if item_slots else None
+        self.items_at = 4 + self.checkpoint_count
+    
+    def char_to_byte(self, char_offset: int) -> int:
+        """将字符偏移转换为字节偏移（从最近的检查点开始解码，最多解码一个检查点间隔）"""
+        if char_offset >= self.total_chars:
+            return len(self.data)
+        if self.char_step == 0:
+            return char_offset
+        index, remainder = divmod(char_offset, self.char_step)
+        base = self.table[4 + index]
+        if remainder == 0:
+            return base
+        stop = self.table[5 + index] if index + 1 < self.checkpoint_count else len(self.data)
+        segment = bytes(self.data[base:stop]).decode('utf-8')
+        return base + len(segment[:remainder].encode('utf-8'))
+    
+    def read_chars(self, start: int, end: int) -> str:
+        """读取 [start, end) 字符范围"""
+        if start >= end:
+            return ""
+        return bytes(self.data[self.char_to_byte(start):self.char_to_byte(end)]).decode('utf-8')
+    
+    def read_items(self, start: int, end: int) -> List[Any]:
+        """读取 JSON 数组中 [start, end) 范围的元素（只解析这些元素）"""
+        if start >= end:
+            return []
+        byte_start = self.table[self.items_at + start]
+        byte_end = self.table[self.items_at + end] - 4
+        return loads_json_bytes(b"[" + bytes(self.data[byte_start:byte_end]) + b"]")
+
+
+def open_mmap(f) -> Any:
+    """以只读方式映射文件（空文件无法映射，返回空字节）"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def map_file_readonly(path: Path, resources: List[Any]) -> Any:
+    """只读映射文件，打开的文件与 mmap 对象追加到 resources 以便统一关闭"""
+    f = open(path, 'rb')
+    resources.append(f)
+    data = open_mmap(f)
+    if isinstance(data, mmap.mmap):
+        resources.append(data)
+    return data
+
+
+def close_resources(resources: List[Any]):
+    """按打开的相反顺序关闭资源"""
+    for resource in reversed(resources):
+        resource.close()
+    resources.clear()
+
+
+BLOB_MAGIC = b"\x89MCZ\r\n\x1a\n"  # 压缩 blob 的文件头（0x89 不可能出现在 UTF-8 文本开头，与未压缩 blob 不会混淆）
+BLOB_CODECS = {1: "zlib", 2: "zstd"}
+COMPRESSED_BLOCK_BYTES = 256 * 1024  # 压缩块的原始大小，随机读取时最多多解压一个块
+COMPRESSION_FAST_BYTES = 8 * 1024 * 1024  # 超过该大小的结果使用更快的压缩级别，控制写入耗时
+COMPRESSION_MIN_SAVING = 0.1  # 压缩后至少节省的比例，否则按原样存储（如已压缩的 base64 数据）
+
+
+def compress_block(codec: str, data: bytes, fast: bool) -> bytes:
+    if codec == "zstd":
+        return zstd.compress(data, level=1 if fast else 3)
+    return zlib.compress(data, 1 if fast else 6)
+
+
+def decompress_block(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstd is None:
+            raise RuntimeError("该缓存使用 zstd 压缩，但当前环境未安装 zstd 支持")
+        return zstd.decompress(data)
+    return zlib.decompress(data)
+
+
+class ByteRangeView:
+    """
+    只读字节视图基类：子类提供 size 与 read_range(start, stop)，
+    本类补齐 len、下标、切片、find/rfind 与 bytes()，使行/分页读取器与分块搜索可以像使用 bytes/mmap 一样使用它
+    """
+    
+    size = 0
+    chunk_size = 1024 * 1024  # find/rfind 每次读取的字节数
+    
+    def read_range(self, start: int, stop: int) -> bytes:
+        raise NotImplementedError
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step != 1:
+                raise ValueError("字节视图不支持带步长的切片")
+            return self.read_range(start, stop) if start < stop else b""
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("字节视图下标越界")
+        return self.read_range(key, key + 1)[0]
+    
+    def __bytes__(self) -> bytes:
+        return self.read_range(0, self.size) if self.size else b""
+    
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        """与 bytes.find 相同，逐块查找（相邻块之间重叠 len(sub) - 1 字节）"""
+        end = self.size if end is None else min(end, self.size)
+        pos = max(0, start)
+        while pos < end:
+            chunk_end = (pos // self.chunk_size + 1) * self.chunk_size
+            found = self[pos:min(chunk_end + len(sub) - 1, end)].find(sub)
+            if found >= 0:
+                return pos + found
+            pos = chunk_end
+        return -1
+    
+    def rfind(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        """与 bytes.rfind 相同，从后向前逐块查找"""
+        end = self.size if end is None else min(end, self.size)
+        start = max(0, start)
+        pos = end
+        while pos > start:
+            chunk_start = max(start, (pos - 1) // self.chunk_size * self.chunk_size)
+            found = self[chunk_start:min(pos + len(sub) - 1, end)].rfind(sub)
+            if found >= 0:
+                return chunk_start + found
+            pos = chunk_start
+        return -1
+    
+    def close(self):
+        pass
+
+
+class CompressedBlob(ByteRangeView):
+    """
+    分块压缩的 blob（只读，按原始字节偏移随机访问）
+    
+    文件布局: 文件头 [魔数, 压缩算法, 块大小, 原始字节数, 块数]
+              + 各块在文件中的起始偏移（块数 + 1 项，最后一项为结束哨兵）+ 各压缩块。
+    读取任意范围只解压覆盖该范围的块（最近使用的块会缓存）。
+    """
+    
+    HEADER = struct.Struct("<8sB3xIQQ")
+    CACHED_BLOCKS = 4
+    
+    def __init__(self, data: Any):
+        magic, codec_id, block_size, raw_size, block_count = self.HEADER.unpack(bytes(data[:self.HEADER.size]))
+        if magic != BLOB_MAGIC or codec_id not in BLOB_CODECS:
+            raise ValueError("无效的压缩 blob")
+        self.data = data
+        self.codec = BLOB_CODECS[codec_id]
+        self.chunk_size = block_size
+        self.size = raw_size
+        self.offsets = array('Q')
+        self.offsets.frombytes(bytes(data[self.HEADER.size:self.HEADER.size + 8 * (block_count + 1)]))
+        self.blocks: "OrderedDict[int, bytes]" = OrderedDict()
+    
+    @classmethod
+    def pack(cls, data: bytes, codec: str, block_size: int = COMPRESSED_BLOCK_BYTES) -> bytes:
+        """将原始字节按块压缩为 blob 文件内容"""
+        fast = len(data) > COMPRESSION_FAST_BYTES
+        blocks = [compress_block(codec, data[i:i + block_size], fast) for i in range(0, len(data), block_size)]
+        codec_id = next(key for key, name in BLOB_CODECS.items() if name == codec)
+        offsets = array('Q', [cls.HEADER.size + 8 * (len(blocks) + 1)])
+        for block in blocks:
+            offsets.append(offsets[-1] + len(block))
+        header = cls.HEADER.pack(BLOB_MAGIC, codec_id, block_size, len(data), len(blocks))
+        return b"".join([header, offsets.tobytes()] + blocks)
+    
+    def _block(self, index: int) -> bytes:
+        block = self.blocks.get(index)
+        if block is None:
+            block = decompress_block(self.codec, bytes(self.data[self.offsets[index]:self.offsets[index + 1]]))
+            self.blocks[index] = block
+            if len(self.blocks) > self.CACHED_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(index)
+        return block
+    
+    def read_range(self, start: int, stop: int) -> bytes:
+        block_size = self.chunk_size
+        first, last = start // block_size, (stop - 1) // block_size
+        if first == last:
+            base = first * block_size
+            return self._block(first)[start - base:stop - base]
+        parts = [self._block(index) for index in range(first, last + 1)]
+        parts[-1] = parts[-1][:stop - last * block_size]
+        parts[0] = parts[0][start - first * block_size:]
+        return b"".join(parts)
+    
+    def close(self):
+        self.blocks.clear()
+
+
+class SqliteBlobView(ByteRangeView):
+    """SQLite 增量 BLOB 句柄的字节视图（按需读取，不把整个值载入内存）"""
+    
+    def __init__(self, handle: Any):
+        self.handle = handle
+        self.size = len(handle)
+    
+    def read_range(self, start: int, stop: int) -> bytes:
+        return self.handle[start:stop]
+    
+    def close(self):
+        self.handle.close()
+
+
+class SqliteSubstrHandle:
+    """
+    不支持增量 BLOB 句柄（Connection.blobopen 需要 Python 3.11+）时的替代实现：
+    提供与句柄相同的 len() 与切片读取，每次切片通过 substr() 只读取所需的字节
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, row_id: int, lock: Optional[Any] = None):
+        self.conn = conn
+        self.row_id = row_id
+        self.lock = lock if lock is not None else nullcontext()
+        self.length = self._query("SELECT length(data) FROM blob_parts WHERE id = ?", (row_id,))
+    
+    def _query(self, sql: str, params: Tuple[Any, ...]) -> Any:
+        with self.lock:
+            row = self.conn.execute(sql, params).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"blob_parts#{self.row_id}")
+        return row[0]
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop, _ = key.indices(self.length)
+        if stop <= start:
+            return b""
+        return bytes(self._query(
+            "SELECT substr(data, ?, ?) FROM blob_parts WHERE id = ?", (start + 1, stop - start, self.row_id)))
+    
+    def close(self):
+        pass
+
+
+def open_sqlite_blob(conn: sqlite3.Connection, row_id: int, lock: Optional[Any] = None) -> Any:
+    """只读打开 blob_parts 中一行的数据：优先使用增量 BLOB 句柄，不支持时退回 substr() 读取"""
+    if SQLITE_HAS_BLOBOPEN:
+        return conn.blobopen("blob_parts", "data", row_id, readonly=True)
+    return SqliteSubstrHandle(conn, row_id, lock)
+
+
+class SqliteUInt64Array:
+    """以 8 字节无符号整数数组方式读取 SQLite BLOB 句柄中的索引表（按项读取）"""
+    
+    def __init__(self, handle: Any):
+        self.handle = handle
+        self.length = len(handle) // 8
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("索引表下标越界")
+        return int.from_bytes(self.handle[index * 8:index * 8 + 8], 'little')
+    
+    def close(self):
+        self.handle.close()
+
+
+def wrap_blob_data(data: Any, resources: List[Any]) -> Any:
+    """数据以压缩 blob 文件头开头时包装为 CompressedBlob（追加到 resources），否则原样返回"""
+    if data[:len(BLOB_MAGIC)] != BLOB_MAGIC:
+        return data
+    blob = CompressedBlob(data)
+    resources.append(blob)
+    return blob
+
+
+def open_blob_readonly(path: Path, resources: List[Any]) -> Any:
+    """只读打开缓存数据文件：未压缩时返回 mmap 视图，压缩时返回 CompressedBlob（资源追加到 resources）"""
+    return wrap_blob_data(map_file_readonly(path, resources), resources)
+
+
+SEARCH_BLOCK_BYTES = 8 * 1024 * 1024  # 搜索时每次解码的数据块大小（按行边界对齐）
+SEARCH_SNIPPET_CHARS = 200  # 匹配结果中内容片段的最大字符数
+
+
+class SearchMatcher:
+    """
+    多关键词搜索匹配器
+    
+    每个关键词编译为独立的模式，各自扫描后按位置归并：CPython 的 re 对单个字面量有
+    快速查找路径，而多分支选择（kw1|kw2）和 IGNORECASE 会退化为逐字符匹配，慢一个数量级。
+    因此忽略大小写的字面量在小写化后的文本上匹配，完整单词匹配先查找字面量再检查边界。
+    """
+    
+    def __init__(self, keywords: List[str], regex: bool = False, whole_word: bool = False,
+                 case_sensitive: bool = False):
+        """
+        Raises:
+            ValueError: 关键词为空或模式会匹配空字符串
+            re.error: 正则表达式无效
+        """
+        if not keywords or any(not keyword for keyword in keywords):
+            raise ValueError("搜索关键词不能为空")
         
-        server_type = server_config.get("type", "stdio").lower()
-        timeout = server_config.get("timeout", 30)
+        self.keywords = keywords
+        self.regex = regex
+        self.fold = not case_sensitive and not regex  # 字面量忽略大小写：在小写化文本上匹配
+        self.check_boundary = whole_word and not regex  # 字面量完整单词：匹配后检查边界
+        self.literals = [keyword.lower() for keyword in keywords] if self.fold else list(keywords)
         
-        try:
-            print(f"正在初始化服务器 {server_name} (类型: {server_type})...")
-            
-            if server_type == "sse":
-                # SSE 类型服务器
-                await self._init_sse_server(server_name, server_config, timeout)
+        if regex:
+            flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+            self.patterns = []
+            for keyword in keywords:
+                # 不使用 \b：关键词以非单词字符开头或结尾时 \b 不成立
+                body = rf"(?<!\w)(?:{keyword})(?!\w)" if whole_word else keyword
+                pattern = re.compile(body, flags)
+                if pattern.search("") is not None:
+                    raise ValueError("搜索模式不能匹配空字符串")
+                self.patterns.append(pattern)
+            self.fallback_patterns = self.patterns
+        else:
+            self.patterns = [re.compile(re.escape(literal)) for literal in self.literals]
+            # 小写化改变文本长度（极少数字符）时位置无法对应，退回原文本上的 IGNORECASE 匹配
+            self.fallback_patterns = [re.compile(re.escape(keyword), re.IGNORECASE) for keyword in keywords]
+    
+    def prepare(self, text: str) -> Tuple[str, List["re.Pattern"], bool]:
+        """返回 (用于匹配的文本, 模式列表, 是否可用 str.count 计数)，匹配位置与原文本一致"""
+        if not self.fold:
+            return text, self.patterns, not self.regex and not self.check_boundary
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered, self.patterns, not self.check_boundary
+        return text, self.fallback_patterns, False
+    
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == "_"
+    
+    def _on_boundary(self, haystack: str, start: int, end: int) -> bool:
+        return ((start == 0 or not self._is_word_char(haystack[start - 1])) and
+                (end >= len(haystack) or not self._is_word_char(haystack[end])))
+    
+    def _iter_pattern(self, haystack: str, pattern: "re.Pattern", slot: int) -> Iterator[Tuple[int, int, int]]:
+        for match in pattern.finditer(haystack):
+            start, end = match.span()
+            if self.check_boundary and not self._on_boundary(haystack, start, end):
+                continue
+            yield start, end, slot
+    
+    def count(self, haystack: str, patterns: List["re.Pattern"], plain: bool) -> List[int]:
+        """统计各关键词的匹配数（纯字面量直接用 str.count）"""
+        if plain:
+            return [haystack.count(literal) for literal in self.literals]
+        return [sum(1 for _ in self._iter_pattern(haystack, pattern, slot))
+                for slot, pattern in enumerate(patterns)]
+    
+    def iter_matches(self, haystack: str, patterns: List["re.Pattern"]) -> Iterator[Tuple[int, int, int]]:
+        """按位置顺序产出所有关键词的匹配 (起始, 结束, 关键词序号)"""
+        return heapq.merge(*(self._iter_pattern(haystack, pattern, slot)
+                             for slot, pattern in enumerate(patterns)))
+
+
+def number_text_blocks(blocks: Iterator[str]) -> Iterator[Tuple[int, str]]:
+    """为连续的文本块附上首行行号"""
+    line_base = 1
+    for text in blocks:
+        yield line_base, text
+        line_base += text.count("\n")
+
+
+def iter_text_blocks(data: Any, block_size: int = SEARCH_BLOCK_BYTES) -> Iterator[str]:
+    """将 UTF-8 字节（bytes、mmap 或 CompressedBlob）按行边界切成大块并逐块解码"""
+    total = len(data)
+    start = 0
+    while start < total:
+        stop = min(start + block_size, total)
+        if stop < total:
+            newline = data.rfind(b"\n", start, stop)
+            if newline >= 0:
+                stop = newline + 1
             else:
-                # stdio 类型服务器
-                await self._init_stdio_server(server_name, server_config, timeout)
-            
-            print(f"✓ 服务器 {server_name} 初始化成功，加载 {len(self.clients[server_name]['tools'])} 个工具")
-        
-        except asyncio.TimeoutError:
-            print(f"✗ 服务器 {server_name} 初始化超时（{timeout}秒）")
-            raise
-        except Exception as e:
-            print(f"✗ 服务器 {server_name} 初始化失败: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
+                # 超长行：退到 UTF-8 字符边界（跳过续字节）
+                while stop > start and data[stop] & 0xC0 == 0x80:
+                    stop -= 1
+        yield bytes(data[start:stop]).decode('utf-8', errors='replace')
+        start = stop
+
+
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+SEARCH_INDEX_MAX_CANDIDATE_RATIO = 0.2  # 候选行超过总行数的该比例时，直接全文扫描更快
+SEARCH_INDEX_CACHE_SIZE = 8  # 内存中最多保留的已载入倒排索引数
+
+
+class TokenIndex:
+    """
+    缓存结果的倒排索引（小写词项 → 包含该词项的行号）
     
-    async def _init_stdio_server(self, server_name: str, server_config: Dict[str, Any], timeout: int):
-        """初始化 stdio 类型服务器"""
-        command = server_config.get("command")
-        if not command:
-            raise ValueError(f"stdio 类型服务器必须指定 command 字段")
-        
-        args = server_config.get("args", [])
-        env = server_config.get("env", {})
-        
-        # 合并环境变量
-        server_env = {**os.environ, **env}
-        
-        print(f"  执行命令: {command} {' '.join(args)}")
-        
-        # 创建服务器参数
-        server_params = StdioServerParameters(
-            command=command,
-            args=args,
-            env=server_env
-        )
-        
-        print(f"  正在启动子进程...")
-        
-        # 使用异步上下文管理器连接到服务器
-        stdio_context = stdio_client(server_params)
-        read, write = await asyncio.wait_for(
-            stdio_context.__aenter__(),
-            timeout=timeout
-        )
-        print(f"  子进程已启动，正在建立会话...")
-        
-        # 创建会话上下文管理器
-        session_context = ClientSession(read, write)
-        session = await asyncio.wait_for(
-            session_context.__aenter__(),
-            timeout=timeout
-        )
-        print(f"  会话已建立，正在初始化...")
+    文件布局: [词表字节数, 词项数, 行号总数, 总行数]（4 个 8 字节整数）
+              + 词表（排序后的词项以 \\n 连接的 UTF-8 字节）
+              + 各词项在词表中的起始字节偏移 + 各词项行号列表的起始位置（词项数 + 1 项）+ 行号
+    查询时在词表上做子串查找得到候选词项，因此关键词可以是词项的一部分。
+    """
+    
+    HEADER = struct.Struct("<4Q")
+    
+    def __init__(self, vocab: bytes, term_offsets: array, posting_starts: array, postings: array, total_lines: int):
+        self.vocab = vocab
+        self.term_offsets = term_offsets
+        self.posting_starts = posting_starts
+        self.postings = postings
+        self.total_lines = total_lines
+    
+    @classmethod
+    def build(cls, data: Any) -> "TokenIndex":
+        """从结果字节构建索引"""
+        lines = bytes(data).decode('utf-8', errors='replace').lower().split("\n")
+        postings_by_term: Dict[str, List[int]] = {}
+        for line_num, line in enumerate(lines, 1):
+            for token in set(SEARCH_TOKEN_PATTERN.findall(line)):
+                postings_by_term.setdefault(token, []).append(line_num)
         
-        try:
-            # 初始化会话
-            await asyncio.wait_for(
-                session.initialize(),
-                timeout=timeout
-            )
-            print(f"  会话初始化完成")
-        except asyncio.TimeoutError:
-            print(f"  ✗ 会话初始化超时")
-            await session_context.__aexit__(None, None, None)
-            await stdio_context.__aexit__(None, None, None)
-            raise
+        vocab_parts = []
+        term_offsets = array('I')
+        posting_starts = array('I', [0])
+        postings = array('I')
+        offset = 0
+        for term in sorted(postings_by_term):
+            encoded = term.encode('utf-8')
+            term_offsets.append(offset)
+            vocab_parts.append(encoded)
+            offset += len(encoded) + 1
+            postings.extend(postings_by_term[term])
+            posting_starts.append(len(postings))
+        return cls(b"\n".join(vocab_parts), term_offsets, posting_starts, postings, len(lines))
+    
+    def to_bytes(self) -> bytes:
+        """序列化为索引文件内容"""
+        header = self.HEADER.pack(len(self.vocab), len(self.term_offsets), len(self.postings), self.total_lines)
+        return b"".join([header, self.vocab, self.term_offsets.tobytes(),
+                         self.posting_starts.tobytes(), self.postings.tobytes()])
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TokenIndex":
+        """从索引文件内容读取"""
+        vocab_size, term_count, posting_count, total_lines = cls.HEADER.unpack_from(data)
+        offset = cls.HEADER.size
+        vocab = data[offset:offset + vocab_size]
+        offset += vocab_size
+        arrays = []
+        for count in (term_count, term_count + 1, posting_count):
+            items = array('I')
+            items.frombytes(data[offset:offset + count * items.itemsize])
+            offset += count * items.itemsize
+            arrays.append(items)
+        return cls(vocab, *arrays, total_lines)
+    
+    def candidate_lines(self, keyword: str, limit: int) -> Optional[set]:
+        """
+        返回可能包含关键词的行号集合（关键词中每个词项都出现的行）
         
-        # 获取工具列表
+        出现在超过 limit 行中的词项不参与筛选；关键词没有词项（如纯符号）
+        或所有词项都过于常见时返回 None，由调用方全文扫描。
+        """
+        candidates: Optional[set] = None
+        for token in set(SEARCH_TOKEN_PATTERN.findall(keyword.lower())):
+            lines = self._token_lines(token, limit)
+            if lines is None:
+                continue
+            candidates = lines if candidates is None else candidates & lines
+            if not candidates:
+                break
+        return candidates
+    
+    def _token_lines(self, token: str, limit: int) -> Optional[set]:
+        """包含 token 作为子串的所有词项的行号并集，超过 limit 行时返回 None"""
+        needle = token.encode('utf-8')
+        lines: set = set()
+        pos = self.vocab.find(needle)
+        while pos >= 0:
+            term_id = bisect.bisect_right(self.term_offsets, pos) - 1
+            lines.update(self.postings[self.posting_starts[term_id]:self.posting_starts[term_id + 1]])
+            if len(lines) > limit:
+                return None
+            # 从下一个词项继续查找，同一词项只计一次
+            next_term = term_id + 1
+            if next_term >= len(self.term_offsets):
+                break
+            pos = self.vocab.find(needle, self.term_offsets[next_term])
+        return lines
+
+
+JSON_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+JSON_SCALAR = re.compile(rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null")
+JSON_MEMBER_KEY = re.compile(rb'[ \t\n\r]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:[ \t\n\r]*', re.DOTALL)
+JSON_SEPARATOR = re.compile(rb"[ \t\n\r]*([,\]}])[ \t\n\r]*")
+JSON_INDENT = re.compile(rb" *")
+# 跳过容器时只关心字符串（整体跳过，内部的括号不计）与括号：分组 1 字符串，2 开括号，3 闭括号
+JSON_STRUCTURE = re.compile(rb'(")[^"\\]*(?:\\.[^"\\]*)*"|([\[{])|([\]}])', re.DOTALL)
+
+
+class JsonScanError(Exception):
+    """缓存内容不是有效的 JSON"""
+    
+    def __init__(self, position: int):
+        self.position = position
+        super().__init__(f"缓存内容不是有效的 JSON（字节偏移 {position}）")
+    
+    def __reduce__(self):
+        # 从计算进程池返回时按字节偏移重建
+        return type(self), (self.position,)
+
+
+class JsonByteScanner:
+    """
+    在序列化字节（bytes 或 mmap）上直接定位 JSON 值的扫描器
+    
+    只记录字节位置：未被选中的值整体跳过，只有被选中的值才解析，
+    因此查询开销主要是一次顺序扫描，内存占用与结果大小无关。
+    indented 表示数据由 dumps_json_bytes 生成（两空格缩进）：非空容器的闭括号
+    位于与开括号所在行缩进相同的新行行首，跳过容器只需一次字节查找。
+    """
+    
+    def __init__(self, data: Any, indented: bool = False):
+        self.data = data
+        self.size = len(data)
+        self.indented = indented
+    
+    def skip_whitespace(self, pos: int) -> int:
+        return JSON_WHITESPACE.match(self.data, pos).end()
+    
+    def peek(self, pos: int) -> int:
+        if pos >= self.size:
+            raise JsonScanError(pos)
+        return self.data[pos]
+    
+    def skip_value(self, pos: int) -> int:
+        """返回从 pos 开始的值的结束位置"""
+        first = self.peek(pos)
+        if first == 0x22:  # "
+            match = JSON_STRING.match(self.data, pos)
+        elif first == 0x7B or first == 0x5B:  # { [
+            return self._skip_container(pos, first)
+        else:
+            match = JSON_SCALAR.match(self.data, pos)
+        if match is None:
+            raise JsonScanError(pos)
+        return match.end()
+    
+    def _skip_container(self, pos: int, first: int) -> int:
+        data = self.data
+        if self.indented and pos + 1 < self.size and data[pos + 1] == 0x0A:
+            line_start = data.rfind(b"\n", 0, pos) + 1
+            indent = JSON_INDENT.match(data, line_start).end() - line_start
+            closer = b"\n" + b" " * indent + (b"}" if first == 0x7B else b"]")
+            end = data.find(closer, pos)
+            if end < 0:
+                raise JsonScanError(pos)
+            return end + len(closer)
+        depth = 0
+        for match in JSON_STRUCTURE.finditer(data, pos):
+            if match.lastindex == 2:
+                depth += 1
+            elif match.lastindex == 3:
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        raise JsonScanError(self.size)
+    
+    def decode(self, pos: int) -> Tuple[Any, int]:
+        """解析从 pos 开始的值，返回 (值, 结束位置)"""
+        end = self.skip_value(pos)
         try:
-            print(f"  正在获取工具列表...")
-            tools_response = await asyncio.wait_for(
-                session.list_tools(),
-                timeout=timeout
-            )
-            tools = tools_response.tools if hasattr(tools_response, 'tools') else []
-            print(f"  成功获取 {len(tools)} 个工具")
-        except asyncio.TimeoutError:
-            print(f"  ✗ 获取工具列表超时")
-            await session_context.__aexit__(None, None, None)
-            await stdio_context.__aexit__(None, None, None)
-            raise
+            return loads_json_bytes(bytes(self.data[pos:end])), end
+        except ValueError:
+            raise JsonScanError(pos)
+    
+    def each_child(self, pos: int, visit: Callable[[Any, int], int]) -> int:
+        """
+        依次访问容器的子值并返回容器的结束位置
         
-        self.clients[server_name] = {
-            "type": "stdio",
+        visit(键或下标, 子值起始位置) 须返回子值的结束位置；pos 处不是容器时直接跳过该值。
+        """
+        first = self.peek(pos)
+        if first == 0x7B:
+            return self._each_member(pos, visit)
+        if first == 0x5B:
+            return self._each_item(pos, visit)
+        return self.skip_value(pos)
+    
+    def count_items(self, pos: int) -> int:
+        """统计数组元素个数（不解析元素）"""
+        data = self.data
+        pos = self.skip_whitespace(pos + 1)
+        if self.peek(pos) == 0x5D:  # ]
+            return 0
+        count = 1
+        while True:
+            match = JSON_SEPARATOR.match(data, self.skip_value(pos))
+            if match is None or match.group(1) == b"}":
+                raise JsonScanError(pos)
+            if match.group(1) == b"]":
+                return count
+            count += 1
+            pos = match.end()
+    
+    def _each_member(self, pos: int, visit: Callable[[Any, int], int]) -> int:
+        data = self.data
+        pos = self.skip_whitespace(pos + 1)
+        if self.peek(pos) == 0x7D:  # }
+            return pos + 1
+        while True:
+            match = JSON_MEMBER_KEY.match(data, pos)
+            if match is None:
+                raise JsonScanError(pos)
+            raw_key = match.group(1)
+            key = raw_key[1:-1].decode('utf-8') if b"\\" not in raw_key else json.loads(raw_key)
+            end = visit(key, match.end())
+            match = JSON_SEPARATOR.match(data, end)
+            if match is None or match.group(1) == b"]":
+                raise JsonScanError(end)
+            if match.group(1) == b"}":
+                return match.end(1)
+            pos = match.end()
+    
+    def _each_item(self, pos: int, visit: Callable[[Any, int], int]) -> int:
+        data = self.data
+        pos = self.skip_whitespace(pos + 1)
+        if self.peek(pos) == 0x5D:
+            return pos + 1
+        index = 0
+        while True:
+            end = visit(index, pos)
+            match = JSON_SEPARATOR.match(data, end)
+            if match is None or match.group(1) == b"}":
+                raise JsonScanError(end)
+            if match.group(1) == b"]":
+                return match.end(1)
+            pos = match.end()
+            index += 1
+
+
+JSONPATH_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    | (?P<regex>/(?:[^/\\]|\\.)*/[a-z]*)
+    | (?P<op>==|!=|<=|>=|=~|&&|\|\||[<>!()@$.\[\]*:,?])
+    | (?P<name>[^\W\d][\w-]*)
+    )""", re.VERBOSE)
+JSONPATH_COMPARISONS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+JSONPATH_MISSING = object()  # 过滤表达式中不存在的字段
+
+
+class JsonPathQuery:
+    """
+    JSONPath 子集查询，在 JsonByteScanner 上单遍求值
+    
+    支持: $ 根节点，.name / ['name'] 字段，.* / [*] 通配，[n] 下标（可为负），[a,b] 并集，
+    [start:end:step] 切片，..name 递归下降，[?(@.a.b > 1 && @.c =~ /x/i)] 过滤；
+    省略开头的 $ 时视为从根节点开始。过滤条件只解析被过滤的子值本身。
+    """
+    
+    def __init__(self, path: str):
+        """
+        Raises:
+            ValueError: 路径语法错误或使用了不支持的写法
+        """
+        path = path.strip()
+        if not path:
+            raise ValueError("查询路径不能为空")
+        if not path.startswith("$"):
+            path = "$" + ("" if path[0] in ".[" else ".") + path
+        self.path = path
+        self.tokens = self._tokenize(path)
+        self.cursor = 1  # 跳过 $
+        self.steps: List[Tuple[bool, str, Any]] = []  # (是否递归下降, 选择器类型, 参数)
+        while self.cursor < len(self.tokens):
+            self.steps.append(self._parse_step())
+        # 递归下降查找字段名时，子树的字节中不含该字段名即可整体跳过（需要能快速定位子树结尾）
+        self.descend_needles: Dict[int, List[bytes]] = {}
+        for step_index, (descend, kind, arg) in enumerate(self.steps):
+            if descend and kind == "names":
+                needles = [json.dumps(name, ensure_ascii=False).encode('utf-8') for name in arg]
+                if not any(b"\\" in needle for needle in needles):
+                    self.descend_needles[step_index] = needles
+        # 只由字段名与非负下标组成的路径最多匹配一个值，找到后即可停止扫描
+        self.definite = all(
+            not descend and (kind == "names" or (kind == "indexes" and arg[0] >= 0)) and len(arg) == 1
+            for descend, kind, arg in self.steps
+        )
+    
+    # ---------- 解析 ----------
+    
+    @staticmethod
+    def _tokenize(text: str) -> List[Tuple[str, str]]:
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = JSONPATH_TOKEN.match(text, pos)
+            if match is None or match.end() == pos:
+                raise ValueError(f"查询路径在位置 {pos} 处无法解析: {text[pos:pos + 20]!r}")
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            pos = match.end()
+        return tokens
+    
+    def _peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.cursor + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+    
+    def _take(self, expected: Optional[str] = None) -> Tuple[str, str]:
+        kind, value = self._peek()
+        if kind is None or (expected is not None and value != expected):
+            raise ValueError(f"查询路径语法错误: 期望 {expected or '更多内容'}，实际为 {value!r}")
+        self.cursor += 1
+        return kind, value
+    
+    def _parse_step(self) -> Tuple[bool, str, Any]:
+        kind, value = self._take()
+        if value == "[":
+            return (False,) + self._parse_bracket()
+        if value != ".":
+            raise ValueError(f"查询路径语法错误: 意外的 {value!r}")
+        descend = self._peek()[1] == "."
+        if descend:
+            self._take()
+            if self._peek()[1] == "[":
+                self._take()
+                return (True,) + self._parse_bracket()
+        kind, value = self._take()
+        if value == "*":
+            return descend, "wildcard", None
+        if kind != "name":
+            raise ValueError(f"查询路径语法错误: 字段名无效 {value!r}")
+        return descend, "names", [value]
+    
+    def _parse_bracket(self) -> Tuple[str, Any]:
+        kind, value = self._peek()
+        if value == "*":
+            self._take()
+            self._take("]")
+            return "wildcard", None
+        if value == "?":
+            self._take()
+            expression = self._parse_or()
+            self._take("]")
+            return "filter", expression
+        if kind == "string":
+            names = [self._unquote(self._take()[1])]
+            while self._peek()[1] == ",":
+                self._take()
+                kind, value = self._take()
+                if kind != "string":
+                    raise ValueError("字段名并集中只能使用带引号的字段名")
+                names.append(self._unquote(value))
+            self._take("]")
+            return "names", names
+        
+        # 下标、下标并集或切片
+        bounds: List[Optional[int]] = [None]
+        while self._peek()[1] != "]":
+            kind, value = self._take()
+            if value == ":":
+                bounds.append(None)
+            elif kind == "number" and bounds[-1] is None and "." not in value and "e" not in value.lower():
+                bounds[-1] = int(value)
+            elif value == "," and len(bounds) == 1 and bounds[0] is not None:
+                return "indexes", self._parse_index_union(bounds[0])
+            else:
+                raise ValueError(f"查询路径语法错误: 下标或切片无效 {value!r}")
+        self._take("]")
+        if len(bounds) == 1:
+            if bounds[0] is None:
+                raise ValueError("查询路径语法错误: [] 中缺少下标")
+            return "indexes", bounds
+        if len(bounds) > 3:
+            raise ValueError("查询路径语法错误: 切片最多包含 start:end:step")
+        step = bounds[2] if len(bounds) == 3 and bounds[2] is not None else 1
+        if step <= 0:
+            raise ValueError("切片步长必须为正数")
+        return "slice", (bounds[0], bounds[1], step)
+    
+    def _parse_index_union(self, first: int) -> List[int]:
+        indexes = [first]
+        while True:
+            kind, value = self._take()
+            if kind != "number" or "." in value:
+                raise ValueError(f"查询路径语法错误: 下标无效 {value!r}")
+            indexes.append(int(value))
+            separator = self._take()[1]
+            if separator == "]":
+                return indexes
+            if separator != ",":
+                raise ValueError(f"查询路径语法错误: 下标并集中意外的 {separator!r}")
+    
+    @staticmethod
+    def _unquote(literal: str) -> str:
+        if literal[0] == '"':
+            return json.loads(literal)
+        return re.sub(r"\\(.)", r"\1", literal[1:-1])
+    
+    def _parse_or(self) -> Callable[[Any], bool]:
+        left = self._parse_and()
+        while self._peek()[1] == "||":
+            self._take()
+            right = self._parse_and()
+            left = (lambda a, b: lambda value: a(value) or b(value))(left, right)
+        return left
+    
+    def _parse_and(self) -> Callable[[Any], bool]:
+        left = self._parse_unary()
+        while self._peek()[1] == "&&":
+            self._take()
+            right = self._parse_unary()
+            left = (lambda a, b: lambda value: a(value) and b(value))(left, right)
+        return left
+    
+    def _parse_unary(self) -> Callable[[Any], bool]:
+        value = self._peek()[1]
+        if value == "!":
+            self._take()
+            inner = self._parse_unary()
+            return lambda item: not inner(item)
+        if value == "(":
+            self._take()
+            inner = self._parse_or()
+            self._take(")")
+            return inner
+        return self._parse_comparison()
+    
+    def _parse_comparison(self) -> Callable[[Any], bool]:
+        left = self._parse_operand()
+        op = self._peek()[1]
+        if op == "=~":
+            self._take()
+            kind, literal = self._take()
+            if kind == "regex":
+                body, _, flags = literal[1:].rpartition("/")
+                pattern = re.compile(body, re.IGNORECASE if "i" in flags else 0)
+            elif kind == "string":
+                pattern = re.compile(self._unquote(literal))
+            else:
+                raise ValueError("=~ 右侧必须是 /正则/ 或字符串")
+            return lambda item: isinstance(left(item), str) and pattern.search(left(item)) is not None
+        if op in JSONPATH_COMPARISONS:
+            self._take()
+            right = self._parse_operand()
+            compare = JSONPATH_COMPARISONS[op]
+            return lambda item: self._compare(left(item), right(item), op, compare)
+        # 单独的 @.field 表示字段存在
+        return lambda item: left(item) is not JSONPATH_MISSING
+    
+    def _parse_operand(self) -> Callable[[Any], Any]:
+        kind, value = self._take()
+        if value == "@":
+            keys: List[Any] = []
+            while self._peek()[1] in (".", "["):
+                if self._take()[1] == ".":
+                    kind, name = self._take()
+                    if kind != "name":
+                        raise ValueError(f"查询路径语法错误: 字段名无效 {name!r}")
+                    keys.append(name)
+                else:
+                    kind, key = self._take()
+                    if kind == "string":
+                        keys.append(self._unquote(key))
+                    elif kind == "number" and "." not in key:
+                        keys.append(int(key))
+                    else:
+                        raise ValueError(f"查询路径语法错误: 过滤条件中的下标无效 {key!r}")
+                    self._take("]")
+            return lambda item: self._lookup(item, keys)
+        if kind == "number":
+            literal = json.loads(value)
+        elif kind == "string":
+            literal = self._unquote(value)
+        elif kind == "name" and value in ("true", "false", "null"):
+            literal = json.loads(value)
+        else:
+            raise ValueError(f"查询路径语法错误: 过滤条件中的值无效 {value!r}")
+        return lambda item: literal
+    
+    @staticmethod
+    def _lookup(item: Any, keys: List[Any]) -> Any:
+        for key in keys:
+            if isinstance(key, int) and isinstance(item, list):
+                if not -len(item) <= key < len(item):
+                    return JSONPATH_MISSING
+            elif not (isinstance(key, str) and isinstance(item, dict) and key in item):
+                return JSONPATH_MISSING
+            item = item[key]
+        return item
+    
+    @staticmethod
+    def _compare(left: Any, right: Any, op: str, compare: Callable[[Any, Any], bool]) -> bool:
+        if left is JSONPATH_MISSING or right is JSONPATH_MISSING:
+            return op == "!=" and left is not right
+        # 布尔值不与数字比较；大小比较只在两侧同为数字或同为字符串时成立
+        left_number = isinstance(left, (int, float)) and not isinstance(left, bool)
+        right_number = isinstance(right, (int, float)) and not isinstance(right, bool)
+        if op in ("==", "!="):
+            same_type = left_number and right_number or type(left) is type(right)
+            return compare(left, right) if same_type else op == "!="
+        if left_number and right_number or isinstance(left, str) and isinstance(right, str):
+            return compare(left, right)
+        return False
+    
+    # ---------- 求值 ----------
+    
+    def evaluate(self, data: Any, max_results: int = 100, count_only: bool = False,
+                 indented: bool = False) -> Dict[str, Any]:
+        """
+        在序列化字节上求值（indented 见 JsonByteScanner）
+        
+        Returns:
+            {"total_matches": 精确匹配数, "matches": [{"path": 规范化路径, "value": 值}], "truncated": 是否截断}
+        
+        Raises:
+            JsonScanError: 数据不是有效的 JSON
+        """
+        scanner = JsonByteScanner(data, indented)
+        matches: List[Dict[str, Any]] = []
+        total = 0
+        trail: List[Any] = []
+        
+        class Done(Exception):
+            pass
+        
+        def emit(pos: int) -> int:
+            nonlocal total
+            total += 1
+            if count_only or len(matches) >= max_results:
+                end = scanner.skip_value(pos)
+            else:
+                value, end = scanner.decode(pos)
+                matches.append({"path": self._format_path(trail), "value": value})
+            if self.definite:
+                raise Done()
+            return end
+        
+        def walk(pos: int, step_index: int) -> int:
+            """对 pos 处的值应用第 step_index 步及之后的选择器，返回该值的结束位置"""
+            if step_index == len(self.steps):
+                return emit(pos)
+            descend, kind, arg = self.steps[step_index]
+            first = scanner.peek(pos)
+            if first != 0x7B and first != 0x5B:
+                return scanner.skip_value(pos)
+            needles = self.descend_needles.get(step_index) if scanner.indented else None
+            if needles is not None:
+                end = scanner.skip_value(pos)
+                if not any(scanner.data.find(needle, pos, end) >= 0 for needle in needles):
+                    return end
+            selected = self._selector(scanner, pos, kind, arg)
+            
+            def visit(key: Any, child: int) -> int:
+                trail.append(key)
+                try:
+                    end = None
+                    if selected(key, child):
+                        end = walk(child, step_index + 1)
+                    if descend:
+                        # 递归下降：在子值内部继续查找同一步（已选中的子值需要再扫描一遍）
+                        end = walk(child, step_index)
+                    return end if end is not None else scanner.skip_value(child)
+                finally:
+                    trail.pop()
+            
+            return scanner.each_child(pos, visit)
+        
+        try:
+            walk(scanner.skip_whitespace(0), 0)
+        except Done:
+            pass
+        return {
+            "total_matches": total,
+            "matches": matches,
+            "truncated": total > len(matches) and not count_only
+        }
+    
+    @staticmethod
+    def _selector(scanner: JsonByteScanner, pos: int, kind: str, arg: Any) -> Callable[[Any, int], bool]:
+        """返回判断容器子值是否被选中的函数 (键或下标, 子值位置) -> bool"""
+        is_array = scanner.peek(pos) == 0x5B
+        if kind == "wildcard":
+            return lambda key, child: True
+        if kind == "names":
+            names = set(arg)
+            return lambda key, child: not is_array and key in names
+        if kind == "filter":
+            return lambda key, child: arg(scanner.decode(child)[0])
+        if not is_array:
+            return lambda key, child: False
+        
+        start, stop, step = arg if kind == "slice" else (None, None, None)
+        needs_count = (any(index < 0 for index in arg) if kind == "indexes"
+                       else (start or 0) < 0 or (stop or 0) < 0)
+        count = scanner.count_items(pos) if needs_count else None
+        if kind == "indexes":
+            indexes = {index + count if index < 0 else index for index in arg} if count is not None else set(arg)
+            return lambda key, child: key in indexes
+        if count is not None:
+            start, stop, step = slice(start, stop, step).indices(count)
+        else:
+            start = start or 0
+        return lambda key, child: key >= start and (stop is None or key < stop) and (key - start) % step == 0
+    
+    @staticmethod
+    def _format_path(trail: List[Any]) -> str:
+        return "$" + "".join(f"[{key}]" if isinstance(key, int) else f"[{json.dumps(key, ensure_ascii=False)}]"
+                             for key in trail)
+
+
+BLOB_SIDECAR_SUFFIXES = (".lines", ".pages", ".tokens")  # blob 的索引文件：行偏移索引、分页索引、倒排索引
+BLOB_GC_GRACE_SECONDS = 60  # 无别名引用的 blob 至少保留的秒数（避免回收刚写入、别名尚未落盘的数据）
+
+
+class ResultEnvelope:
+    """
+    缓存结果信封
+    
+    结果只在创建时序列化一次为 UTF-8 字节（字符串原样编码，其他内容为缩进 JSON），
+    之后计算大小、写入各级缓存、分段读取和搜索都复用这份字节，文本与解析结果按需惰性生成。
+    """
+    
+    __slots__ = ("data", "size", "kind", "_text", "_value", "_has_value", "_digest", "_line_offsets", "_page_table")
+    
+    def __init__(self, data: bytes, kind: Optional[str] = None):
+        self.data = data
+        self.size = len(data)
+        self.kind = kind  # "text" 原始字符串，"json" JSON 内容，None 未知（旧格式缓存文件）
+        self._text: Optional[str] = None
+        self._value: Any = None
+        self._has_value = False
+        self._digest: Optional[str] = None
+        self._line_offsets: Optional[array] = None
+        self._page_table: Optional[array] = None
+    
+    @classmethod
+    def from_content(cls, content: Any) -> "ResultEnvelope":
+        """由工具结果创建信封"""
+        if isinstance(content, str):
+            envelope = cls(content.encode('utf-8'), "text")
+            envelope._text = content
+        else:
+            envelope = cls(dumps_json_bytes(content), "json")
+        envelope._value = content
+        envelope._has_value = True
+        return envelope
+    
+    @classmethod
+    def from_prepared(cls, content: Any, data: bytes, kind: str, digest: str,
+                      line_offsets: bytes, page_table: bytes) -> "ResultEnvelope":
+        """由计算进程池预先生成的字节、内容哈希与索引表创建信封（见 serialize_result_task）"""
+        envelope = cls(data, kind)
+        if kind == "text":
+            envelope._text = content
+        envelope._value = content
+        envelope._has_value = True
+        envelope._digest = digest
+        envelope._line_offsets = array('Q')
+        envelope._line_offsets.frombytes(line_offsets)
+        envelope._page_table = array('Q')
+        envelope._page_table.frombytes(page_table)
+        return envelope
+    
+    @property
+    def digest(self) -> str:
+        """内容哈希（包含 kind，相同字节但类型不同的结果不会合并），用作缓存 blob 的键"""
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update((self.kind or "").encode('ascii') + b"\0")
+            hasher.update(self.data)
+            self._digest = hasher.hexdigest()
+        return self._digest
+    
+    @property
+    def line_offsets(self) -> array:
+        """每行起始字节偏移（惰性构建，写入文件缓存时作为行索引落盘）"""
+        if self._line_offsets is None:
+            self._line_offsets = build_line_offsets(self.data)
+        return self._line_offsets
+    
+    @property
+    def page_table(self) -> array:
+        """分页索引表（惰性构建，写入文件缓存时落盘），见 build_page_table"""
+        if self._page_table is None:
+            self._page_table = build_page_table(self)
+        return self._page_table
+    
+    @property
+    def text(self) -> str:
+        """结果的文本表示（分段、搜索、上下文读取均基于此）"""
+        if self._text is None:
+            self._text = self.data.decode('utf-8')
+        return self._text
+    
+    @property
+    def value(self) -> Any:
+        """结果的原始值（JSON 内容会被解析）"""
+        if not self._has_value:
+            if self.kind == "text":
+                self._value = self.text
+            else:
+                try:
+                    self._value = loads_json_bytes(self.data)
+                except ValueError:
+                    # 旧格式缓存中的非 JSON 字符串
+                    self._value = self.text
+            self._has_value = True
+        return self._value
+
+
+class MemoryCacheTier:
+    """
+    按字节预算管理的内存缓存层（内容寻址）
+    
+    结果字节按内容哈希存储为 blob，cache_id 只是指向 blob 的别名，
+    相同内容的多次缓存只占用一份内存。blob 的过期时间取其所有别名中最晚的一个。
+    LRU 顺序由 OrderedDict 维护，过期时间由最小堆维护（惰性删除），
+    插入和过期清理均为 O(log n)。超出预算时淘汰最久未使用的 blob，
+    并通过 on_evict 回调连同其别名交给下一级缓存（降级而非丢弃）。
+    回调在释放锁之后调用；降级完成（finish_demotion）之前，被淘汰的别名仍可从本层读取。
+    """
+    
+    def __init__(self, max_bytes: int,
+                 on_evict: Optional[Callable[[ResultEnvelope, List[Tuple[str, float]]], None]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.entries: OrderedDict = OrderedDict()  # digest -> (envelope, expires_at)
+        self.aliases: Dict[str, Tuple[str, float]] = {}  # cache_id -> (digest, expires_at)
+        self.blob_aliases: Dict[str, set] = {}  # digest -> 引用该 blob 的 cache_id 集合
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.demoting: Dict[str, Tuple[ResultEnvelope, float]] = {}  # 正在降级的别名 -> (envelope, expires_at)
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+        # 统计信息
+        self.evictions = 0
+        self.expirations = 0
+        self.dedup_hits = 0
+    
+    def put(self, cache_id: str, envelope: ResultEnvelope, expires_at: float) -> bool:
+        """
+        为结果创建别名 cache_id，必要时淘汰旧条目
+        
+        Returns:
+            是否写入了新的 blob（内容已存在时只增加别名，返回 False）
+        """
+        digest = envelope.digest
+        evicted = []
+        with self.lock:
+            self.pop(cache_id)
+            self.purge_expired()
+            
+            item = self.entries.get(digest)
+            if item is not None:
+                # 相同内容已缓存：只增加别名，必要时延长 blob 的过期时间
+                stored, blob_expires_at = item
+                if expires_at > blob_expires_at:
+                    self.entries[digest] = (stored, expires_at)
+                    heapq.heappush(self.expiry_heap, (expires_at, digest))
+                self.entries.move_to_end(digest)
+                self._link(cache_id, digest, expires_at)
+                self.dedup_hits += 1
+                return False
+            
+            # 按 LRU 顺序淘汰，直到能容纳新条目（降级在释放锁之后进行）
+            while self.entries and self.total_bytes + envelope.size > self.max_bytes:
+                old_digest, (old_envelope, _) = self.entries.popitem(last=False)
+                self.total_bytes -= old_envelope.size
+                old_aliases = self._unlink_all(old_digest)
+                self.evictions += 1
+                if self.on_evict and old_aliases:
+                    for old_id, old_expires_at in old_aliases:
+                        self.demoting[old_id] = (old_envelope, old_expires_at)
+                    evicted.append((old_envelope, old_aliases))
+            
+            self.entries[digest] = (envelope, expires_at)
+            self.total_bytes += envelope.size
+            heapq.heappush(self.expiry_heap, (expires_at, digest))
+            self._link(cache_id, digest, expires_at)
+        
+        for old_envelope, old_aliases in evicted:
+            try:
+                self.on_evict(old_envelope, old_aliases)
+            except Exception as e:
+                print(f"缓存降级失败 ({old_envelope.digest}): {e}")
+                self.finish_demotion([old_id for old_id, _ in old_aliases])
+        return True
+    
+    def finish_demotion(self, cache_ids: List[str]):
+        """降级写入完成（或失败）后，不再从本层提供这些别名"""
+        with self.lock:
+            for cache_id in cache_ids:
+                self.demoting.pop(cache_id, None)
+    
+    def get(self, cache_id: str) -> Optional[ResultEnvelope]:
+        """通过别名获取 blob 并更新 LRU 顺序，过期返回 None"""
+        with self.lock:
+            alias = self.aliases.get(cache_id)
+            if alias is None:
+                # 已被淘汰、正在降级的别名
+                demoting = self.demoting.get(cache_id)
+                if demoting is not None and time.time() <= demoting[1]:
+                    return demoting[0]
+                return None
+            
+            digest, expires_at = alias
+            if time.time() > expires_at:
+                self.pop(cache_id)
+                self.expirations += 1
+                return None
+            
+            item = self.entries.get(digest)
+            if item is None:
+                return None
+            
+            # 移动到末尾（LRU策略）
+            self.entries.move_to_end(digest)
+            return item[0]
+    
+    def pop(self, cache_id: str) -> Optional[ResultEnvelope]:
+        """移除别名，最后一个别名移除时同时释放 blob，返回对应的信封"""
+        with self.lock:
+            alias = self.aliases.pop(cache_id, None)
+            if alias is None:
+                return None
+            
+            digest = alias[0]
+            item = self.entries.get(digest)
+            refs = self.blob_aliases.get(digest)
+            if refs is not None:
+                refs.discard(cache_id)
+                if not refs:
+                    self._remove(digest)
+            return item[0] if item else None
+    
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """清理已过期的 blob（及其全部别名），返回清理数量"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self.lock:
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                expires_at, digest = heapq.heappop(self.expiry_heap)
+                item = self.entries.get(digest)
+                # 堆中可能残留已被淘汰或延长过期时间的旧记录
+                if item is not None and item[1] == expires_at:
+                    self._remove(digest)
+                    removed += 1
+            
+            # 残留记录过多时重建堆
+            if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+                self.expiry_heap = [(exp, k) for k, (_, exp) in self.entries.items()]
+                heapq.heapify(self.expiry_heap)
+            
+            self.expirations += removed
+        return removed
+    
+    def _link(self, cache_id: str, digest: str, expires_at: float):
+        self.aliases[cache_id] = (digest, expires_at)
+        self.blob_aliases.setdefault(digest, set()).add(cache_id)
+    
+    def _unlink_all(self, digest: str) -> List[Tuple[str, float]]:
+        """移除 blob 的全部别名，返回 (cache_id, 过期时间) 列表"""
+        unlinked = []
+        for cache_id in self.blob_aliases.pop(digest, ()):
+            alias = self.aliases.pop(cache_id, None)
+            if alias is not None:
+                unlinked.append((cache_id, alias[1]))
+        return unlinked
+    
+    def _remove(self, digest: str):
+        item = self.entries.pop(digest, None)
+        if item is not None:
+            self.total_bytes -= item[0].size
+        self._unlink_all(digest)
+    
+    def __contains__(self, cache_id: str) -> bool:
+        return cache_id in self.aliases or cache_id in self.demoting
+    
+    def __len__(self) -> int:
+        return len(self.aliases)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self.lock:
+            return {
+                "items": len(self.aliases),
+                "blobs": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "demoting": len(self.demoting),
+                "expirations": self.expirations,
+                "dedup_hits": self.dedup_hits
+            }
+
+
+class SqliteCacheTier:
+    """
+    文件缓存的 SQLite 存储后端（单个 WAL 模式数据库，替代每个条目一组文件）
+    
+    blobs 记录内容哈希对应的元数据；blob_parts 保存数据本体（.blob）与各索引（.lines/.pages/.tokens），
+    这些行写入后不再原地修改，读取方打开的增量 BLOB 句柄不会因其他写入失效；aliases 为 cache_id 别名。
+    每次写入在一个事务内完成，过期清理是一条 DELETE。连接在线程间共享，语句执行由锁串行化。
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            digest TEXT PRIMARY KEY,
+            kind TEXT,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            compression TEXT,
+            created_at REAL NOT NULL,
+            touched_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blob_parts (
+            id INTEGER PRIMARY KEY,
+            digest TEXT NOT NULL,
+            part TEXT NOT NULL,
+            data BLOB NOT NULL,
+            UNIQUE (digest, part)
+        );
+        CREATE TABLE IF NOT EXISTS aliases (
+            cache_id TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS aliases_expires_at ON aliases (expires_at);
+        CREATE INDEX IF NOT EXISTS aliases_digest ON aliases (digest);
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        with self.lock:
+            # auto_vacuum 只对新数据库生效，必须在建表之前设置
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.executescript(self.SCHEMA)
+    
+    def touch_blob(self, digest: str, now: float) -> Optional[Tuple[Optional[str], int]]:
+        """blob 已存在时刷新其使用时间并返回 (压缩算法, 存储大小)，否则返回 None"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT compression, stored_size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is not None:
+                self.conn.execute("UPDATE blobs SET touched_at = ? WHERE digest = ?", (now, digest))
+        return row
+    
+    def put(self, cache_id: str, metadata: Dict[str, Any], parts: Optional[Dict[str, bytes]] = None):
+        """在一个事务内写入别名，parts 不为空时同时写入新的 blob 及其各部分"""
+        digest = metadata["blob"]
+        with self.lock, self.conn:
+            if parts is not None:
+                inserted = self.conn.execute(
+                    "INSERT OR IGNORE INTO blobs (digest, kind, size, stored_size, compression, created_at, touched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, metadata["kind"], metadata["size"], metadata["stored_size"], metadata["compression"],
+                     metadata["created_at"], metadata["created_at"])).rowcount
+                if inserted:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO blob_parts (digest, part, data) VALUES (?, ?, ?)",
+                        [(digest, part, data) for part, data in parts.items()])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO aliases (cache_id, digest, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (cache_id, digest, metadata["created_at"], metadata["expires_at"]))
+    
+    def get(self, cache_id: str, now: float) -> Optional[Dict[str, Any]]:
+        """读取别名的元数据（与 .meta 文件格式相同），不存在或已过期时返回 None（过期的别名会被删除）"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT a.digest, a.created_at, a.expires_at, b.size, b.stored_size, b.compression, b.kind"
+                " FROM aliases a JOIN blobs b ON b.digest = a.digest WHERE a.cache_id = ?", (cache_id,)).fetchone()
+            if row is None:
+                return None
+            if now > row[2]:
+                with self.conn:
+                    self.conn.execute("DELETE FROM aliases WHERE cache_id = ?", (cache_id,))
+                return None
+        digest, created_at, expires_at, size, stored_size, compression, kind = row
+        return {"store": "sqlite", "blob": digest, "created_at": created_at, "expires_at": expires_at,
+                "size": size, "stored_size": stored_size, "compression": compression, "kind": kind}
+    
+    def has_part(self, digest: str, part: str) -> bool:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM blob_parts WHERE digest = ? AND part = ?", (digest, part)).fetchone() is not None
+    
+    def read_part(self, digest: str, part: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data FROM blob_parts WHERE digest = ? AND part = ?", (digest, part)).fetchone()
+        return row[0] if row is not None else None
+    
+    def write_part(self, digest: str, part: str, data: bytes):
+        """写入 blob 的一个部分（blob 已被回收时忽略）"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO blob_parts (digest, part, data)"
+                " SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM blobs WHERE digest = ?)",
+                (digest, part, data, digest))
+    
+    def delete_part(self, digest: str, part: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM blob_parts WHERE digest = ? AND part = ?", (digest, part))
+    
+    def open_part(self, digest: str, part: str) -> Any:
+        """打开 blob 某个部分的只读增量 BLOB 句柄，不存在时抛出 FileNotFoundError"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id FROM blob_parts WHERE digest = ? AND part = ?", (digest, part)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"{digest}{part}")
+            return open_sqlite_blob(self.conn, row[0], self.lock)
+    
+    def _delete_blobs(self, digests: List[str]) -> int:
+        """删除 blob 及其各部分，返回释放的字节数（须在事务内调用）"""
+        reclaimed = 0
+        for digest in digests:
+            reclaimed += self.conn.execute(
+                "SELECT COALESCE(SUM(length(data)), 0) FROM blob_parts WHERE digest = ?", (digest,)).fetchone()[0]
+            self.conn.execute("DELETE FROM blob_parts WHERE digest = ?", (digest,))
+            self.conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        return reclaimed
+    
+    def sweep(self, now: float, quota: int) -> Dict[str, int]:
+        """
+        删除过期别名，回收无别名引用的 blob，再按磁盘配额从最旧的数据开始淘汰（连同引用它的全部别名）
+        """
+        with self.lock:
+            with self.conn:
+                blobs = self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+                expired_removed = self.conn.execute("DELETE FROM aliases WHERE expires_at < ?", (now,)).rowcount
+                orphans = [row[0] for row in self.conn.execute(
+                    "SELECT digest FROM blobs WHERE touched_at < ?"
+                    " AND NOT EXISTS (SELECT 1 FROM aliases WHERE aliases.digest = blobs.digest)",
+                    (now - BLOB_GC_GRACE_SECONDS,))]
+                bytes_reclaimed = self._delete_blobs(orphans)
+            
+            quota_removed = 0
+            usage = self.conn.execute("SELECT COALESCE(SUM(length(data)), 0) FROM blob_parts").fetchone()[0]
+            if quota > 0 and usage > quota:
+                groups = self.conn.execute(
+                    "SELECT a.digest, MAX(a.created_at) AS latest,"
+                    " (SELECT COALESCE(SUM(length(p.data)), 0) FROM blob_parts p WHERE p.digest = a.digest)"
+                    " FROM aliases a GROUP BY a.digest ORDER BY latest").fetchall()
+                with self.conn:
+                    for digest, _, size in groups:
+                        if usage <= quota:
+                            break
+                        quota_removed += self.conn.execute(
+                            "DELETE FROM aliases WHERE digest = ?", (digest,)).rowcount
+                        bytes_reclaimed += self._delete_blobs([digest])
+                        usage -= size
+            
+            if bytes_reclaimed:
+                # 把空闲页归还给文件系统
+                self.conn.execute("PRAGMA incremental_vacuum").fetchall()
+        
+        return {
+            "files_scanned": blobs,
+            "expired_removed": expired_removed,
+            "quota_removed": quota_removed,
+            "blobs_collected": len(orphans),
+            "bytes_reclaimed": bytes_reclaimed,
+            "disk_usage_bytes": usage
+        }
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_blob_location(location: Tuple[str, ...], resources: List[Any]) -> Any:
+    """
+    按位置描述只读打开缓存数据（供计算进程池中的任务使用，资源追加到 resources）
+    
+    位置为 ("file", 数据文件路径) 或 ("sqlite", 数据库路径, 内容哈希)，后者以只读方式单独连接数据库。
+    """
+    if location[0] == "file":
+        return open_blob_readonly(Path(location[1]), resources)
+    _, db_path, digest = location
+    conn = sqlite3.connect(Path(db_path).as_uri() + "?mode=ro", uri=True)
+    resources.append(conn)
+    row = conn.execute("SELECT id FROM blob_parts WHERE digest = ? AND part = '.blob'", (digest,)).fetchone()
+    if row is None:
+        raise FileNotFoundError(f"{digest}.blob")
+    view = SqliteBlobView(open_sqlite_blob(conn, row[0]))
+    resources.append(view)
+    return wrap_blob_data(view, resources)
+
+
+def serialize_result_task(payload: bytes) -> Tuple[bytes, str, str, bytes, bytes]:
+    """进程池任务：序列化 pickle 后的工具结果，返回 (字节, kind, 内容哈希, 行偏移索引, 分页索引)"""
+    envelope = ResultEnvelope.from_content(pickle.loads(payload))
+    return (envelope.data, envelope.kind, envelope.digest,
+            envelope.line_offsets.tobytes(), envelope.page_table.tobytes())
+
+
+def search_blob_task(location: Tuple[str, ...], keywords: List[str], regex: bool, whole_word: bool,
+                     case_sensitive: bool, max_results: int) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """进程池任务：全文扫描缓存数据，返回 (前 max_results 个匹配详情, 各关键词匹配数)"""
+    resources: List[Any] = []
+    try:
+        data = open_blob_location(location, resources)
+        matcher = SearchMatcher(keywords, regex, whole_word, case_sensitive)
+        return MCPManager._search_blocks(number_text_blocks(iter_text_blocks(data)), matcher, max_results)
+    finally:
+        close_resources(resources)
+
+
+def query_blob_task(location: Tuple[str, ...], path: str, max_results: int, count_only: bool,
+                    indented: bool) -> Dict[str, Any]:
+    """进程池任务：在缓存数据上求值 JSONPath 查询"""
+    resources: List[Any] = []
+    try:
+        data = open_blob_location(location, resources)
+        if isinstance(data, ByteRangeView):
+            data = bytes(data)
+        return JsonPathQuery(path).evaluate(data, max_results, count_only, indented=indented)
+    finally:
+        close_resources(resources)
+
+
+def build_token_index_task(location: Tuple[str, ...]) -> bytes:
+    """进程池任务：为缓存数据建立倒排索引，返回索引文件内容"""
+    resources: List[Any] = []
+    try:
+        return TokenIndex.build(open_blob_location(location, resources)).to_bytes()
+    finally:
+        close_resources(resources)
+
+
+class ServerBusyError(Exception):
+    """服务并发已满且等待队列已满"""
+    
+    def __init__(self, server_name: str, max_concurrency: int, max_queue_size: int):
+        self.server_name = server_name
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        super().__init__(
+            f"服务 {server_name} 繁忙：并发已达上限 ({max_concurrency})，等待队列已满 ({max_queue_size})，请稍后重试"
+        )
+    
+    def __reduce__(self):
+        # 多进程模式下经 IPC 从监督者传回工作进程时按原参数重建
+        return type(self), (self.server_name, self.max_concurrency, self.max_queue_size)
+
+
+class ToolTimeoutError(Exception):
+    """工具调用超时"""
+    
+    def __init__(self, server_name: str, tool_name: str, timeout: float):
+        self.server_name = server_name
+        self.tool_name = tool_name
+        self.timeout = timeout
+        super().__init__(f"工具 {tool_name} (服务: {server_name}) 调用超时（{timeout}秒），已取消")
+    
+    def __reduce__(self):
+        return type(self), (self.server_name, self.tool_name, self.timeout)
+
+
+class ServerCallLimiter:
+    """
+    单个服务的调用准入控制
+    
+    并发数达到上限后，新调用进入有界 FIFO 队列按到达顺序获得执行槽位；
+    队列也满时立即抛出 ServerBusyError，而不是继续堆积协程。
+    """
+    
+    def __init__(self, server_name: str, max_concurrency: int, max_queue_size: int):
+        self.server_name = server_name
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max(0, max_queue_size)
+        self.active = 0
+        self.waiters: deque = deque()
+        # 统计信息
+        self.total_calls = 0
+        self.rejected_calls = 0
+        self.total_wait_time = 0.0
+    
+    async def acquire(self) -> float:
+        """获取执行槽位，返回排队等待的秒数"""
+        if self.max_concurrency <= 0 or (self.active < self.max_concurrency and not self.waiters):
+            self.active += 1
+            self.total_calls += 1
+            return 0.0
+        
+        if len(self.waiters) >= self.max_queue_size:
+            self.rejected_calls += 1
+            raise ServerBusyError(self.server_name, self.max_concurrency, self.max_queue_size)
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        start_time = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 槽位已移交给本调用，需要继续传递给下一个等待者
+                self.release()
+            else:
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+        
+        wait_time = time.perf_counter() - start_time
+        self.total_calls += 1
+        self.total_wait_time += wait_time
+        return wait_time
+    
+    def release(self):
+        """释放执行槽位，优先直接移交给队首等待者"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "total_calls": self.total_calls,
+            "rejected_calls": self.rejected_calls,
+            "avg_queue_wait_ms": round(self.total_wait_time * 1000 / self.total_calls, 3) if self.total_calls else 0.0
+        }
+
+
+class ToolResultMemo:
+    """
+    工具调用结果记忆化
+    
+    以 (服务, 工具, 规范化参数哈希) 为键缓存调用结果，每个工具独立按 LRU 限制条目数。
+    相同参数的并发调用只向服务发起一次请求，其余调用等待同一结果（single-flight）。
+    服务重启或重载时按服务整体失效，失效前已发出的调用结果不会再写入。
+    """
+    
+    def __init__(self):
+        self.entries: Dict[Tuple[str, str], OrderedDict] = {}  # (服务, 工具) -> {参数哈希: (调用结果, 过期时间)}
+        self.inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self.generations: Dict[str, int] = {}  # 服务失效代数
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    @staticmethod
+    def make_key(args: Dict[str, Any]) -> str:
+        """规范化参数（键排序、紧凑格式）后计算哈希"""
+        canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    async def call(self, server_name: str, tool_name: str, args: Dict[str, Any],
+                   ttl: float, max_entries: int,
+                   invoke: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        返回记忆化的调用结果，未命中时调用 invoke
+        
+        Returns:
+            (调用结果, 是否未经上游调用直接得到)
+        """
+        tool_key = (server_name, tool_name)
+        arg_key = self.make_key(args)
+        
+        entries = self.entries.get(tool_key)
+        if entries is not None:
+            item = entries.get(arg_key)
+            if item is not None:
+                if time.time() <= item[1]:
+                    entries.move_to_end(arg_key)
+                    self.hits += 1
+                    return item[0], True
+                del entries[arg_key]
+        
+        flight_key = (server_name, tool_name, arg_key)
+        task = self.inflight.get(flight_key)
+        if task is not None:
+            # 相同调用正在进行：等待其结果而不是再次请求服务
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+        
+        self.misses += 1
+        generation = self.generations.get(server_name, 0)
+        
+        async def run() -> Dict[str, Any]:
+            try:
+                invocation = await invoke()
+                result = invocation.get("result")
+                is_error = isinstance(result, dict) and result.get("isError")
+                # 错误结果不记忆；服务已失效则丢弃本次结果
+                if not is_error and ttl > 0 and self.generations.get(server_name, 0) == generation:
+                    bucket = self.entries.setdefault(tool_key, OrderedDict())
+                    bucket[arg_key] = (invocation, time.time() + ttl)
+                    bucket.move_to_end(arg_key)
+                    while len(bucket) > max(1, max_entries):
+                        bucket.popitem(last=False)
+                return invocation
+            finally:
+                if self.inflight.get(flight_key) is task:
+                    del self.inflight[flight_key]
+        
+        # 上游调用在独立任务中执行，发起者被取消时不会影响其他等待者
+        task = asyncio.ensure_future(run())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self.inflight[flight_key] = task
+        return await asyncio.shield(task), False
+    
+    def invalidate(self, server_name: str) -> int:
+        """使指定服务的所有记忆结果失效，返回清除的条目数"""
+        self.generations[server_name] = self.generations.get(server_name, 0) + 1
+        removed = 0
+        for tool_key in [key for key in self.entries if key[0] == server_name]:
+            removed += len(self.entries.pop(tool_key))
+        for flight_key in [key for key in self.inflight if key[0] == server_name]:
+            # 正在进行的调用仍会返回给已在等待的请求，但新请求不再合并到它
+            del self.inflight[flight_key]
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "entries": sum(len(bucket) for bucket in self.entries.values()),
+            "inflight": len(self.inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+
+PROCESS_KILL_TIMEOUT = 2.0  # 强制结束 stdio 子进程时，发送 SIGTERM 后等待退出的秒数，超时后发送 SIGKILL
+MIN_DRAIN_TIMEOUT = 1.0  # 旧会话等待在途调用完成的最短期限（秒），drain_timeout 配置得更小时使用该值
+TOOL_SNAPSHOT_FILE = "tool-snapshots.json"  # 缓存目录中的工具列表快照（按需启动的服务在启动子进程前据此列出工具）
+TOOL_SNAPSHOT_KEYS = ("type", "command", "args", "env", "url")  # 决定工具列表的服务配置字段，变化后快照失效
+
+
+class MCPManager:
+    """MCP服务管理器"""
+    
+    def __init__(self):
+        self.clients: Dict[str, Dict[str, Any]] = {}
+        self.tool_call_history: Dict[str, int] = {}
+        self.sessions: Dict[str, ClientSession] = {}
+        self.config_cache: Dict[str, Any] = {}  # 缓存配置用于重启单个服务
+        self.reload_lock = asyncio.Lock()  # 串行化配置热重载
+        self.closing_tasks: set = set()  # 后台关闭中的会话池成员（全部关闭时一并等待）
+        self.restart_tasks: set = set()  # 后台重启中的会话池成员（全部关闭时先取消并等待）
+        self.tool_snapshots: Optional[Dict[str, Dict[str, Any]]] = None  # 各服务的工具列表快照（首次初始化服务时读取）
+        self.tool_snapshot_lock = threading.Lock()  # 串行化快照文件写入
+        self.tool_snapshot_version = 0  # 快照内容版本，每次变化递增
+        self.tool_snapshot_written = 0  # 已写入文件的快照版本（避免较旧的内容覆盖较新的）
+        
+        # 工具路由索引（随服务初始化/关闭增量维护，避免每次调用线性扫描）
+        self.tool_registry: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (服务名, 工具名) -> 路由条目
+        self.tool_name_index: Dict[str, List[str]] = {}  # 工具名 -> 提供该工具的服务列表（按注册顺序）
+        
+        # 每个服务的调用准入控制
+        self.limiters: Dict[str, ServerCallLimiter] = {}
+        # 每个服务的调用统计（调用数、超时数、因超时重建会话次数）
+        self.call_metrics: Dict[str, Dict[str, int]] = {}
+        # 幂等工具的结果记忆化
+        self.tool_memo = ToolResultMemo()
+        
+        # 缓存系统相关
+        self.settings = BridgeSettings()
+        self.cache_dir: Optional[Path] = None  # 缓存目录（首次使用时创建）
+        self.sqlite_cache: Optional[SqliteCacheTier] = None  # SQLite 存储后端（cache_backend 为 sqlite 时打开）
+        self.sqlite_cache_lock = threading.Lock()  # 避免 I/O 线程池中并发首次打开数据库
+        self.search_indexes: OrderedDict = OrderedDict()  # 已载入的倒排索引（按内容哈希，LRU）
+        self.search_index_builds: set = set()  # 正在后台建立索引的内容哈希
+        self.search_index_lock = threading.Lock()  # 保护已载入索引与建立中集合（I/O 线程池中并发访问）
+        self.search_index_stats = {"built": 0, "indexed_searches": 0, "scanned_searches": 0}
+        self.memory_cache = MemoryCacheTier(self.settings.memory_cache_max_bytes, self._schedule_demotion)
+        self.stats_lock = threading.Lock()  # 保护在 I/O 线程池中更新的统计计数
+        self.demoted_cache_items = 0  # 从内存降级到文件缓存的条目数
+        self.file_cache_dedup_hits = 0  # 文件缓存中因内容已存在而跳过写入的次数
+        self.file_cache_write_stats = {"blobs": 0, "compressed_blobs": 0, "raw_bytes": 0, "stored_bytes": 0}
+        self.janitor_stats: Dict[str, Any] = {"sweeps": 0, "total_bytes_reclaimed": 0, "last_sweep": None}
+        self.io_executor: Optional[ThreadPoolExecutor] = None  # 磁盘 I/O 线程池（首次使用时创建）
+        self.io_executor_lock = threading.Lock()
+        self.cpu_executor: Optional[Executor] = None  # 计算进程池（首次需要时创建）
+        self.cpu_executor_lock = threading.Lock()
+        self.cpu_offload_stats = {"serialize": 0, "search": 0, "query": 0, "index": 0}
+    
+    def _get_io_executor(self) -> ThreadPoolExecutor:
+        """获取磁盘 I/O 线程池（首次使用时按 io_threads 创建）"""
+        with self.io_executor_lock:
+            if self.io_executor is None:
+                self.io_executor = ThreadPoolExecutor(max_workers=max(1, self.settings.io_threads),
+                                                      thread_name_prefix="mcp-io")
+            return self.io_executor
+    
+    async def run_io(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在磁盘 I/O 线程池中执行阻塞的文件操作，事件循环只等待结果"""
+        return await asyncio.get_running_loop().run_in_executor(self._get_io_executor(), func, *args)
+    
+    def _should_offload(self, size: int) -> bool:
+        """该大小的计算是否交给计算进程池"""
+        return self.settings.cpu_workers > 0 and size >= self.settings.cpu_offload_min_bytes
+    
+    def _get_cpu_executor(self) -> Executor:
+        """获取计算进程池（首次使用时创建；无 GIL 的 Python 上线程即可并行，改用线程池）"""
+        with self.cpu_executor_lock:
+            if self.cpu_executor is None:
+                workers = max(1, self.settings.cpu_workers)
+                if not getattr(sys, "_is_gil_enabled", lambda: True)():
+                    self.cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-cpu")
+                else:
+                    # 使用 spawn 启动子进程：当前进程有多个线程，fork 可能复制到被占用的锁
+                    self.cpu_executor = ProcessPoolExecutor(max_workers=workers,
+                                                            mp_context=multiprocessing.get_context("spawn"))
+            return self.cpu_executor
+    
+    def _run_cpu(self, task: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在计算进程池中执行 CPU 密集的任务并等待结果（由 I/O 线程调用，不阻塞事件循环）
+        
+        进程池异常退出（如子进程被杀死）时丢弃该进程池，本次改为在当前线程中执行。
+        """
+        executor = self._get_cpu_executor()
+        try:
+            result = executor.submit(func, *args).result()
+        except BrokenProcessPool as e:
+            print(f"[计算进程池] 进程池不可用，改为在当前线程执行: {e}")
+            with self.cpu_executor_lock:
+                if self.cpu_executor is executor:
+                    self.cpu_executor = None
+            executor.shutdown(wait=False)
+            return func(*args)
+        with self.stats_lock:
+            self.cpu_offload_stats[task] += 1
+        return result
+    
+    def _create_envelope(self, content: Any) -> ResultEnvelope:
+        """创建结果信封：大结果在计算进程池中序列化并构建行/分页索引，其余在当前线程中序列化"""
+        # 先按文本长度粗略估计大小，确定交给进程池后才 pickle 传输
+        if self._should_offload(estimate_content_size(content)):
+            try:
+                payload = pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                payload = None
+            if payload is not None:
+                return ResultEnvelope.from_prepared(content, *self._run_cpu("serialize", serialize_result_task, payload))
+        return ResultEnvelope.from_content(content)
+    
+    @staticmethod
+    def _read_config_file(config_path: Path) -> Dict[str, Any]:
+        """读取配置文件（不存在时写入默认配置），在 I/O 线程池中执行"""
+        if not config_path.exists():
+            print(f"配置文件不存在，正在创建默认配置: {config_path}")
+            
+            default_config = {
+                "mcpServers": {
+                    "example_service": {
+                        "enabled": True,
+                        "command": "path/to/your/mcp/server/executable",
+                        "args": ["--port", "8080"],
+                        "description": "这是一个示例服务，请替换成你自己的配置。它能...",
+                        "env": {}
+                    }
+                }
+            }
+            
+            MCPManager._write_config_file(config_path, default_config)
+            print(f"✓ 默认配置已创建: {config_path}")
+            return default_config
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_config_file(config_path: Path, config: Dict[str, Any]):
+        """写入配置文件，在 I/O 线程池中执行"""
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+    
+    async def load_config(self, config_path: Path) -> Dict[str, Any]:
+        """加载配置文件"""
+        try:
+            config = await self.run_io(self._read_config_file, config_path)
+            self.config_cache = config  # 缓存配置
+            self.apply_settings(config)
+            return config
+        
+        except Exception as e:
+            print(f"读取配置失败: {e}")
+            return {"mcpServers": {}}
+    
+    def apply_settings(self, config: Dict[str, Any]):
+        """应用配置文件顶层的 settings（全局设置）"""
+        try:
+            self.settings = BridgeSettings(**config.get("settings", {}))
+        except Exception as e:
+            print(f"全局设置无效，使用默认值: {e}")
+            self.settings = BridgeSettings()
+        
+        with self.memory_cache.lock:
+            self.memory_cache.max_bytes = self.settings.memory_cache_max_bytes
+        
+        with self.io_executor_lock:
+            executor = self.io_executor
+            if executor is not None and executor._max_workers != max(1, self.settings.io_threads):
+                # 线程池大小变化：新任务使用新线程池，旧线程池执行完已提交的任务后退出
+                self.io_executor = None
+                executor.shutdown(wait=False)
+        
+        with self.cpu_executor_lock:
+            executor = self.cpu_executor
+            if executor is not None and executor._max_workers != max(1, self.settings.cpu_workers):
+                self.cpu_executor = None
+                executor.shutdown(wait=False)
+    
+    async def init_server(self, server_name: str, server_config: Dict[str, Any]):
+        """初始化单个MCP服务器"""
+        if server_name in self.clients:
+            print(f"服务器 {server_name} 已初始化")
+            return
+        
+        server_type, members, tools = await self._start_or_restore(server_name, server_config)
+        self._activate_server(server_name, server_type, server_config, members, tools)
+    
+    async def _start_or_restore(self, server_name: str, server_config: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        准备登记服务：lazy 服务有有效的工具快照时不启动子进程，返回空成员列表与快照中的工具；
+        否则启动服务（首次运行没有快照的 lazy 服务也会正常启动一次，并记录快照）
+        
+        Returns:
+            (服务类型, 会话池成员, 快照中的工具列表或 None)
+        """
+        if server_config.get("lazy", False):
+            tools = await self._load_tool_snapshot(server_name, server_config)
+            if tools is not None:
+                print(f"[按需启动] 服务 {server_name} 已按工具快照登记 {len(tools)} 个工具，首次调用时启动")
+                return server_config.get("type", "stdio").lower(), [], tools
+        server_type, members = await self._start_server(server_name, server_config)
+        return server_type, members, None
+    
+    async def _start_server(self, server_name: str, server_config: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """启动服务的全部会话池成员（尚不登记，不影响正在运行的同名服务），返回 (服务类型, 成员列表)"""
+        server_type = server_config.get("type", "stdio").lower()
+        timeout = server_config.get("timeout", 30)
+        
+        try:
+            print(f"正在初始化服务器 {server_name} (类型: {server_type})...")
+            
+            if server_type == "sse":
+                # SSE 类型服务器
+                members = await self._init_sse_server(server_name, server_config, timeout)
+            else:
+                # stdio 类型服务器
+                members = await self._init_stdio_server(server_name, server_config, timeout)
+            return server_type, members
+        
+        except asyncio.TimeoutError:
+            print(f"✗ 服务器 {server_name} 初始化超时（{timeout}秒）")
+            raise
+        except Exception as e:
+            print(f"✗ 服务器 {server_name} 初始化失败: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
+    
+    def _activate_server(self, server_name: str, server_type: str, server_config: Dict[str, Any],
+                         members: List[Dict[str, Any]], tools: Optional[List[Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        登记服务并加入路由索引；同名服务已登记时原子地替换它
+        
+        members 为空时登记为未启动的服务（工具列表为 tools），首次调用时再启动。
+        
+        Returns:
+            被替换下来的旧服务数据（没有旧服务时为 None），由调用方负责关闭
+        """
+        previous = self.clients.get(server_name)
+        if previous is not None:
+            self._unregister_server_tools(server_name)
+        
+        self._install_client(server_name, server_type, server_config, members, tools)
+        self._register_server_tools(server_name)
+        
+        limiter = self.limiters.get(server_name)
+        max_concurrency = server_config.get("max_concurrency", 8)
+        max_queue_size = server_config.get("max_queue_size", 64)
+        if previous is None or limiter is None or (limiter.max_concurrency, limiter.max_queue_size) != (max_concurrency, max(0, max_queue_size)):
+            # 并发设置未变时沿用原限制器，排队中的调用不受替换影响
+            self.limiters[server_name] = ServerCallLimiter(server_name, max_concurrency, max_queue_size)
+        
+        if members:
+            print(f"✓ 服务器 {server_name} 初始化成功，加载 {len(self.clients[server_name]['tools'])} 个工具")
+            self._save_tool_snapshot(server_name, server_config, self.clients[server_name]["tools"])
+            self._schedule_standby(server_name)
+        return previous
+    
+    async def _init_stdio_server(self, server_name: str, server_config: Dict[str, Any], timeout: int) -> List[Dict[str, Any]]:
+        """启动 stdio 类型服务器（pool_size > 1 时启动多个相同的子进程组成会话池），返回会话池成员"""
+        command = server_config.get("command")
+        if not command:
+            raise ValueError(f"stdio 类型服务器必须指定 command 字段")
+        
+        pool_size = max(1, int(server_config.get("pool_size", 1)))
+        if pool_size > 1:
+            print(f"  会话池大小: {pool_size}")
+        
+        tasks = [asyncio.create_task(self._start_member("stdio", server_config, index)) for index in range(pool_size)]
+        try:
+            await asyncio.wait(tasks)
+        except asyncio.CancelledError:
+            # 启动被取消：取消其余成员的启动（等待其回收子进程），并关闭已启动的成员
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+            started = [t.result() for t in tasks if not t.cancelled() and t.exception() is None]
+            await asyncio.gather(*[self._close_member("stdio", member) for member in started])
+            raise
+        
+        members = [t.result() for t in tasks if t.exception() is None]
+        errors = [t.exception() for t in tasks if t.exception() is not None]
+        if errors:
+            # 任一成员启动失败，关闭已启动的成员
+            await asyncio.gather(*[self._close_member("stdio", member) for member in members])
+            raise errors[0]
+        
+        return members
+    
+    async def _start_stdio_member(self, server_config: Dict[str, Any], timeout: int, index: int = 0) -> Dict[str, Any]:
+        """启动一个 stdio 子进程并建立会话，返回会话池成员"""
+        command = server_config.get("command")
+        args = server_config.get("args", [])
+        env = server_config.get("env", {})
+        
+        # 合并环境变量
+        server_env = {**os.environ, **env}
+        
+        print(f"  [{index}] 执行命令: {command} {' '.join(args)}")
+        
+        # 创建服务器参数
+        server_params = StdioServerParameters(
+            command=command,
+            args=args,
+            env=server_env
+        )
+        
+        print(f"  [{index}] 正在启动子进程...")
+        
+        # 使用异步上下文管理器连接到服务器（直接在所有者任务中进入：asyncio.wait_for 在 Python 3.12 之前
+        # 会在新任务中执行，之后在其他任务中退出会触发 anyio 的 cancel scope 错误；启动子进程本身不会阻塞）
+        stdio_context = stdio_client(server_params)
+        read, write = await stdio_context.__aenter__()
+        entered = [stdio_context]
+        process = self._get_stdio_process(stdio_context)
+        print(f"  [{index}] 子进程已启动，正在建立会话...")
+        
+        try:
+            # 创建会话上下文管理器
+            session_context = ClientSession(read, write)
+            session = await session_context.__aenter__()
+            entered.append(session_context)
+            print(f"  [{index}] 会话已建立，正在初始化...")
+            
+            try:
+                # 初始化会话
+                await asyncio.wait_for(
+                    session.initialize(),
+                    timeout=timeout
+                )
+                print(f"  [{index}] 会话初始化完成")
+            except asyncio.TimeoutError:
+                print(f"  [{index}] ✗ 会话初始化超时")
+                raise
+            
+            # 获取工具列表
+            try:
+                print(f"  [{index}] 正在获取工具列表...")
+                tools_response = await asyncio.wait_for(
+                    session.list_tools(),
+                    timeout=timeout
+                )
+                tools = tools_response.tools if hasattr(tools_response, 'tools') else []
+                print(f"  [{index}] 成功获取 {len(tools)} 个工具")
+            except asyncio.TimeoutError:
+                print(f"  [{index}] ✗ 获取工具列表超时")
+                raise
+        except BaseException:
+            # 启动被取消或中途失败（含超时）：在本任务中退出已进入的上下文并回收子进程
+            await self._abort_member_start(entered, process)
+            raise
+        
+        return {
+            "index": index,
             "session": session,
             "session_context": session_context,
-            "tools": tools,
-            "config": server_config,
             "stdio_context": stdio_context,
+            "process": process,
             "read": read,
-            "write": write
+            "write": write,
+            "tools": tools,
+            "inflight": 0,
+            "healthy": True,
+            "last_health_check": time.time()
         }
     
-    async def _init_sse_server(self, server_name: str, server_config: Dict[str, Any], timeout: int):
-        """初始化 SSE 类型服务器"""
+    async def _init_sse_server(self, server_name: str, server_config: Dict[str, Any], timeout: int) -> List[Dict[str, Any]]:
+        """连接 SSE 类型服务器，返回会话池成员"""
+        return [await self._start_member("sse", server_config)]
+    
+    async def _start_sse_member(self, server_config: Dict[str, Any], timeout: int, index: int = 0) -> Dict[str, Any]:
+        """连接 SSE 服务器并建立会话，返回会话池成员"""
         url = server_config.get("url")
         if not url:
             raise ValueError(f"sse 类型服务器必须指定 url 字段")
         
         print(f"  连接到 SSE 服务器: {url}")
         
-        sse_context = None
-        read = None
-        write = None
-        session_context = None
+        entered = []
         
         try:
-            # 使用异步上下文管理器连接到 SSE 服务器
-            sse_context = sse_client(url)
+            # 使用异步上下文管理器连接到 SSE 服务器（连接超时由 sse_client 自身控制，
+            # 上下文直接在所有者任务中进入，原因同 stdio）
+            sse_context = sse_client(url, timeout=timeout)
             
             # 建立 SSE 连接
             try:
-                read, write = await asyncio.wait_for(
-                    sse_context.__aenter__(),
-                    timeout=timeout
-                )
+                read, write = await sse_context.__aenter__()
+                entered.append(sse_context)
                 print(f"  SSE 连接已建立")
             except asyncio.TimeoutError:
                 print(f"  ✗ 连接 SSE 服务器超时（{timeout}秒）")
@@ -506,67 +2714,529 @@ class MCPManager:
             
             # 创建会话上下文管理器
             session_context = ClientSession(read, write)
-            session = await asyncio.wait_for(
-                session_context.__aenter__(),
-                timeout=timeout
-            )
+            session = await session_context.__aenter__()
+            entered.append(session_context)
             print(f"  会话已建立，正在初始化...")
             
             # 初始化会话
             try:
-                await asyncio.wait_for(
-                    session.initialize(),
-                    timeout=timeout
-                )
-                print(f"  会话初始化完成")
-            except asyncio.TimeoutError:
-                print(f"  ✗ 会话初始化超时")
-                raise
-            
-            # 获取工具列表
+                await asyncio.wait_for(
+                    session.initialize(),
+                    timeout=timeout
+                )
+                print(f"  会话初始化完成")
+            except asyncio.TimeoutError:
+                print(f"  ✗ 会话初始化超时")
+                raise
+            
+            # 获取工具列表
+            try:
+                print(f"  正在获取工具列表...")
+                tools_response = await asyncio.wait_for(
+                    session.list_tools(),
+                    timeout=timeout
+                )
+                tools = tools_response.tools if hasattr(tools_response, 'tools') else []
+                print(f"  成功获取 {len(tools)} 个工具")
+            except asyncio.TimeoutError:
+                print(f"  ✗ 获取工具列表超时")
+                raise
+            
+            return {
+                "index": index,
+                "session": session,
+                "session_context": session_context,
+                "sse_context": sse_context,
+                "read": read,
+                "write": write,
+                "tools": tools,
+                "inflight": 0,
+                "healthy": True,
+                "last_health_check": time.time()
+            }
+            
+        except BaseException:
+            # 启动被取消或中途失败：在本任务中退出已进入的会话与 SSE 连接
+            if entered:
+                print(f"  清理会话与 SSE 连接...")
+            await self._abort_member_start(entered)
+            raise
+    
+    async def _abort_member_start(self, entered: List[Any], process: Any = None):
+        """
+        清理启动到一半的成员：按进入的相反顺序退出上下文（必须在进入它们的任务中调用），
+        再确认 stdio 子进程已退出；清理过程中再次被取消时仍会回收子进程
+        """
+        try:
+            for context in reversed(entered):
+                try:
+                    await context.__aexit__(None, None, None)
+                except Exception as e:
+                    print(f"  清理启动中的成员时出错: {e}")
+        finally:
+            await self._terminate_process(process)
+    
+    def _install_client(self, server_name: str, server_type: str, server_config: Dict[str, Any],
+                        members: List[Dict[str, Any]], tools: Optional[List[Any]] = None):
+        """登记服务（会话池中的成员共享第一个成员的工具列表；没有成员时为未启动的服务，工具列表为 tools）"""
+        primary = members[0] if members else {}
+        self.clients[server_name] = {
+            "type": server_type,
+            "session": primary.get("session"),
+            "tools": primary["tools"] if members else tools,
+            "config": server_config,
+            "pool": members,
+            "next_member": 0,
+            "standby": None,  # 已就绪的备用会话（warm_standby）
+            "standby_task": None,  # 正在后台准备备用会话的任务
+            "start_task": None,  # 未启动的服务正在按需启动的任务
+            "last_used": time.time()  # 最近一次调用时间（空闲回收依据）
+        }
+    
+    async def _start_member(self, server_type: str, server_config: Dict[str, Any], index: int = 0) -> Dict[str, Any]:
+        """在独立的所有者任务中启动一个会话池成员并返回；所有者任务持有会话，直到成员被关闭"""
+        ready = asyncio.get_running_loop().create_future()
+        owner = asyncio.create_task(self._run_member(server_type, server_config, index, ready))
+        try:
+            member = await ready
+        except asyncio.CancelledError:
+            # 等待所有者任务清理完毕，确保已启动的子进程被回收（清理时间受 SDK 与 PROCESS_KILL_TIMEOUT 限制）；
+            # 取消恰好发生在成员就绪之后时，所有者任务已在等待关闭信号，这里同样关闭它并结束子进程
+            owner.cancel()
+            await asyncio.wait({owner})
+            if ready.done() and not ready.cancelled() and ready.exception() is None:
+                await self._terminate_process(ready.result().get("process"))
+            raise
+        member["owner"] = owner
+        return member
+    
+    async def _run_member(self, server_type: str, server_config: Dict[str, Any], index: int, ready: asyncio.Future):
+        """
+        会话池成员的所有者任务：建立会话后等待关闭信号，再在同一任务中关闭会话与传输层
+        
+        anyio 要求 cancel scope 在进入它的任务中退出，因此会话与 stdio/SSE 上下文的进入和退出都在这里完成。
+        """
+        timeout = server_config.get("timeout", 30)
+        try:
+            if server_type == "sse":
+                member = await self._start_sse_member(server_config, timeout, index)
+            else:
+                member = await self._start_stdio_member(server_config, timeout, index)
+        except asyncio.CancelledError:
+            ready.cancel()
+            raise
+        except Exception as e:
+            # 启动失败由启动方处理
+            if not ready.done():
+                ready.set_exception(e)
+            return
+        
+        member["stop"] = asyncio.Event()
+        if ready.done():
+            # 启动方已放弃等待
+            member["stop"].set()
+        else:
+            ready.set_result(member)
+        
+        try:
+            await member["stop"].wait()
+        finally:
+            # 主动关闭或传输层异常结束时，成员都不再可用
+            member["healthy"] = False
+            await self._exit_member_contexts(server_type, member)
+    
+    async def _exit_member_contexts(self, server_type: str, member: Dict[str, Any]):
+        """关闭一个会话池成员的会话与传输层连接（在所有者任务中执行）"""
+        try:
+            # 先关闭会话上下文
+            session_context = member.get("session_context")
+            if session_context:
+                try:
+                    await session_context.__aexit__(None, None, None)
+                except Exception as e:
+                    print(f"  关闭会话上下文时出错: {e}")
+            
+            # 根据类型关闭对应的传输层连接
+            if server_type == "sse":
+                sse_context = member.get("sse_context")
+                if sse_context:
+                    try:
+                        await sse_context.__aexit__(None, None, None)
+                    except Exception as e:
+                        print(f"  关闭 SSE 连接时出错: {e}")
+            else:
+                stdio_context = member.get("stdio_context")
+                if stdio_context:
+                    try:
+                        await stdio_context.__aexit__(None, None, None)
+                    except Exception as e:
+                        print(f"  关闭 stdio 连接时出错: {e}")
+        except Exception as e:
+            print(f"  清理资源时出错: {e}")
+    
+    async def _close_member(self, server_type: str, member: Dict[str, Any]):
+        """
+        关闭一个会话池成员并等待关闭完成
+        
+        通知所有者任务正常关闭，超过 shutdown_timeout 后取消所有者任务；
+        最后确认 stdio 子进程已退出，仍在运行时依次发送 SIGTERM、SIGKILL。
+        """
+        owner = member.get("owner")
+        if owner is None:
+            return
+        member["stop"].set()
+        done, _ = await asyncio.wait({owner}, timeout=max(0.0, self.settings.shutdown_timeout))
+        if not done:
+            print(f"  成员 {member['index']} 未在 {self.settings.shutdown_timeout} 秒内关闭，强制结束")
+            owner.cancel()
+        # 正常关闭后也确认一次（旧版 SDK 关闭 stdio 时不等待子进程退出）
+        await self._terminate_process(member.get("process"))
+        if not done:
+            await asyncio.wait({owner}, timeout=PROCESS_KILL_TIMEOUT)
+    
+    def _close_in_background(self, closing: Awaitable[None]):
+        """在后台关闭被替换下来的成员或会话（不阻塞调用方），关闭全部服务时会等待这些任务完成"""
+        task = asyncio.create_task(closing)
+        self.closing_tasks.add(task)
+        task.add_done_callback(self.closing_tasks.discard)
+    
+    @staticmethod
+    def _get_stdio_process(stdio_context: Any) -> Any:
+        """取出 stdio_client 启动的子进程（SDK 未公开该对象，从挂起的上下文生成器中读取，取不到时为 None）"""
+        frame = getattr(getattr(stdio_context, "gen", None), "ag_frame", None)
+        return frame.f_locals.get("process") if frame is not None else None
+    
+    @staticmethod
+    async def _terminate_process(process: Any):
+        """确保 stdio 子进程已退出：仍在运行时先发送 SIGTERM，超时后发送 SIGKILL（子进程独占进程组时连同其子进程一起结束）"""
+        if process is None or process.returncode is not None:
+            return
+        
+        for force in (False, True):
+            try:
+                if sys.platform == "win32":
+                    if force:
+                        process.kill()
+                    else:
+                        process.terminate()
+                else:
+                    sig = signal.SIGKILL if force else signal.SIGTERM
+                    if os.getpgid(process.pid) == process.pid:
+                        os.killpg(process.pid, sig)
+                    else:
+                        process.send_signal(sig)
+            except ProcessLookupError:
+                return
+            print(f"  已向子进程 {process.pid} 发送 {'SIGKILL' if force else 'SIGTERM'}")
+            try:
+                await asyncio.wait_for(process.wait(), timeout=PROCESS_KILL_TIMEOUT)
+                return
+            except asyncio.TimeoutError:
+                continue
+    
+    def _acquire_member(self, client_data: Dict[str, Any]) -> Dict[str, Any]:
+        """按最少在途请求选择会话池成员（并列时轮转），并占用一个在途计数"""
+        pool = client_data["pool"]
+        candidates = [m for m in pool if m["healthy"]] or pool
+        
+        # 从轮转位置开始比较，使在途数相同的成员轮流被选中
+        start = client_data["next_member"] % len(candidates)
+        ordered = candidates[start:] + candidates[:start]
+        member = min(ordered, key=lambda m: m["inflight"])
+        client_data["next_member"] = start + 1
+        
+        member["inflight"] += 1
+        return member
+    
+    def _release_member(self, member: Dict[str, Any]):
+        """释放会话池成员的在途计数；最后一个在途调用结束时通知等待该成员排空的一方"""
+        member["inflight"] = max(0, member["inflight"] - 1)
+        drained = member.get("drained")
+        if drained is not None and member["inflight"] == 0:
+            drained.set()
+    
+    async def _restart_member(self, server_name: str, member: Dict[str, Any]):
+        """单独重启会话池中的一个成员，不影响其他成员"""
+        client_data = self.clients.get(server_name)
+        if not client_data or member not in client_data["pool"] or member.get("restarting"):
+            return
+        
+        member["restarting"] = True
+        member["healthy"] = False
+        server_type = client_data["type"]
+        print(f"[会话池] 正在重启服务 {server_name} 的成员 {member['index']}...")
+        
+        standby = self._take_standby(client_data)
+        if standby is not None:
+            new_member = standby
+            print(f"[热备] 服务 {server_name} 的成员 {member['index']} 切换到备用会话")
+        else:
+            try:
+                new_member = await self._start_member(server_type, client_data["config"], member["index"])
+            except Exception as e:
+                member["restarting"] = False
+                print(f"[会话池] ✗ 重启服务 {server_name} 的成员 {member['index']} 失败: {e}")
+                return
+        
+        # 服务可能在重启期间被关闭或替换
+        if self.clients.get(server_name) is not client_data or member not in client_data["pool"]:
+            self._close_in_background(self._close_member(server_type, new_member))
+            return
+        
+        self._replace_member(server_name, client_data, member, new_member)
+        print(f"[会话池] ✓ 服务 {server_name} 的成员 {member['index']} 已重启")
+    
+    def _restart_in_background(self, server_name: str, member: Dict[str, Any]):
+        """在后台重启会话池成员（不阻塞调用方），关闭全部服务时会取消并等待这些任务"""
+        task = asyncio.create_task(self._restart_member(server_name, member))
+        self.restart_tasks.add(task)
+        task.add_done_callback(self.restart_tasks.discard)
+    
+    def _replace_member(self, server_name: str, client_data: Dict[str, Any], member: Dict[str, Any],
+                        new_member: Dict[str, Any]):
+        """用新成员原子地替换会话池中的成员，旧成员在后台排空在途调用后关闭；开启 warm_standby 时补充备用会话"""
+        new_member["index"] = member["index"]
+        pool = client_data["pool"]
+        pool[pool.index(member)] = new_member
+        if member["index"] == 0:
+            client_data["session"] = new_member["session"]
+            self._refresh_registry_session(server_name)
+        
+        self._close_in_background(self._retire_member(server_name, client_data["type"], member))
+        self._schedule_standby(server_name)
+    
+    async def _retire_member(self, server_name: str, server_type: str, member: Dict[str, Any]):
+        """等待被替换下来的成员处理完在途调用（最多等待 drain_timeout 秒），再关闭该成员"""
+        if not await self._drain_members([member]):
+            print(f"服务 {server_name} 的旧成员 {member['index']} 在 {max(MIN_DRAIN_TIMEOUT, self.settings.drain_timeout)} 秒内仍有在途调用，强制关闭")
+        await self._close_member(server_type, member)
+    
+    def _schedule_standby(self, server_name: str):
+        """为开启 warm_standby 的服务在后台准备一个备用会话（已就绪或正在准备时跳过）"""
+        client_data = self.clients.get(server_name)
+        if not client_data or not client_data["pool"] or not client_data["config"].get("warm_standby", False):
+            return
+        if client_data.get("standby") is not None or client_data.get("standby_task") is not None:
+            return
+        client_data["standby_task"] = asyncio.create_task(self._prepare_standby(server_name, client_data))
+    
+    async def _prepare_standby(self, server_name: str, client_data: Dict[str, Any]):
+        """启动备用会话（与正常成员一样完成初始化与工具列表获取），就绪后挂到服务上等待切换"""
+        try:
+            member = await self._start_member(client_data["type"], client_data["config"])
+        except Exception as e:
+            print(f"[热备] ✗ 服务 {server_name} 的备用会话启动失败: {e}")
+            return
+        finally:
+            client_data["standby_task"] = None
+        
+        if self.clients.get(server_name) is not client_data:
+            # 服务已在准备期间被关闭或替换（在后台关闭，关闭全部服务时会等待其完成）
+            self._close_in_background(self._close_member(client_data["type"], member))
+            return
+        client_data["standby"] = member
+        print(f"[热备] 服务 {server_name} 的备用会话已就绪")
+    
+    def _take_standby(self, client_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """取出已就绪的备用会话；备用会话已失效（传输层断开）时在后台关闭它并返回 None"""
+        standby = client_data.get("standby")
+        client_data["standby"] = None
+        if standby is None:
+            return None
+        if standby["owner"].done() or not standby["healthy"]:
+            self._close_in_background(self._close_member(client_data["type"], standby))
+            return None
+        return standby
+    
+    async def _discard_standby(self, client_data: Dict[str, Any]):
+        """关闭服务的备用会话；正在准备中的取消启动，并等待其关闭会话、结束子进程"""
+        task = client_data.get("standby_task")
+        if task is not None:
+            task.cancel()
+            await asyncio.wait({task})
+        standby = client_data.get("standby")
+        client_data["standby"] = None
+        if standby is not None:
+            await self._close_member(client_data["type"], standby)
+    
+    def _refresh_registry_session(self, server_name: str):
+        """主会话变化后同步路由索引中的会话引用"""
+        session = self.clients[server_name]["session"]
+        for tool in self.clients[server_name]["tools"]:
+            entry = self.tool_registry.get((server_name, tool.name))
+            if entry is not None:
+                entry["session"] = session
+    
+    async def check_pool_health(self):
+        """对所有服务的会话池成员做健康检查（ping），失败的成员单独重启"""
+        now = time.time()
+        checks = []
+        for server_name, client_data in list(self.clients.items()):
+            interval = client_data["config"].get("health_check_interval", 30)
+            if interval <= 0:
+                continue
+            for member in client_data["pool"]:
+                if member.get("restarting"):
+                    continue
+                if member["healthy"] and now - member["last_health_check"] < interval:
+                    continue
+                checks.append(self._check_member(server_name, client_data, member))
+        
+        if checks:
+            await asyncio.gather(*checks, return_exceptions=True)
+    
+    async def _check_member(self, server_name: str, client_data: Dict[str, Any], member: Dict[str, Any]):
+        """检查单个会话池成员"""
+        timeout = client_data["config"].get("timeout", 30)
+        member["last_health_check"] = time.time()
+        try:
+            if member["healthy"]:
+                await asyncio.wait_for(member["session"].send_ping(), timeout=timeout)
+                return
+        except Exception as e:
+            print(f"[健康检查] 服务 {server_name} 的成员 {member['index']} 无响应: {type(e).__name__} {e}")
+        
+        self._restart_in_background(server_name, member)
+    
+    async def run_health_monitor(self, poll_interval: float = 5.0):
+        """后台健康检查循环"""
+        while True:
+            await asyncio.sleep(poll_interval)
+            try:
+                await self.check_pool_health()
+                await self.evict_idle_servers()
+            except Exception as e:
+                print(f"[健康检查] 执行失败: {e}")
+    
+    async def evict_idle_servers(self):
+        """关闭空闲超过 idle_timeout 的服务的子进程（保留工具列表与路由，下次调用时重新启动）"""
+        now = time.time()
+        idle = []
+        for server_name, client_data in list(self.clients.items()):
+            idle_timeout = client_data["config"].get("idle_timeout", 0)
+            pool = client_data["pool"]
+            if idle_timeout <= 0 or not pool or any(m["inflight"] or m.get("restarting") for m in pool):
+                continue
+            if now - client_data["last_used"] >= idle_timeout:
+                idle.append(server_name)
+        
+        await asyncio.gather(*[self._stop_idle_server(server_name) for server_name in idle])
+    
+    async def _stop_idle_server(self, server_name: str):
+        """将服务替换为未启动状态（新的调用会重新启动它），再关闭原来的会话"""
+        client_data = self.clients[server_name]
+        previous = self._activate_server(server_name, client_data["type"], client_data["config"], [], client_data["tools"])
+        print(f"[空闲回收] 服务 {server_name} 空闲超过 {client_data['config'].get('idle_timeout')} 秒，关闭子进程，下次调用时重新启动")
+        await self._retire_client(server_name, previous)
+    
+    async def _ensure_running(self, server_name: str) -> Dict[str, Any]:
+        """返回已启动的服务；服务未启动（按需启动或已被空闲回收）时先启动它，并发的调用共享同一次启动"""
+        client_data = self.clients.get(server_name)
+        if client_data is None:
+            raise ValueError(f"服务 {server_name} 不存在或未成功加载")
+        if not client_data["pool"]:
+            task = client_data["start_task"]
+            if task is None:
+                task = client_data["start_task"] = asyncio.create_task(self._wake_server(server_name, client_data))
+            # 调用方取消（如客户端断开）不影响启动本身
             try:
-                print(f"  正在获取工具列表...")
-                tools_response = await asyncio.wait_for(
-                    session.list_tools(),
-                    timeout=timeout
-                )
-                tools = tools_response.tools if hasattr(tools_response, 'tools') else []
-                print(f"  成功获取 {len(tools)} 个工具")
-            except asyncio.TimeoutError:
-                print(f"  ✗ 获取工具列表超时")
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if task.cancelled():
+                    raise ValueError(f"服务 {server_name} 在启动期间已被关闭") from None
                 raise
-            
-            self.clients[server_name] = {
-                "type": "sse",
-                "session": session,
-                "session_context": session_context,
-                "tools": tools,
-                "config": server_config,
-                "sse_context": sse_context,
-                "read": read,
-                "write": write
-            }
-            
-        except Exception:
-            # 清理资源
-            if session_context and read is not None:
-                print(f"  清理会话...")
-                try:
-                    await session_context.__aexit__(*sys.exc_info())
-                except Exception:
-                    pass
-            
-            if sse_context and read is not None:
-                print(f"  清理 SSE 连接...")
-                try:
-                    await sse_context.__aexit__(*sys.exc_info())
-                except Exception:
-                    pass
-            raise
+            client_data = self.clients.get(server_name)
+            if client_data is None or not client_data["pool"]:
+                raise ValueError(f"服务 {server_name} 在启动期间已被关闭或重载")
+        client_data["last_used"] = time.time()
+        return client_data
+    
+    async def _wake_server(self, server_name: str, client_data: Dict[str, Any]):
+        """启动未启动的服务，替换其登记（工具列表以实际获取到的为准，并更新快照）"""
+        print(f"[按需启动] 正在启动服务 {server_name}...")
+        try:
+            server_type, members = await self._start_server(server_name, client_data["config"])
+        finally:
+            client_data["start_task"] = None
+        
+        if self.clients.get(server_name) is not client_data:
+            # 启动期间服务被关闭或替换
+            await asyncio.gather(*[self._close_member(server_type, member) for member in members])
+            raise ValueError(f"服务 {server_name} 在启动期间已被关闭或重载")
+        self._activate_server(server_name, server_type, client_data["config"], members)
+    
+    @staticmethod
+    def _tool_snapshot_fingerprint(server_config: Dict[str, Any]) -> str:
+        """服务配置中决定工具列表的字段的哈希，用于判断快照是否仍然有效"""
+        identity = {key: server_config.get(key) for key in TOOL_SNAPSHOT_KEYS}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _read_tool_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        """读取工具列表快照文件（在 I/O 线程池中执行），文件不存在或损坏时返回空快照"""
+        path = self._get_cache_directory() / TOOL_SNAPSHOT_FILE
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshots = json.load(f)
+            return snapshots if isinstance(snapshots, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[工具快照] 读取快照文件失败，忽略: {e}")
+            return {}
+    
+    async def _ensure_tool_snapshots(self):
+        """首次初始化服务前读取工具列表快照"""
+        if self.tool_snapshots is None:
+            snapshots = await self.run_io(self._read_tool_snapshots)
+            if self.tool_snapshots is None:
+                self.tool_snapshots = snapshots
+    
+    async def _load_tool_snapshot(self, server_name: str, server_config: Dict[str, Any]) -> Optional[List[Any]]:
+        """返回服务的工具列表快照；没有快照或服务的启动配置已变化时返回 None"""
+        await self._ensure_tool_snapshots()
+        snapshot = self.tool_snapshots.get(server_name)
+        if not snapshot or snapshot.get("fingerprint") != self._tool_snapshot_fingerprint(server_config):
+            return None
+        try:
+            return [mcp_types.Tool.model_validate(tool) for tool in snapshot["tools"]]
+        except Exception as e:
+            print(f"[工具快照] 服务 {server_name} 的快照无效，忽略: {e}")
+            return None
+    
+    def _save_tool_snapshot(self, server_name: str, server_config: Dict[str, Any], tools: List[Any]):
+        """记录服务启动后获取到的工具列表，内容变化时在 I/O 线程池中写入快照文件"""
+        if self.tool_snapshots is None:
+            # 快照文件尚未读取（未经 init_all_servers / reload_config 初始化），避免覆盖其他服务的快照
+            return
+        snapshot = {
+            "fingerprint": self._tool_snapshot_fingerprint(server_config),
+            "tools": [tool.model_dump(mode="json", by_alias=True, exclude_none=True) for tool in tools]
+        }
+        if self.tool_snapshots.get(server_name) == snapshot:
+            return
+        self.tool_snapshots[server_name] = snapshot
+        self.tool_snapshot_version += 1
+        data = json.dumps(self.tool_snapshots, ensure_ascii=False).encode("utf-8")
+        self._get_io_executor().submit(self._write_tool_snapshots, data, self.tool_snapshot_version)
+    
+    def _write_tool_snapshots(self, data: bytes, version: int):
+        """写入工具列表快照文件（先写临时文件再替换；较旧版本的内容不会覆盖已写入的较新版本）"""
+        with self.tool_snapshot_lock:
+            if version <= self.tool_snapshot_written:
+                return
+            path = self._get_cache_directory() / TOOL_SNAPSHOT_FILE
+            temp_path = path.with_name(path.name + ".tmp")
+            try:
+                temp_path.write_bytes(data)
+                os.replace(temp_path, path)
+                self.tool_snapshot_written = version
+            except OSError as e:
+                print(f"[工具快照] 写入快照文件失败: {e}")
     
     async def init_all_servers(self, config: Dict[str, Any]):
         """初始化所有服务器"""
         servers = config.get("mcpServers", {})
+        await self._ensure_tool_snapshots()
         
         tasks = []
         for name, cfg in servers.items():
@@ -588,6 +3258,83 @@ class MCPManager:
         except Exception as e:
             print(f"跳过服务器 {name}: {e}")
     
+    async def reload_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        增量重载配置：与正在运行的服务逐个比较，只重启配置变化的服务，并行启动新增的服务，关闭被移除（或禁用）的服务
+        
+        配置变化的服务采用蓝绿切换：新会话在后台启动完成后原子地替换旧会话，旧会话处理完在途调用后再关闭，
+        重载期间所有未移除的服务持续可用；新会话启动失败时保留旧会话继续服务。
+        
+        Returns:
+            重载摘要：added / changed / removed / unchanged 为服务名列表，failed 为启动失败的服务名到错误信息的映射
+        """
+        async with self.reload_lock:
+            self.config_cache = config
+            self.apply_settings(config)
+            await self._ensure_tool_snapshots()
+            
+            desired: Dict[str, Dict[str, Any]] = {}
+            for name, cfg in config.get("mcpServers", {}).items():
+                if cfg.get("enabled", True) is False:
+                    if name not in self.clients:
+                        print(f"ℹ️ 服务 {name} 已被禁用，跳过加载。")
+                    continue
+                desired[name] = cfg
+            
+            removed = [name for name in self.clients if name not in desired]
+            added = [name for name in desired if name not in self.clients]
+            changed = [name for name in desired if name in self.clients and self.clients[name]["config"] != desired[name]]
+            unchanged = [name for name in desired if name not in added and name not in changed]
+            print(f"[热重载] 新增 {len(added)} 个，变化 {len(changed)} 个，移除 {len(removed)} 个，未变化 {len(unchanged)} 个服务")
+            
+            # 新增与变化的服务并行启动，启动期间旧会话继续处理调用
+            starting = added + changed
+            results = await asyncio.gather(
+                *[self._start_or_restore(name, desired[name]) for name in starting],
+                return_exceptions=True
+            )
+            
+            failed: Dict[str, str] = {}
+            for name, result in zip(starting, results):
+                if isinstance(result, BaseException):
+                    failed[name] = str(result) or type(result).__name__
+                    if name in self.clients:
+                        print(f"[热重载] 服务 {name} 的新会话启动失败，保留旧会话继续服务")
+                    continue
+                server_type, members, tools = result
+                previous = self._activate_server(name, server_type, desired[name], members, tools)
+                self.tool_memo.invalidate(name)
+                if previous is not None:
+                    self._close_in_background(self._retire_client(name, previous))
+            
+            await asyncio.gather(*[self.shutdown_server(name) for name in removed])
+            
+            return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged, "failed": failed}
+    
+    async def _retire_client(self, server_name: str, client_data: Dict[str, Any]):
+        """等待被替换下来的旧会话处理完在途调用（最多等待 drain_timeout 秒），再关闭其全部成员"""
+        server_type = client_data.get("type", "stdio")
+        if not await self._drain_members(client_data["pool"]):
+            print(f"服务 {server_name} 的旧会话在 {max(MIN_DRAIN_TIMEOUT, self.settings.drain_timeout)} 秒内仍有在途调用，强制关闭")
+        
+        await asyncio.gather(self._discard_standby(client_data),
+                             *[self._close_member(server_type, member) for member in client_data["pool"]])
+        print(f"已关闭服务 {server_name} 被替换下来的会话")
+    
+    async def _drain_members(self, members: List[Dict[str, Any]]) -> bool:
+        """等待成员的在途调用全部结束（最多等待 drain_timeout 秒），超时返回 False"""
+        waiters = []
+        for member in members:
+            if member["inflight"]:
+                member["drained"] = asyncio.Event()
+                waiters.append(asyncio.create_task(member["drained"].wait()))
+        if not waiters:
+            return True
+        _, pending = await asyncio.wait(waiters, timeout=max(MIN_DRAIN_TIMEOUT, self.settings.drain_timeout))
+        for waiter in pending:
+            waiter.cancel()
+        return not pending
+    
     def get_services(self) -> List[Dict[str, str]]:
         """获取所有服务列表"""
         services = []
@@ -633,109 +3380,203 @@ class MCPManager:
         Returns:
             工具的详细信息，包括完整的参数定义
         """
-        target_server = None
-        target_tool = None
-        
-        if server_name:
-            if server_name not in self.clients:
-                raise ValueError(f"服务 {server_name} 不存在或未加载")
-            
-            tools = self.clients[server_name]["tools"]
-            for tool in tools:
-                if tool.name == tool_name:
-                    target_server = server_name
-                    target_tool = tool
-                    break
-            
-            if not target_tool:
-                raise ValueError(f"服务 {server_name} 中不存在工具 {tool_name}")
-        else:
-            # 在所有服务中查找
-            for srv_name, client_data in self.clients.items():
-                tools = client_data["tools"]
-                for tool in tools:
-                    if tool.name == tool_name:
-                        target_server = srv_name
-                        target_tool = tool
-                        break
-                if target_tool:
-                    break
-            
-            if not target_tool:
-                raise ValueError(f"工具 {tool_name} 不存在")
+        entry = self.resolve_tool(tool_name, server_name)
+        target_server = entry["server"]
+        target_tool = entry["tool"]
         
         # 提取完整的工具信息
         return {
             "name": target_tool.name,
             "description": target_tool.description,
             "serverName": target_server,
-            "inputSchema": target_tool.inputSchema if hasattr(target_tool, 'inputSchema') else {},
-            "parameters": target_tool.inputSchema if hasattr(target_tool, 'inputSchema') else {}
+            "inputSchema": entry["schema"],
+            "parameters": entry["schema"]
         }
     
-    async def execute_tool(self, tool_name: str, args: Dict[str, Any], server_name: Optional[str] = None) -> Any:
+    def _register_server_tools(self, server_name: str):
+        """将服务的工具加入路由索引"""
+        client_data = self.clients[server_name]
+        for tool in client_data["tools"]:
+            key = (server_name, tool.name)
+            if key in self.tool_registry:
+                # 同一服务内重名工具，保持与原线性扫描一致：取第一个
+                continue
+            self.tool_registry[key] = {
+                "server": server_name,
+                "tool": tool,
+                "session": client_data["session"],
+                "schema": tool.inputSchema if hasattr(tool, 'inputSchema') else {}
+            }
+            self.tool_name_index.setdefault(tool.name, []).append(server_name)
+    
+    def _unregister_server_tools(self, server_name: str):
+        """将服务的工具从路由索引中移除"""
+        client_data = self.clients.get(server_name)
+        if not client_data:
+            return
+        
+        for tool in client_data["tools"]:
+            if self.tool_registry.pop((server_name, tool.name), None) is None:
+                continue
+            servers = self.tool_name_index.get(tool.name, [])
+            if server_name in servers:
+                servers.remove(server_name)
+            if not servers:
+                self.tool_name_index.pop(tool.name, None)
+    
+    def resolve_tool(self, tool_name: str, server_name: Optional[str] = None) -> Dict[str, Any]:
         """
-        执行工具
+        通过路由索引解析工具
         
         Args:
             tool_name: 工具名称
-            args: 工具参数
-            server_name: 可选的服务名称，指定从哪个服务调用工具
+            server_name: 可选的服务名称
         
         Returns:
-            工具执行结果
+            路由条目，包含 server、tool、session、schema
         
         Raises:
-            ValueError: 当工具不存在、服务不存在或达到最大调用次数时
+            ValueError: 当服务或工具不存在时
         """
-        target_server = None
-        target_session = None
-        
-        # 清理参数：移除值为 None 的键，因为某些 MCP 服务可能不支持 null 值
-        cleaned_args = {k: v for k, v in args.items() if v is not None}
-        
-        # 如果指定了服务名称，直接在该服务中查找
         if server_name:
             if server_name not in self.clients:
                 raise ValueError(f"服务 {server_name} 不存在或未加载")
             
-            client_data = self.clients[server_name]
-            tools = client_data["tools"]
-            
-            # 在指定服务中查找工具
-            tool_found = False
-            for tool in tools:
-                if tool.name == tool_name:
-                    tool_found = True
-                    target_server = server_name
-                    target_session = client_data["session"]
-                    break
-            
-            if not tool_found:
+            entry = self.tool_registry.get((server_name, tool_name))
+            if entry is None:
                 raise ValueError(f"服务 {server_name} 中不存在工具 {tool_name}")
+            return entry
         
+        # 未指定服务名称，取第一个注册的服务（保持向后兼容）
+        servers = self.tool_name_index.get(tool_name)
+        if not servers:
+            raise ValueError(f"工具 {tool_name} 不存在")
+        return self.tool_registry[(servers[0], tool_name)]
+    
+    def get_ambiguous_tools(self) -> Dict[str, List[str]]:
+        """获取在多个服务中重名的工具（预计算的歧义列表）"""
+        return {name: list(servers) for name, servers in self.tool_name_index.items() if len(servers) > 1}
+    
+    def _get_call_timeout(self, server_config: Dict[str, Any], tool_name: str,
+                          request_timeout: Optional[float] = None) -> Optional[float]:
+        """计算调用超时：请求级 > 工具级 > 服务默认值，<=0 表示不限制"""
+        if request_timeout is not None:
+            timeout = request_timeout
         else:
-            # 未指定服务名称，在所有服务中查找（保持向后兼容）
-            matching_servers = []
+            timeout = server_config.get("tool_timeouts", {}).get(tool_name, server_config.get("timeout", 30))
+        return timeout if timeout and timeout > 0 else None
+    
+    async def _call_with_deadline(self, server_name: str, member: Dict[str, Any], tool_name: str,
+                                  args: Dict[str, Any], timeout: Optional[float]) -> Any:
+        """在截止时间内调用工具，超时则取消调用并通知 MCP 服务"""
+        session = member["session"]
+        request_id = None
+        
+        async def call():
+            nonlocal request_id
+            # call_tool 在首次 await 前同步分配请求 ID，此处读取到的即本次请求的 ID
+            request_id = getattr(session, "_request_id", None)
+            return await session.call_tool(tool_name, args)
+        
+        metrics = self.call_metrics.setdefault(server_name, {"calls": 0, "timeouts": 0, "recycled_sessions": 0})
+        metrics["calls"] += 1
+        
+        if timeout is None:
+            return await call()
+        
+        try:
+            result = await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            member["consecutive_timeouts"] = member.get("consecutive_timeouts", 0) + 1
+            print(f"[调用超时] 服务: {server_name}, 工具: {tool_name}, 超时: {timeout}秒")
             
-            for srv_name, client_data in self.clients.items():
-                tools = client_data["tools"]
-                for tool in tools:
-                    if tool.name == tool_name:
-                        matching_servers.append(srv_name)
-                        if not target_server:  # 记录第一个匹配的服务
-                            target_server = srv_name
-                            target_session = client_data["session"]
-                        break
+            # 请求 ID 读取自 SDK 的私有属性，SDK 变化导致取不到整数 ID 时不发送取消通知，避免取消其他请求
+            if isinstance(request_id, int):
+                await self._send_cancel_notification(session, request_id, f"调用超时（{timeout}秒）")
+            else:
+                print("  无法确定本次调用的请求 ID，跳过取消通知")
             
-            if not target_server:
-                raise ValueError(f"工具 {tool_name} 不存在")
+            # 连续超时说明会话可能已失去响应，重建该会话
+            max_timeouts = self.clients.get(server_name, {}).get("config", {}).get("max_consecutive_timeouts", 2)
+            if 0 < max_timeouts <= member["consecutive_timeouts"]:
+                metrics["recycled_sessions"] += 1
+                member["healthy"] = False
+                print(f"[调用超时] 服务 {server_name} 的成员 {member['index']} 连续超时 {member['consecutive_timeouts']} 次，正在重建会话")
+                self._restart_in_background(server_name, member)
             
+            raise ToolTimeoutError(server_name, tool_name, timeout)
+        
+        member["consecutive_timeouts"] = 0
+        return result
+    
+    async def _send_cancel_notification(self, session: ClientSession, request_id: Any, reason: str):
+        """向 MCP 服务发送取消通知（notifications/cancelled），服务不支持时忽略"""
+        if request_id is None:
+            return
+        try:
+            notification = mcp_types.ClientNotification(
+                mcp_types.CancelledNotification(
+                    method="notifications/cancelled",
+                    params=mcp_types.CancelledNotificationParams(requestId=request_id, reason=reason)
+                )
+            )
+            await asyncio.wait_for(session.send_notification(notification), timeout=1)
+        except Exception as e:
+            print(f"  发送取消通知失败: {e}")
+    
+    async def invoke_tool(self, tool_name: str, args: Dict[str, Any], server_name: Optional[str] = None,
+                          timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        调用工具并返回可序列化的原始结果（不经过缓存系统）
+        
+        Args:
+            tool_name: 工具名称
+            args: 工具参数
+            server_name: 可选的服务名称，指定从哪个服务调用工具
+            timeout: 可选的本次调用超时（秒），覆盖服务与工具级配置
+        
+        Returns:
+            包含 server（实际调用的服务）、result（可序列化结果）、queue_wait（排队秒数）、
+            cache_hit（是否由记忆化结果直接返回）的字典
+        
+        Raises:
+            ValueError: 当工具不存在、服务不存在或达到最大调用次数时
+            ServerBusyError: 当服务并发已满且等待队列已满时
+            ToolTimeoutError: 当工具调用超时时
+        """
+        # 清理参数：移除值为 None 的键，因为某些 MCP 服务可能不支持 null 值
+        cleaned_args = {k: v for k, v in args.items() if v is not None}
+        
+        entry = self.resolve_tool(tool_name, server_name)
+        target_server = entry["server"]
+        
+        if not server_name:
             # 如果有多个服务提供同名工具，给出警告
+            matching_servers = self.tool_name_index.get(tool_name, [])
             if len(matching_servers) > 1:
                 print(f"⚠️  警告: 工具 {tool_name} 在多个服务中存在: {', '.join(matching_servers)}")
                 print(f"   将使用服务 {target_server}，建议在请求中指定 serverName 参数以避免歧义")
         
+        memo_config = self.clients[target_server]["config"].get("memoize", {}).get(tool_name)
+        if memo_config is None:
+            invocation = await self._invoke_upstream(target_server, tool_name, args, cleaned_args, timeout)
+            return {**invocation, "cache_hit": False}
+        
+        # 记忆化工具：命中时不经过服务，并发的相同调用合并为一次
+        invocation, cache_hit = await self.tool_memo.call(
+            target_server, tool_name, cleaned_args,
+            memo_config.get("ttl", 60), memo_config.get("max_entries", 256),
+            lambda: self._invoke_upstream(target_server, tool_name, args, cleaned_args, timeout)
+        )
+        if cache_hit:
+            print(f"[记忆命中] 服务: {target_server}, 工具: {tool_name}")
+            return {**invocation, "queue_wait": 0.0, "cache_hit": True}
+        return {**invocation, "cache_hit": False}
+    
+    async def _invoke_upstream(self, target_server: str, tool_name: str, args: Dict[str, Any],
+                               cleaned_args: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        """向服务发起一次工具调用（含调用次数检查、准入控制和会话池选择）"""
         # 检查调用次数
         call_key = f"{target_server}:{tool_name}"
         call_count = self.tool_call_history.get(call_key, 0)
@@ -749,238 +3590,746 @@ class MCPManager:
             print(f"[原始参数] {args}")
             print(f"[清理后参数] {cleaned_args}")
             
-            # 调用工具
-            result = await target_session.call_tool(tool_name, cleaned_args)
-            
-            # 获取服务配置
-            server_config = self.clients[target_server]["config"]
-            
-            # 将MCP结果转换为可序列化的格式
-            if hasattr(result, 'model_dump'):
-                # 使用Pydantic的model_dump方法（如果可用）
-                serializable_result = result.model_dump()
-            elif hasattr(result, '__dict__'):
-                # 尝试转换对象为字典
-                import copy
-                try:
-                    serializable_result = copy.deepcopy(result.__dict__)
-                except Exception:
-                    # 如果deepcopy失败，尝试手动转换
-                    serializable_result = {}
-                    for attr_name in dir(result):
-                        if not attr_name.startswith('_'):
-                            attr_value = getattr(result, attr_name)
-                            if isinstance(attr_value, (str, int, float, bool, list, dict, type(None))):
-                                serializable_result[attr_name] = attr_value
-                            else:
-                                # 尝试转换为字符串表示
-                                try:
-                                    serializable_result[attr_name] = str(attr_value)
-                                except:
-                                    serializable_result[attr_name] = f"<unserializable: {type(attr_value).__name__}>"
-            else:
-                # 如果无法转换，直接使用结果
-                serializable_result = result
+            # 准入控制：并发已满时排队，队列也满时快速失败
+            limiter = self.limiters.get(target_server)
+            queue_wait = await limiter.acquire() if limiter else 0.0
+            try:
+                # 未启动（按需启动或已被空闲回收）的服务在这里启动
+                client_data = await self._ensure_running(target_server)
+            except BaseException:
+                if limiter:
+                    limiter.release()
+                raise
+            call_timeout = self._get_call_timeout(client_data["config"], tool_name, timeout)
+            member = self._acquire_member(client_data)
+            try:
+                # 调用工具（会话池中在途请求最少的成员）
+                result = await self._call_with_deadline(target_server, member, tool_name, cleaned_args, call_timeout)
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream):
+                # 传输层已断开，单独重启该成员
+                member["healthy"] = False
+                self._restart_in_background(target_server, member)
+                raise
+            finally:
+                self._release_member(member)
+                client_data["last_used"] = time.time()
+                if limiter:
+                    limiter.release()
             
-            # 使用缓存系统处理结果
-            cached_result = self.cache_result(serializable_result, server_config)
+            serializable_result = self._to_serializable(result)
             
             # 重置调用计数
             self.tool_call_history[call_key] = 0
             
-            return cached_result
+            return {"server": target_server, "result": serializable_result, "queue_wait": queue_wait}
+        
+        except ServerBusyError:
+            # 被准入控制拒绝的调用未到达服务，不计入失败次数
+            raise
+        except Exception as e:
+            # 增加调用计数
+            self.tool_call_history[call_key] = call_count + 1
+            
+            # 打印详细错误信息
+            print(f"[工具执行失败] 服务: {target_server}, 工具: {tool_name}")
+            print(f"[错误类型] {type(e).__name__}")
+            print(f"[错误信息] {str(e)}")
+            raise
+    
+    @staticmethod
+    def _to_serializable(result: Any) -> Any:
+        """将MCP结果转换为可序列化的格式"""
+        if hasattr(result, 'model_dump'):
+            # 使用Pydantic的model_dump方法（如果可用）
+            serializable_result = result.model_dump()
+        elif hasattr(result, '__dict__'):
+            # 尝试转换对象为字典
+            import copy
+            try:
+                serializable_result = copy.deepcopy(result.__dict__)
+            except Exception:
+                # 如果deepcopy失败，尝试手动转换
+                serializable_result = {}
+                for attr_name in dir(result):
+                    if not attr_name.startswith('_'):
+                        attr_value = getattr(result, attr_name)
+                        if isinstance(attr_value, (str, int, float, bool, list, dict, type(None))):
+                            serializable_result[attr_name] = attr_value
+                        else:
+                            # 尝试转换为字符串表示
+                            try:
+                                serializable_result[attr_name] = str(attr_value)
+                            except:
+                                serializable_result[attr_name] = f"<unserializable: {type(attr_value).__name__}>"
+        else:
+            # 如果无法转换，直接使用结果
+            serializable_result = result
+        
+        return serializable_result
+    
+    async def execute_tool(self, tool_name: str, args: Dict[str, Any], server_name: Optional[str] = None,
+                           timeout: Optional[float] = None) -> Any:
+        """
+        执行工具，并根据结果大小决定直接返回或存入缓存
+        
+        Args:
+            tool_name: 工具名称
+            args: 工具参数
+            server_name: 可选的服务名称，指定从哪个服务调用工具
+            timeout: 可选的本次调用超时（秒），覆盖服务与工具级配置
+        
+        Returns:
+            工具执行结果（直接结果或缓存引用）
+        """
+        invocation = await self.invoke_tool(tool_name, args, server_name, timeout)
+        
+        # 使用缓存系统处理结果（序列化与文件缓存写入在 I/O 线程池中执行）
+        server_config = self.clients[invocation["server"]]["config"] if invocation["server"] in self.clients else {}
+        cached_result = await self.run_io(self.cache_result, invocation["result"], server_config)
+        cached_result["queue_wait_ms"] = round(invocation["queue_wait"] * 1000, 3)
+        cached_result["cache_hit"] = invocation["cache_hit"]
+        
+        return cached_result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取运行统计信息"""
+        servers = {}
+        for name, client_data in self.clients.items():
+            limiter = self.limiters.get(name)
+            servers[name] = {
+                "calls": self.call_metrics.get(name, {"calls": 0, "timeouts": 0, "recycled_sessions": 0}),
+                "concurrency": limiter.get_stats() if limiter else {},
+                "pool": [
+                    {"index": m["index"], "inflight": m["inflight"], "healthy": m["healthy"]}
+                    for m in client_data["pool"]
+                ],
+                "standby": "ready" if client_data.get("standby") else ("starting" if client_data.get("standby_task") else None),
+                "state": "running" if client_data["pool"] else ("starting" if client_data.get("start_task") else "stopped")
+            }
+        cache_stats = self.memory_cache.get_stats()
+        # I/O 线程池中的任务会同时更新统计计数，在锁内复制一份快照
+        with self.stats_lock:
+            cache_stats["demotions"] = self.demoted_cache_items
+            dedup_hits = self.file_cache_dedup_hits
+            write_stats = dict(self.file_cache_write_stats)
+            search_index_stats = dict(self.search_index_stats)
+            cpu_offload_stats = dict(self.cpu_offload_stats)
+        return {
+            "servers": servers,
+            "memory_cache": cache_stats,
+            "file_cache": {"backend": self.settings.cache_backend, "dedup_hits": dedup_hits,
+                           "writes": write_stats},
+            "tool_memo": self.tool_memo.get_stats(),
+            "search_index": {**search_index_stats, "loaded": len(self.search_indexes),
+                             "building": len(self.search_index_builds)},
+            "cpu_offload": {"workers": max(0, self.settings.cpu_workers),
+                            "min_bytes": self.settings.cpu_offload_min_bytes, "tasks": cpu_offload_stats},
+            "cache_janitor": self.janitor_stats
+        }
+    
+    async def collect_stats(self) -> Dict[str, Any]:
+        """获取运行统计信息（多进程模式下由工作进程合并监督者的统计）"""
+        return self.get_stats()
+    
+    def reset_tool_call_history(self):
+        """重置工具调用历史"""
+        self.tool_call_history.clear()
+    
+    async def reset_history(self):
+        """重置工具调用历史（多进程模式下转发给监督者）"""
+        self.reset_tool_call_history()
+    
+    def open_storage(self):
+        """启动时打开缓存存储：使用 SQLite 后端（或已存在 cache.db）时打开共享数据库，以便读取与清理其他进程写入的条目"""
+        self._get_sqlite_cache(for_read=True)
+    
+    def close_storage(self):
+        """等待进行中的缓存写入、索引建立与计算任务完成，再关闭缓存存储"""
+        with self.io_executor_lock:
+            executor = self.io_executor
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self.cpu_executor is not None:
+            self.cpu_executor.shutdown(wait=True)
+        if self.sqlite_cache is not None:
+            self.sqlite_cache.close()
+    
+    async def shutdown(self):
+        """并行关闭所有服务器连接，并等待后台关闭中的成员完成"""
+        # 先取消后台重启（被取消的启动会回收已启动的子进程），避免关闭期间再有新成员加入会话池
+        for task in list(self.restart_tasks):
+            task.cancel()
+        if self.restart_tasks:
+            await asyncio.gather(*list(self.restart_tasks), return_exceptions=True)
+        await asyncio.gather(*[self.shutdown_server(name) for name in list(self.clients.keys())])
+        if self.closing_tasks:
+            await asyncio.gather(*list(self.closing_tasks), return_exceptions=True)
+    
+    async def shutdown_server(self, server_name: str):
+        """关闭指定的服务器连接，等待全部成员的会话关闭、子进程退出（超时后强制结束）"""
+        if server_name not in self.clients:
+            print(f"服务器 {server_name} 不存在，无需关闭")
+            return
+        
+        # 先从字典和路由索引中移除（新的调用不再路由到该服务），并使该服务的记忆结果失效
+        client_data = self.clients[server_name]
+        self._unregister_server_tools(server_name)
+        self.tool_memo.invalidate(server_name)
+        self.clients.pop(server_name, None)
+        self.limiters.pop(server_name, None)
+        
+        # 正在按需启动的服务：取消启动并等待启动任务回收已启动的子进程
+        start_task = client_data.get("start_task")
+        if start_task is not None:
+            start_task.cancel()
+        
+        # 会话池成员并行关闭，每个成员由其所有者任务关闭，超时后强制结束
+        server_type = client_data.get("type", "stdio")
+        results = await asyncio.gather(
+            *([start_task] if start_task is not None else []),
+            self._discard_standby(client_data),
+            *[self._close_member(server_type, member) for member in client_data.get("pool", [])],
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            print(f"关闭服务器 {server_name} 时出错: {errors[0]}")
+        print(f"已关闭服务器: {server_name}")
+    
+    def _get_cache_directory(self) -> Path:
+        """获取缓存目录路径（首次调用时创建，之后直接返回）"""
+        if self.cache_dir is None:
+            # 根据操作系统确定缓存目录
+            if sys.platform == "win32":
+                cache_dir = Path(os.environ.get("APPDATA", "")) / "mcp-bridge" / "cache"
+            elif sys.platform == "darwin":
+                cache_dir = Path.home() / "Library" / "Application Support" / "mcp-bridge" / "cache"
+            else:  # Linux and others
+                cache_dir = Path.home() / ".cache" / "mcp-bridge"
+            
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.cache_dir = cache_dir
+        return self.cache_dir
+    
+    def _get_sqlite_cache(self, for_read: bool = False) -> Optional[SqliteCacheTier]:
+        """
+        当前使用 SQLite 存储后端时返回数据库（首次使用时打开），否则返回 None
+        
+        读取与清理时 for_read 为 True：即使本进程尚未写入，也会打开数据库以读取其他进程（或重启前）写入的条目；
+        切换到 files 后端后，已存在的数据库同样会被打开，其中的条目仍可读取直至过期。
+        """
+        if self.sqlite_cache is None:
+            path = self._get_cache_directory() / "cache.db"
+            if self.settings.cache_backend != "sqlite" and not (for_read and path.exists()):
+                return None
+            with self.sqlite_cache_lock:
+                if self.sqlite_cache is None:
+                    self.sqlite_cache = SqliteCacheTier(path)
+        elif self.settings.cache_backend != "sqlite" and not for_read:
+            return None
+        return self.sqlite_cache
+    
+    def _blob_store(self, metadata: Dict[str, Any]) -> Optional[SqliteCacheTier]:
+        """元数据来自 SQLite 后端时返回该数据库，来自文件时返回 None"""
+        return self.sqlite_cache if metadata.get("store") == "sqlite" else None
+    
+    def _get_blob_path(self, digest: str) -> Path:
+        """获取内容 blob 文件路径"""
+        return self._get_cache_directory() / f"{digest}.blob"
+    
+    def _get_sidecar_path(self, digest: str, suffix: str) -> Path:
+        """获取 blob 的索引文件路径（suffix 为 BLOB_SIDECAR_SUFFIXES 之一）"""
+        return self._get_cache_directory() / f"{digest}{suffix}"
+    
+    def _has_sidecar(self, digest: str, suffix: str, store: Optional[SqliteCacheTier] = None) -> bool:
+        """blob 的索引是否已存在"""
+        if store is not None:
+            return store.has_part(digest, suffix)
+        return self._get_sidecar_path(digest, suffix).exists()
+    
+    def _write_sidecar(self, digest: str, suffix: str, data: bytes, store: Optional[SqliteCacheTier] = None):
+        """写入 blob 的索引（文件后端先写临时文件再原子替换）"""
+        if store is not None:
+            store.write_part(digest, suffix, data)
+            return
+        index_file = self._get_sidecar_path(digest, suffix)
+        tmp_file = index_file.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, index_file)
+    
+    def _read_sidecar(self, digest: str, suffix: str, store: Optional[SqliteCacheTier] = None) -> Optional[bytes]:
+        """读取 blob 的索引，不存在时返回 None"""
+        if store is not None:
+            return store.read_part(digest, suffix)
+        try:
+            with open(self._get_sidecar_path(digest, suffix), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def _remove_sidecar(self, digest: str, suffix: str, store: Optional[SqliteCacheTier] = None):
+        if store is not None:
+            store.delete_part(digest, suffix)
+        else:
+            self._get_sidecar_path(digest, suffix).unlink(missing_ok=True)
+    
+    def _open_blob_data(self, digest: str, resources: List[Any], store: Optional[SqliteCacheTier] = None) -> Any:
+        """只读打开 blob 数据（压缩的 blob 包装为 CompressedBlob），资源追加到 resources"""
+        if store is None:
+            return open_blob_readonly(self._get_blob_path(digest), resources)
+        view = SqliteBlobView(store.open_part(digest, ".blob"))
+        resources.append(view)
+        return wrap_blob_data(view, resources)
+    
+    def _open_cache_data(self, cache_id: str, metadata: Dict[str, Any], resources: List[Any]) -> Any:
+        """只读打开别名对应的数据（旧格式缓存直接映射 <cache_id>.txt）"""
+        if metadata.get("blob"):
+            return self._open_blob_data(metadata["blob"], resources, self._blob_store(metadata))
+        return open_blob_readonly(self._get_cache_data_path(cache_id, metadata), resources)
+    
+    def _blob_location(self, digest: str, store: Optional[SqliteCacheTier] = None) -> Tuple[str, ...]:
+        """blob 数据的位置描述，供计算进程池中的任务自行打开（见 open_blob_location）"""
+        if store is not None:
+            return ("sqlite", str(store.path), digest)
+        return ("file", str(self._get_blob_path(digest)))
+    
+    def _cache_data_location(self, cache_id: str, metadata: Dict[str, Any]) -> Tuple[str, ...]:
+        """别名对应数据的位置描述（旧格式缓存为 <cache_id>.txt）"""
+        if metadata.get("blob"):
+            return self._blob_location(metadata["blob"], self._blob_store(metadata))
+        return ("file", str(self._get_cache_data_path(cache_id, metadata)))
+    
+    def _encode_blob(self, data: bytes) -> Tuple[bytes, Optional[str]]:
+        """按配置与大小决定 blob 的存储形式，返回 (写入文件的字节, 压缩算法或 None)"""
+        mode = self.settings.file_cache_compression
+        if mode == "none" or len(data) < max(1, self.settings.file_cache_compress_min_bytes):
+            return data, None
+        codec = "zlib" if mode == "zlib" or zstd is None else "zstd"
+        packed = CompressedBlob.pack(data, codec)
+        if len(packed) > len(data) * (1 - COMPRESSION_MIN_SAVING):
+            # 压缩收益太小（如已压缩的数据），按原样存储以免读取时白白解压
+            return data, None
+        return packed, codec
+    
+    @staticmethod
+    def _read_blob_format(blob_file: Path) -> Tuple[Optional[str], int]:
+        """读取已有 blob 的压缩算法与文件大小"""
+        with open(blob_file, 'rb') as f:
+            header = f.read(CompressedBlob.HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+        if header[:len(BLOB_MAGIC)] != BLOB_MAGIC or len(header) < CompressedBlob.HEADER.size:
+            return None, size
+        return BLOB_CODECS.get(CompressedBlob.HEADER.unpack(header)[1]), size
+    
+    def _get_cache_data_path(self, cache_id: str, metadata: Dict[str, Any]) -> Path:
+        """获取别名对应的数据文件路径（旧格式缓存直接使用 <cache_id>.txt）"""
+        digest = metadata.get("blob")
+        if digest:
+            return self._get_blob_path(digest)
+        return self._get_cache_directory() / f"{cache_id}.txt"
+    
+    def _store_in_file_cache(self, envelope: ResultEnvelope, ttl: float, cache_id: Optional[str] = None) -> str:
+        """
+        将结果信封存储到文件缓存并返回ID
+        
+        数据按内容哈希写入 <digest>.blob（已存在则跳过写入，较大的数据分块压缩存储），
+        <cache_id>.meta 作为指向 blob 的别名记录过期时间、原始大小与存储大小。
+        使用 SQLite 后端时 blob、索引与别名在同一个事务内写入数据库。
+        """
+        cache_id = cache_id or str(uuid.uuid4())
+        cache_dir = self._get_cache_directory()
+        store = self._get_sqlite_cache()
+        digest = envelope.digest
+        now = time.time()
+        
+        if store is not None:
+            existing = store.touch_blob(digest, now)
+        else:
+            blob_file = self._get_blob_path(digest)
+            try:
+                existing = self._read_blob_format(blob_file)
+            except FileNotFoundError:
+                existing = None
+            else:
+                # 只刷新修改时间，避免被垃圾回收误删
+                try:
+                    os.utime(blob_file)
+                except OSError:
+                    pass
+        
+        parts: Optional[Dict[str, bytes]] = None
+        if existing is not None:
+            # 相同内容已存储：跳过写入
+            compression, stored_size = existing
+            with self.stats_lock:
+                self.file_cache_dedup_hits += 1
+        else:
+            payload, compression = self._encode_blob(envelope.data)
+            stored_size = len(payload)
+            parts = {".blob": payload}
+            for suffix in (".lines", ".pages"):
+                parts[suffix] = self._build_sidecar(envelope, suffix).tobytes()
+            if store is None:
+                # 先写临时文件再原子替换，读取方不会看到写了一半的 blob
+                tmp_file = cache_dir / f"{digest}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_file, blob_file)
+                for suffix in (".lines", ".pages"):
+                    self._write_sidecar(digest, suffix, parts[suffix])
+            with self.stats_lock:
+                self.file_cache_write_stats["blobs"] += 1
+                self.file_cache_write_stats["compressed_blobs"] += compression is not None
+                self.file_cache_write_stats["raw_bytes"] += envelope.size
+                self.file_cache_write_stats["stored_bytes"] += stored_size
+        
+        metadata = {
+            "blob": digest,
+            "created_at": now,
+            "expires_at": now + ttl,
+            "size": envelope.size,
+            "stored_size": stored_size,
+            "compression": compression,
+            "kind": envelope.kind
+        }
+        if store is not None:
+            store.put(cache_id, metadata, parts)
+        else:
+            # 创建元数据文件（别名）
+            with open(cache_dir / f"{cache_id}.meta", 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
         
-        except Exception as e:
-            # 增加调用计数
-            self.tool_call_history[call_key] = call_count + 1
-            
-            # 打印详细错误信息
-            print(f"[工具执行失败] 服务: {target_server}, 工具: {tool_name}")
-            print(f"[错误类型] {type(e).__name__}")
-            print(f"[错误信息] {str(e)}")
-            raise
-    
-    def reset_tool_call_history(self):
-        """重置工具调用历史"""
-        self.tool_call_history.clear()
+        eager_bytes = self.settings.search_index_eager_bytes
+        if parts is not None and 0 < eager_bytes <= envelope.size:
+            self._schedule_search_index_build(digest, store)
+        
+        return cache_id
     
-    async def shutdown(self):
-        """关闭所有服务器连接"""
-        for name in list(self.clients.keys()):
-            await self.shutdown_server(name)
+    def _scan_cache_directory(self, cache_dir: Path) -> Dict[str, Dict[str, os.DirEntry]]:
+        """按扩展名列出缓存目录中的文件：{".meta": {stem: entry}, ".blob": {...}, ".txt": {...}, ".tmp": {...}, 各索引后缀: {...}}"""
+        files: Dict[str, Dict[str, os.DirEntry]] = {".meta": {}, ".blob": {}, ".txt": {}, ".tmp": {}}
+        for suffix in BLOB_SIDECAR_SUFFIXES:
+            files[suffix] = {}
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if ext in files:
+                    files[ext][stem] = entry
+        return files
     
-    async def shutdown_server(self, server_name: str):
-        """关闭指定的服务器连接"""
-        if server_name not in self.clients:
-            print(f"服务器 {server_name} 不存在，无需关闭")
-            return
+    def cleanup_orphan_cache_files(self) -> Dict[str, int]:
+        """
+        清理缓存目录中的孤立文件（启动时调用）
         
-        client_data = self.clients[server_name]
+        包括无法解析或指向不存在数据的 .meta、缺少 .meta 的旧格式 .txt、
+        没有任何别名引用的 .blob 及其索引文件，以及写入中断残留的 .tmp
+        """
+        cache_dir = self._get_cache_directory()
+        files = self._scan_cache_directory(cache_dir)
         
-        try:
-            # 创建一个新任务来处理关闭，避免 cancel scope 错误
-            async def cleanup():
-                try:
-                    # 先关闭会话上下文
-                    session_context = client_data.get("session_context")
-                    if session_context:
-                        try:
-                            await session_context.__aexit__(None, None, None)
-                        except Exception as e:
-                            print(f"  关闭会话上下文时出错: {e}")
-                    
-                    # 根据类型关闭对应的传输层连接
-                    server_type = client_data.get("type", "stdio")
-                    if server_type == "sse":
-                        sse_context = client_data.get("sse_context")
-                        if sse_context:
-                            try:
-                                await sse_context.__aexit__(None, None, None)
-                            except Exception as e:
-                                print(f"  关闭 SSE 连接时出错: {e}")
-                    else:
-                        stdio_context = client_data.get("stdio_context")
-                        if stdio_context:
-                            try:
-                                await stdio_context.__aexit__(None, None, None)
-                            except Exception as e:
-                                print(f"  关闭 stdio 连接时出错: {e}")
-                except Exception as e:
-                    print(f"  清理资源时出错: {e}")
-            
-            # 使用 asyncio.create_task 在新任务中执行清理
-            # 但我们不等待它完成，让它在后台运行
-            asyncio.create_task(cleanup())
-            
-            # 给一点时间让清理开始
-            await asyncio.sleep(0.1)
+        removed_files = 0
+        bytes_reclaimed = 0
+        
+        def remove(path: Path):
+            nonlocal removed_files, bytes_reclaimed
+            removed, size = self._unlink_cache_file(path)
+            removed_files += removed
+            bytes_reclaimed += size
+        
+        referenced_blobs = set()
+        referenced_legacy = set()
+        for cache_id, entry in files[".meta"].items():
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                digest = metadata.get("blob")
+            except Exception:
+                remove(Path(entry.path))
+                continue
             
-            print(f"已关闭服务器: {server_name}")
+            if digest:
+                if digest in files[".blob"]:
+                    referenced_blobs.add(digest)
+                    continue
+            elif cache_id in files[".txt"]:
+                referenced_legacy.add(cache_id)
+                continue
+            # 数据文件缺失
+            remove(Path(entry.path))
+        
+        for digest, entry in files[".blob"].items():
+            if digest not in referenced_blobs:
+                remove(Path(entry.path))
+        for suffix in BLOB_SIDECAR_SUFFIXES:
+            for digest, entry in files[suffix].items():
+                if digest not in referenced_blobs:
+                    remove(Path(entry.path))
+        for cache_id, entry in files[".txt"].items():
+            if cache_id not in referenced_legacy:
+                remove(Path(entry.path))
+        for entry in files[".tmp"].values():
+            remove(Path(entry.path))
+        
+        if removed_files:
+            print(f"[缓存清理] 已删除 {removed_files} 个孤立缓存文件，释放 {bytes_reclaimed} 字节")
+        return {"removed_files": removed_files, "bytes_reclaimed": bytes_reclaimed}
+    
+    @staticmethod
+    def _unlink_cache_file(path: Path) -> Tuple[int, int]:
+        """删除缓存文件，返回 (删除数量, 释放字节数)"""
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return 1, size
+        except FileNotFoundError:
+            return 0, 0
         except Exception as e:
-            print(f"关闭服务器 {server_name} 失败: {e}")
-        finally:
-            # 无论如何都从字典中移除
-            self.clients.pop(server_name, None)
+            print(f"[缓存清理] 删除 {path.name} 失败: {e}")
+            return 0, 0
     
-    def _get_cache_directory(self) -> Path:
-        """获取缓存目录路径"""
-        # 根据操作系统确定缓存目录
-        if sys.platform == "win32":
-            cache_dir = Path(os.environ.get("APPDATA", "")) / "mcp-bridge" / "cache"
-        elif sys.platform == "darwin":
-            cache_dir = Path.home() / "Library" / "Application Support" / "mcp-bridge" / "cache"
-        else:  # Linux and others
-            cache_dir = Path.home() / ".cache" / "mcp-bridge"
+    def _sweep_cache_batch(self, cache_dir: Path, meta_names: List[str], now: float,
+                           live_entries: List[Tuple[float, str, str]]) -> Tuple[int, int]:
+        """
+        处理一批 .meta 文件：删除已过期的别名，记录未过期别名 (创建时间, cache_id, 数据文件名)
+        用于 blob 垃圾回收和配额检查
+        """
+        removed = 0
+        bytes_reclaimed = 0
+        for name in meta_names:
+            cache_id = name[:-len(".meta")]
+            try:
+                with open(cache_dir / name, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except FileNotFoundError:
+                # 别名已被读取路径删除
+                continue
+            except Exception:
+                metadata = {}
+            
+            data_name = self._get_cache_data_path(cache_id, metadata).name
+            if now > metadata.get("expires_at", 0):
+                paths = [cache_dir / name]
+                if not metadata.get("blob"):
+                    # 旧格式缓存的数据文件只属于这一个别名
+                    paths.append(cache_dir / data_name)
+                for path in paths:
+                    _, size = self._unlink_cache_file(path)
+                    bytes_reclaimed += size
+                removed += 1
+            else:
+                live_entries.append((metadata.get("created_at", 0), cache_id, data_name))
+        return removed, bytes_reclaimed
+    
+    def _collect_file_cache_blobs(self, cache_dir: Path, files: Dict[str, Dict[str, os.DirEntry]],
+                                  live_entries: List[Tuple[float, str, str]], now: float) -> Tuple[int, int, int, int]:
+        """
+        回收无别名引用的 blob，并按磁盘配额从最旧的数据开始淘汰
+        
+        Returns:
+            (回收的 blob 数, 因配额删除的别名数, 释放字节数, 剩余数据总字节数)
+        """
+        bytes_reclaimed = 0
+        # 按数据文件分组：每个数据文件的大小、最新引用时间和引用它的别名
+        data_groups: Dict[str, Dict[str, Any]] = {}
+        for created_at, cache_id, data_name in live_entries:
+            group = data_groups.setdefault(data_name, {"latest": 0, "aliases": [], "size": 0})
+            group["latest"] = max(group["latest"], created_at)
+            group["aliases"].append(cache_id)
+        
+        # 回收没有别名引用的 blob（跳过刚写入的 blob，其别名可能尚未落盘）
+        blobs_collected = 0
+        for digest, entry in files[".blob"].items():
+            group = data_groups.get(entry.name)
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if group is not None:
+                group["size"] = stat.st_size
+            elif now - stat.st_mtime > BLOB_GC_GRACE_SECONDS:
+                for path in [Path(entry.path)] + [self._get_sidecar_path(digest, suffix) for suffix in BLOB_SIDECAR_SUFFIXES]:
+                    _, reclaimed = self._unlink_cache_file(path)
+                    bytes_reclaimed += reclaimed
+                blobs_collected += 1
+        for data_name, group in data_groups.items():
+            if not group["size"] and data_name.endswith(".txt"):
+                try:
+                    group["size"] = (cache_dir / data_name).stat().st_size
+                except FileNotFoundError:
+                    pass
         
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        return cache_dir
+        # 磁盘配额：按最新引用时间从最旧的数据开始删除，同一份数据只计算一次大小
+        quota_removed = 0
+        quota = self.settings.cache_disk_quota_bytes
+        total_bytes = sum(group["size"] for group in data_groups.values())
+        if quota > 0 and total_bytes > quota:
+            for data_name, group in sorted(data_groups.items(), key=lambda item: item[1]["latest"]):
+                if total_bytes <= quota:
+                    break
+                for cache_id in group["aliases"]:
+                    _, reclaimed = self._unlink_cache_file(cache_dir / f"{cache_id}.meta")
+                    bytes_reclaimed += reclaimed
+                    quota_removed += 1
+                stem = Path(data_name).stem
+                for path in [cache_dir / data_name] + [cache_dir / f"{stem}{suffix}" for suffix in BLOB_SIDECAR_SUFFIXES]:
+                    _, reclaimed = self._unlink_cache_file(path)
+                    bytes_reclaimed += reclaimed
+                total_bytes -= group["size"]
+        return blobs_collected, quota_removed, bytes_reclaimed, total_bytes
     
-    def _store_in_file_cache(self, content: Any, ttl: int) -> str:
-        """将内容存储到文件缓存并返回ID"""
-        cache_id = str(uuid.uuid4())
-        cache_file = self._get_cache_directory() / f"{cache_id}.txt"
+    async def sweep_file_cache(self) -> Dict[str, Any]:
+        """
+        增量清理文件缓存：分批删除过期别名，回收不再被引用的 blob，
+        再按磁盘配额从最旧的数据开始淘汰（连同引用它的全部别名）
         
-        # 序列化内容
-        if isinstance(content, str):
-            content_str = content
-        else:
-            content_str = json.dumps(content, ensure_ascii=False, indent=2)
+        Returns:
+            本次清理的统计信息（耗时、删除条目数、释放字节数）
+        """
+        start_time = time.perf_counter()
+        now = time.time()
+        cache_dir = self._get_cache_directory()
+        batch_size = max(1, self.settings.cache_sweep_batch_size)
         
-        # 写入文件
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(content_str)
+        # 顺带清理内存缓存中的过期项
+        memory_expired = self.memory_cache.purge_expired(now)
         
-        # 创建元数据文件
-        metadata_file = self._get_cache_directory() / f"{cache_id}.meta"
-        metadata = {
-            "created_at": time.time(),
-            "expires_at": time.time() + ttl,
-            "size": len(content_str.encode('utf-8'))
-        }
+        files = await self.run_io(self._scan_cache_directory, cache_dir)
+        meta_names = [entry.name for entry in files[".meta"].values()]
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f)
+        expired_removed = 0
+        bytes_reclaimed = 0
+        live_entries: List[Tuple[float, str, str]] = []
+        for i in range(0, len(meta_names), batch_size):
+            # 每批在 I/O 线程池中执行，批次之间其他请求的磁盘操作可以插入
+            removed, reclaimed = await self.run_io(self._sweep_cache_batch, cache_dir, meta_names[i:i + batch_size],
+                                                   now, live_entries)
+            expired_removed += removed
+            bytes_reclaimed += reclaimed
         
-        return cache_id
+        blobs_collected, quota_removed, reclaimed, total_bytes = await self.run_io(
+            self._collect_file_cache_blobs, cache_dir, files, live_entries, now)
+        bytes_reclaimed += reclaimed
+        
+        files_scanned = len(meta_names)
+        store = await self.run_io(self._get_sqlite_cache, True)
+        if store is not None:
+            # SQLite 后端：过期别名由一条 DELETE 删除，统计计入本次清理
+            db_sweep = await self.run_io(store.sweep, now, self.settings.cache_disk_quota_bytes)
+            files_scanned += db_sweep["files_scanned"]
+            expired_removed += db_sweep["expired_removed"]
+            quota_removed += db_sweep["quota_removed"]
+            blobs_collected += db_sweep["blobs_collected"]
+            bytes_reclaimed += db_sweep["bytes_reclaimed"]
+            total_bytes += db_sweep["disk_usage_bytes"]
+        
+        sweep = {
+            "at": now,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 3),
+            "files_scanned": files_scanned,
+            "expired_removed": expired_removed,
+            "quota_removed": quota_removed,
+            "blobs_collected": blobs_collected,
+            "memory_expired": memory_expired,
+            "bytes_reclaimed": bytes_reclaimed,
+            "disk_usage_bytes": total_bytes
+        }
+        self.janitor_stats["sweeps"] += 1
+        self.janitor_stats["total_bytes_reclaimed"] += bytes_reclaimed
+        self.janitor_stats["last_sweep"] = sweep
+        
+        if expired_removed or quota_removed or blobs_collected:
+            print(f"[缓存清理] 删除过期条目 {expired_removed} 个、超出配额条目 {quota_removed} 个、"
+                  f"无引用数据 {blobs_collected} 个，释放 {bytes_reclaimed} 字节，耗时 {sweep['duration_ms']}ms")
+        return sweep
     
-    def _get_from_file_cache(self, cache_id: str) -> Optional[Any]:
-        """从文件缓存获取内容"""
-        cache_file = self._get_cache_directory() / f"{cache_id}.txt"
-        metadata_file = self._get_cache_directory() / f"{cache_id}.meta"
+    async def run_cache_janitor(self):
+        """后台缓存清理循环"""
+        while True:
+            interval = self.settings.cache_sweep_interval
+            await asyncio.sleep(interval if interval > 0 else 60)
+            if interval <= 0:
+                continue
+            try:
+                await self.sweep_file_cache()
+            except Exception as e:
+                print(f"[缓存清理] 执行失败: {e}")
+    
+    def _get_file_cache_metadata(self, cache_id: str) -> Optional[Dict[str, Any]]:
+        """读取文件缓存的元数据，缓存不存在或已过期时返回 None（过期的别名会被删除）"""
+        store = self._get_sqlite_cache(for_read=True)
+        if store is not None:
+            metadata = store.get(cache_id, time.time())
+            if metadata is not None:
+                return metadata
         
-        # 检查文件是否存在
-        if not cache_file.exists() or not metadata_file.exists():
-            return None
+        metadata_file = self._get_cache_directory() / f"{cache_id}.meta"
         
         # 检查过期时间
         try:
             with open(metadata_file, 'r', encoding='utf-8') as f:
                 metadata = json.load(f)
-            
-            if time.time() > metadata.get("expires_at", 0):
-                # 过期，删除文件
-                cache_file.unlink(missing_ok=True)
-                metadata_file.unlink(missing_ok=True)
-                return None
         except:
             return None
         
+        data_file = self._get_cache_data_path(cache_id, metadata)
+        if time.time() > metadata.get("expires_at", 0):
+            # 过期，删除别名；共享的 blob 由后台清理在无引用后回收
+            metadata_file.unlink(missing_ok=True)
+            if not metadata.get("blob"):
+                data_file.unlink(missing_ok=True)
+            return None
+        
+        # 检查数据文件是否存在
+        if not data_file.exists():
+            return None
+        
+        return metadata
+    
+    def _get_from_file_cache(self, cache_id: str) -> Optional[ResultEnvelope]:
+        """从文件缓存获取结果信封"""
+        metadata = self._get_file_cache_metadata(cache_id)
+        if metadata is None:
+            return None
+        
         # 读取内容
+        resources: List[Any] = []
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 尝试解析JSON，如果不是JSON则返回原字符串
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                return content
+            return ResultEnvelope(bytes(self._open_cache_data(cache_id, metadata, resources)), metadata.get("kind"))
         except:
             return None
+        finally:
+            close_resources(resources)
     
-    def _store_in_memory_cache(self, content: Any, ttl: int) -> str:
-        """将内容存储到内存缓存并返回ID"""
+    def _store_in_memory_cache(self, envelope: ResultEnvelope, ttl: int) -> str:
+        """将结果信封存储到内存缓存并返回ID（相同内容共享同一份数据）"""
         cache_id = str(uuid.uuid4())
-        
-        with self.cache_lock:
-            # 清理过期项
-            current_time = time.time()
-            expired_keys = []
-            for key, (_, expire_time) in list(self.memory_cache.items()):
-                if current_time > expire_time:
-                    expired_keys.append(key)
-            for key in expired_keys:
-                self.memory_cache.pop(key, None)
-            
-            # 如果达到最大容量，移除最旧的项
-            while len(self.memory_cache) >= self.max_memory_cache_items:
-                oldest_key = next(iter(self.memory_cache))
-                self.memory_cache.pop(oldest_key, None)
-            
-            # 存储新项
-            self.memory_cache[cache_id] = (content, current_time + ttl)
-        
+        self.memory_cache.put(cache_id, envelope, time.time() + ttl)
         return cache_id
     
-    def _get_from_memory_cache(self, cache_id: str) -> Optional[Any]:
-        """从内存缓存获取内容"""
-        with self.cache_lock:
-            if cache_id not in self.memory_cache:
-                return None
-            
-            content, expire_time = self.memory_cache[cache_id]
-            current_time = time.time()
-            
-            if current_time > expire_time:
-                # 过期，删除项
-                self.memory_cache.pop(cache_id, None)
-                return None
-            
-            # 移动到末尾（LRU策略）
-            self.memory_cache.pop(cache_id)
-            self.memory_cache[cache_id] = (content, expire_time)
-            
-            return content
+    def _schedule_demotion(self, envelope: ResultEnvelope, aliases: List[Tuple[str, float]]):
+        """内存缓存淘汰 blob 后（已释放内存缓存的锁）在 I/O 线程池中降级写入文件缓存"""
+        self._get_io_executor().submit(self._demote_to_file_cache, envelope, aliases)
+    
+    def _demote_to_file_cache(self, envelope: ResultEnvelope, aliases: List[Tuple[str, float]]):
+        """内存缓存淘汰的 blob 降级写入文件缓存（数据只写一次，各别名保持原 cache_id 与过期时间）"""
+        now = time.time()
+        try:
+            for cache_id, expires_at in aliases:
+                ttl = expires_at - now
+                if ttl <= 0:
+                    continue
+                self._store_in_file_cache(envelope, ttl, cache_id)
+                with self.stats_lock:
+                    self.demoted_cache_items += 1
+        except Exception as e:
+            print(f"缓存降级失败 ({envelope.digest}): {e}")
+        finally:
+            self.memory_cache.finish_demotion([cache_id for cache_id, _ in aliases])
+    
+    def _get_from_memory_cache(self, cache_id: str) -> Optional[ResultEnvelope]:
+        """从内存缓存获取结果信封"""
+        return self.memory_cache.get(cache_id)
     
     def cache_result(self, content: Any, server_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """根据内容大小和配置决定缓存策略"""
@@ -994,23 +4343,19 @@ class MCPManager:
         result_cache_ttl = server_config.get("result_cache_ttl", 300)
         max_memory_cache_size = server_config.get("max_memory_cache_size", 10240)  # 10KB
         
-        # 序列化内容以计算大小（字节数）
-        if isinstance(content, str):
-            content_str = content
-        else:
-            content_str = json.dumps(content, ensure_ascii=False)
-        
-        content_size = len(content_str.encode('utf-8'))
+        # 只序列化一次，大小计算与各级缓存共用同一份字节
+        envelope = self._create_envelope(content)
+        content_size = envelope.size
         
         if cache_large_results and content_size > max_output_bytes:
             # 内容超过阈值，需要缓存
-            if content_size <= max_memory_cache_size:
+            if content_size <= min(max_memory_cache_size, self.memory_cache.max_bytes):
                 # 使用内存缓存
-                cache_id = self._store_in_memory_cache(content, result_cache_ttl)
+                cache_id = self._store_in_memory_cache(envelope, result_cache_ttl)
                 cache_type = "memory"
             else:
                 # 使用文件缓存
-                cache_id = self._store_in_file_cache(content, result_cache_ttl)
+                cache_id = self._store_in_file_cache(envelope, result_cache_ttl)
                 cache_type = "file"
             
             return {
@@ -1027,191 +4372,527 @@ class MCPManager:
                 "result": content
             }
     
+    def _get_envelope(self, cache_id: str) -> Optional[ResultEnvelope]:
+        """获取缓存结果信封（先内存后文件）"""
+        envelope = self._get_from_memory_cache(cache_id)
+        if envelope is not None:
+            return envelope
+        return self._get_from_file_cache(cache_id)
+    
     def get_cached_result(self, cache_id: str) -> Optional[Any]:
         """获取缓存结果"""
-        # 首先尝试从内存缓存获取
-        result = self._get_from_memory_cache(cache_id)
-        if result is not None:
-            return result
-        
-        # 如果内存中没有，尝试从文件缓存获取
-        return self._get_from_file_cache(cache_id)
+        envelope = self._get_envelope(cache_id)
+        return envelope.value if envelope is not None else None
     
     def get_cached_result_partial(self, cache_id: str, start: int = 0, end: Optional[int] = None) -> Dict[str, Any]:
-        """获取缓存结果的部分内容"""
-        content = self.get_cached_result(cache_id)
-        if content is None:
+        """
+        获取缓存结果的部分内容
+        
+        直接从已序列化的字节中读取：JSON 数组按元素分页，其他内容按字符分页，
+        通过分页索引定位字节偏移，每页开销与页大小成正比。
+        """
+        reader = self._open_page_reader(cache_id)
+        if reader is None:
             return {"error": "缓存ID不存在或已过期"}
         
-        if isinstance(content, str):
-            # 字符串内容的分段
-            total_len = len(content)
-            actual_end = min(end, total_len) if end is not None else total_len
-            actual_start = max(0, start)
-            
-            return {
-                "content": content[actual_start:actual_end],
-                "total_length": total_len,
-                "start": actual_start,
-                "end": actual_end,
-                "has_more": actual_end < total_len
-            }
-        elif isinstance(content, list):
-            # 列表内容的分段
-            total_len = len(content)
-            actual_end = min(end, total_len) if end is not None else total_len
+        with reader:
             actual_start = max(0, start)
-            
-            return {
-                "content": content[actual_start:actual_end],
-                "total_length": total_len,
-                "start": actual_start,
-                "end": actual_end,
-                "has_more": actual_end < total_len
-            }
-        else:
-            # 其他类型（如dict、对象）：序列化为JSON字符串后分段
-            content_str = json.dumps(content, ensure_ascii=False, indent=2)
-            total_len = len(content_str)
+            if reader.item_count is not None:
+                # 列表内容的分段（按元素）
+                total_len = reader.item_count
+                actual_end = min(end, total_len) if end is not None else total_len
+                content = reader.read_items(actual_start, actual_end)
+            elif reader.kind != "text" and bytes(reader.data[:64]).lstrip().startswith(b"["):
+                # 无法建立元素索引的数组（如旧格式缓存），回退到完整解析
+                content = None
+            else:
+                # 字符串或其他类型（dict 等）：基于已序列化的文本分段
+                total_len = reader.total_chars
+                actual_end = min(end, total_len) if end is not None else total_len
+                content = reader.read_chars(actual_start, actual_end)
+        
+        if content is None:
+            envelope = self._get_envelope(cache_id)
+            if envelope is None:
+                # 读取期间条目已过期或被清理
+                return {"error": "缓存ID不存在或已过期"}
+            items = envelope.value
+            total_len = len(items)
             actual_end = min(end, total_len) if end is not None else total_len
-            actual_start = max(0, start)
-            
-            return {
-                "content": content_str[actual_start:actual_end],
-                "total_length": total_len,
-                "start": actual_start,
-                "end": actual_end,
-                "has_more": actual_end < total_len
-            }
+            content = items[actual_start:actual_end]
+        
+        return {
+            "content": content,
+            "total_length": total_len,
+            "start": actual_start,
+            "end": actual_end,
+            "has_more": actual_end < total_len
+        }
+    
+    def get_cache_info(self, cache_id: str) -> Optional[Dict[str, Any]]:
+        """获取缓存结果的 ETag（内容哈希）、字节大小与类型，不存在时返回 None"""
+        envelope = self._get_from_memory_cache(cache_id)
+        if envelope is not None:
+            return {"etag": f'"{envelope.digest}"', "size": envelope.size, "kind": envelope.kind}
+        
+        metadata = self._get_file_cache_metadata(cache_id)
+        if metadata is None:
+            return None
+        digest = metadata.get("blob")
+        return {
+            "etag": f'"{digest}"' if digest else None,
+            "size": metadata.get("size", 0),
+            "kind": metadata.get("kind")
+        }
+    
+    def read_cached_bytes(self, cache_id: str, start: int, end: int) -> Optional[bytes]:
+        """读取缓存结果序列化字节的 [start, end) 范围（文件缓存只读取或解压覆盖该范围的部分）"""
+        envelope = self._get_from_memory_cache(cache_id)
+        if envelope is not None:
+            return envelope.data[start:end]
+        
+        metadata = self._get_file_cache_metadata(cache_id)
+        if metadata is None:
+            return None
+        resources: List[Any] = []
+        try:
+            data = self._open_cache_data(cache_id, metadata, resources)
+            return bytes(data[start:end])
+        finally:
+            close_resources(resources)
+    
+    def open_cached_result_stream(self, cache_id: str, start: int = 0, end: Optional[int] = None,
+                                  chunk_size: int = 65536) -> Optional[Iterator[Tuple[int, str]]]:
+        """
+        以分块方式读取缓存结果的文本表示（与 /result 分段使用相同的字符偏移）
+        
+        Returns:
+            产出 (字符偏移, 文本块) 的迭代器；缓存不存在或已过期时返回 None
+        """
+        envelope = self._get_from_memory_cache(cache_id)
+        if envelope is not None:
+            return self._iter_text_chunks(envelope.text, start, end, chunk_size)
+        
+        reader = self._open_page_reader(cache_id)
+        if reader is None:
+            return None
+        
+        # 文件缓存：通过分页索引定位起始字节后逐块读取，不把整个文件载入内存
+        with reader:
+            start = min(max(0, start), reader.total_chars)
+            byte_start = reader.char_to_byte(start)
+        metadata = self._get_file_cache_metadata(cache_id)
+        if metadata is None:
+            return None
+        return self._iter_file_chunks(cache_id, metadata, start, end, chunk_size, byte_start)
+    
+    @staticmethod
+    def _iter_text_chunks(text: str, start: int, end: Optional[int], chunk_size: int) -> Iterator[Tuple[int, str]]:
+        """按字符范围分块产出内存中的文本"""
+        actual_end = min(end, len(text)) if end is not None else len(text)
+        for offset in range(max(0, start), actual_end, chunk_size):
+            yield offset, text[offset:min(offset + chunk_size, actual_end)]
+    
+    def _iter_file_chunks(self, cache_id: str, metadata: Dict[str, Any], start: int, end: Optional[int],
+                          chunk_size: int, byte_start: int = 0) -> Iterator[Tuple[int, str]]:
+        """从 byte_start（对应字符偏移 start）开始按块产出文件中的文本，直到字符偏移 end（压缩的 blob 逐块解压）"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        offset = start
+        resources: List[Any] = []
+        try:
+            data = self._open_cache_data(cache_id, metadata, resources)
+            position = byte_start
+            while end is None or offset < end:
+                raw = data[position:position + chunk_size]
+                position += len(raw)
+                chunk = decoder.decode(raw, final=not raw)
+                if not chunk:
+                    if not raw:
+                        break
+                    continue
+                if end is not None and offset + len(chunk) > end:
+                    chunk = chunk[:end - offset]
+                yield offset, chunk
+                offset += len(chunk)
+        finally:
+            close_resources(resources)
     
-    def search_in_cache(self, cache_id: str, keyword: str, 
-                       case_sensitive: bool = False,
-                       max_results: int = 50) -> Dict[str, Any]:
+    def search_in_cache(self, cache_id: str, keyword: Optional[str] = None,
+                        case_sensitive: bool = False,
+                        max_results: int = 50,
+                        keywords: Optional[List[str]] = None,
+                        regex: bool = False,
+                        whole_word: bool = False,
+                        context_lines: int = 0) -> Dict[str, Any]:
         """
-        在缓存内容中搜索关键词（流式处理，性能优化）
+        在缓存内容中搜索关键词
+        
+        关键词编译为模式后在按行对齐的大块文本上扫描，不逐行复制；
+        文件缓存通过 mmap 分块解码，内存占用与块大小相关而非文件大小。
         
         Args:
             cache_id: 缓存ID
             keyword: 搜索关键词
             case_sensitive: 是否区分大小写
-            max_results: 最大返回结果数
+            max_results: 最大返回结果数（总匹配数始终精确统计）
+            keywords: 额外的关键词列表，与 keyword 一起匹配
+            regex: 关键词是否为正则表达式
+            whole_word: 是否只匹配完整单词
+            context_lines: 每个返回的匹配附带的前后上下文行数
         
         Returns:
-            搜索结果，包含匹配的行号、列号和内容片段
+            搜索结果，包含总匹配数、各关键词匹配数，以及匹配的行号、列号和内容片段
         """
-        # 首先尝试从内存缓存获取
-        content = self._get_from_memory_cache(cache_id)
+        all_keywords = ([keyword] if keyword else []) + list(keywords or [])
+        matcher = SearchMatcher(all_keywords, regex, whole_word, case_sensitive)
+        max_results = max(0, max_results)
         
-        if content is not None:
-            # 内存缓存：直接搜索
-            return self._search_in_memory(content, keyword, case_sensitive, max_results)
+        resources: List[Any] = []
+        used_index = False
+        try:
+            envelope = self._get_from_memory_cache(cache_id)
+            if envelope is not None:
+                # 内存缓存：直接搜索（复用信封上的文本）
+                blocks = number_text_blocks(iter([envelope.text]))
+            else:
+                metadata = self._get_file_cache_metadata(cache_id)
+                if metadata is None:
+                    raise ValueError("缓存不存在或已过期")
+                
+                # 字面量搜索优先通过倒排索引只验证候选行
+                candidate_blocks = None
+                if not regex and not any("\n" in kw for kw in all_keywords):
+                    candidate_blocks = self._get_indexed_blocks(cache_id, metadata, all_keywords, resources)
+                if candidate_blocks is not None:
+                    blocks = candidate_blocks
+                    used_index = True
+                elif self._should_offload(metadata.get("size", 0)):
+                    # 大条目的全文扫描交给计算进程池，由子进程自行打开数据
+                    blocks = None
+                    matches, counts = self._run_cpu(
+                        "search", search_blob_task, self._cache_data_location(cache_id, metadata),
+                        all_keywords, regex, whole_word, case_sensitive, max_results)
+                else:
+                    # 文件缓存：映射后分块解码搜索
+                    data = self._open_cache_data(cache_id, metadata, resources)
+                    blocks = number_text_blocks(iter_text_blocks(data))
+            
+            if blocks is not None:
+                matches, counts = self._search_blocks(blocks, matcher, max_results)
+        finally:
+            close_resources(resources)
+        with self.stats_lock:
+            self.search_index_stats["indexed_searches" if used_index else "scanned_searches"] += 1
         
-        # 尝试从文件缓存获取
-        cache_file = self._get_cache_directory() / f"{cache_id}.txt"
-        if cache_file.exists():
-            # 文件缓存：流式读取搜索
-            return self._search_in_file_streaming(cache_file, keyword, case_sensitive, max_results)
+        if context_lines > 0 and matches:
+            reader = self._open_line_reader(cache_id)
+            if reader is not None:
+                with reader:
+                    for match in matches:
+                        start_line = max(1, match["line"] - context_lines)
+                        end_line = min(reader.total_lines, match["line"] + context_lines)
+                        match["context"] = {
+                            "start_line": start_line,
+                            "end_line": end_line,
+                            "content": reader.read(start_line, end_line)
+                        }
         
-        raise ValueError("缓存不存在或已过期")
+        total_matches = sum(counts)
+        return {
+            "keyword": keyword if keyword else all_keywords[0],
+            "keywords": all_keywords,
+            "total_matches": total_matches,
+            "keyword_counts": {kw: count for kw, count in zip(all_keywords, counts)},
+            "used_index": used_index,
+            "matches": matches,
+            "truncated": total_matches > len(matches)
+        }
     
-    def _search_in_memory(self, content: Any, keyword: str, 
-                         case_sensitive: bool, max_results: int) -> Dict[str, Any]:
-        """在内存中的内容进行搜索"""
-        # 转换为字符串
-        if isinstance(content, str):
-            text = content
-        else:
-            text = json.dumps(content, ensure_ascii=False, indent=2)
+    @staticmethod
+    def _search_blocks(blocks: Iterator[Tuple[int, str]], matcher: SearchMatcher,
+                       max_results: int) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        在 (首行行号, 文本) 块中查找所有匹配，返回 (前 max_results 个匹配详情, 各关键词匹配数)
         
-        return self._search_in_text(text, keyword, case_sensitive, max_results)
-    
-    def _search_in_file_streaming(self, cache_file: Path, keyword: str,
-                                  case_sensitive: bool, max_results: int) -> Dict[str, Any]:
-        """流式读取文件并搜索（内存占用恒定）"""
-        matches = []
-        search_keyword = keyword if case_sensitive else keyword.lower()
-        line_num = 0
+        每块先精确计数，结果未满时再按位置顺序构造匹配详情，行号通过统计匹配之间的换行符得到。
+        """
+        counts = [0] * len(matcher.keywords)
+        matches: List[Dict[str, Any]] = []
         
-        try:
-            # 使用缓冲读取，每次读取 8KB
-            with open(cache_file, 'r', encoding='utf-8', buffering=8192) as f:
-                for line in f:
-                    line_num += 1
-                    search_line = line if case_sensitive else line.lower()
-                    
-                    # 查找所有匹配位置
-                    pos = 0
-                    while True:
-                        idx = search_line.find(search_keyword, pos)
-                        if idx == -1:
-                            break
-                        
-                        matches.append({
-                            "line": line_num,
-                            "column": idx,
-                            "content": line.strip()[:200]  # 限制长度避免过长
-                        })
-                        
-                        if len(matches) >= max_results:
-                            break
-                        
-                        pos = idx + 1
-                    
+        for line_base, text in blocks:
+            haystack, patterns, plain = matcher.prepare(text)
+            block_counts = matcher.count(haystack, patterns, plain)
+            counts = [total + count for total, count in zip(counts, block_counts)]
+            
+            if len(matches) < max_results and any(block_counts):
+                line_num = line_base
+                scanned = 0
+                for start, end, slot in matcher.iter_matches(haystack, patterns):
+                    line_num += text.count("\n", scanned, start)
+                    scanned = start
+                    line_start = text.rfind("\n", 0, start) + 1
+                    line_end = text.find("\n", start)
+                    if line_end < 0:
+                        line_end = len(text)
+                    if line_end - line_start <= SEARCH_SNIPPET_CHARS:
+                        snippet = text[line_start:line_end].strip()
+                    else:
+                        # 超长行只截取匹配附近的窗口
+                        snippet_start = max(line_start, start - SEARCH_SNIPPET_CHARS // 4)
+                        snippet = text[snippet_start:min(line_end, snippet_start + SEARCH_SNIPPET_CHARS)].strip()
+                    matches.append({
+                        "line": line_num,
+                        "column": start - line_start,
+                        "keyword": matcher.keywords[slot],
+                        "match": text[start:min(end, start + SEARCH_SNIPPET_CHARS)],
+                        "content": snippet
+                    })
                     if len(matches) >= max_results:
                         break
+        
+        return matches, counts
+    
+    def _get_indexed_blocks(self, cache_id: str, metadata: Dict[str, Any], keywords: List[str],
+                            resources: List[Any]) -> Optional[Iterator[Tuple[int, str]]]:
+        """
+        通过倒排索引得到只包含候选行的文本块，无可用索引或候选行过多时返回 None
+        
+        条目足够大但还没有索引时，在后台建立索引，本次搜索仍全文扫描。
+        """
+        digest = metadata.get("blob")
+        min_bytes = self.settings.search_index_min_bytes
+        if not digest or min_bytes <= 0 or metadata.get("size", 0) < min_bytes:
+            return None
+        
+        store = self._blob_store(metadata)
+        index = self._load_search_index(digest, store)
+        if index is None:
+            self._schedule_search_index_build(digest, store)
+            return None
+        
+        limit = int(index.total_lines * SEARCH_INDEX_MAX_CANDIDATE_RATIO)
+        candidates: set = set()
+        for keyword in keywords:
+            lines = index.candidate_lines(keyword, limit)
+            if lines is None:
+                return None
+            candidates |= lines
+            if len(candidates) > limit:
+                return None
+        
+        reader = self._open_line_reader(cache_id)
+        if reader is None:
+            return None
+        resources.append(reader)
+        return self._iter_line_runs(reader, sorted(candidates))
+    
+    @staticmethod
+    def _iter_line_runs(reader: LineReader, line_numbers: List[int]) -> Iterator[Tuple[int, str]]:
+        """将排好序的行号合并为连续区间，逐段产出 (首行行号, 文本)"""
+        index = 0
+        while index < len(line_numbers):
+            start = end = line_numbers[index]
+            index += 1
+            while index < len(line_numbers) and line_numbers[index] == end + 1:
+                end = line_numbers[index]
+                index += 1
+            yield start, reader.read(start, end)
+    
+    def _load_search_index(self, digest: str, store: Optional[SqliteCacheTier] = None) -> Optional[TokenIndex]:
+        """获取已建立的倒排索引（载入后缓存在内存中），尚未建立时返回 None"""
+        with self.search_index_lock:
+            index = self.search_indexes.get(digest)
+            if index is not None:
+                self.search_indexes.move_to_end(digest)
+                return index
+            if digest in self.search_index_builds:
+                return None
+        
+        data = self._read_sidecar(digest, ".tokens", store)
+        if data is None:
+            return None
+        try:
+            index = TokenIndex.from_bytes(data)
         except Exception as e:
-            print(f"流式搜索文件失败: {e}")
+            print(f"[搜索索引] 读取 {digest} 失败: {e}")
+            self._remove_sidecar(digest, ".tokens", store)
+            return None
+        
+        with self.search_index_lock:
+            self.search_indexes[digest] = index
+            while len(self.search_indexes) > SEARCH_INDEX_CACHE_SIZE:
+                self.search_indexes.popitem(last=False)
+        return index
+    
+    def _schedule_search_index_build(self, digest: str, store: Optional[SqliteCacheTier] = None):
+        """在后台线程中为 blob 建立倒排索引（同一 blob 只建立一次）"""
+        with self.search_index_lock:
+            if digest in self.search_index_builds:
+                return
+            self.search_index_builds.add(digest)
+        if self._has_sidecar(digest, ".tokens", store):
+            with self.search_index_lock:
+                self.search_index_builds.discard(digest)
+            return
+        
+        def build():
+            start_time = time.perf_counter()
+            resources: List[Any] = []
+            try:
+                if self.settings.cpu_workers > 0:
+                    # 建立索引的条目都足够大，直接交给计算进程池
+                    index_bytes = self._run_cpu("index", build_token_index_task, self._blob_location(digest, store))
+                else:
+                    index_bytes = TokenIndex.build(self._open_blob_data(digest, resources, store)).to_bytes()
+                self._write_sidecar(digest, ".tokens", index_bytes, store)
+                with self.stats_lock:
+                    self.search_index_stats["built"] += 1
+                print(f"[搜索索引] 已为 {digest} 建立索引，耗时 {round(time.perf_counter() - start_time, 3)}s")
+            except FileNotFoundError:
+                # blob 已被清理
+                pass
+            except Exception as e:
+                print(f"[搜索索引] 建立 {digest} 失败: {e}")
+            finally:
+                close_resources(resources)
+                with self.search_index_lock:
+                    self.search_index_builds.discard(digest)
+        
+        # 调用方可能已在 I/O 线程池中，直接提交任务而不经过事件循环
+        self._get_io_executor().submit(build)
+    
+    @staticmethod
+    def _build_sidecar(envelope: ResultEnvelope, suffix: str) -> array:
+        """构建信封的索引表：.lines 为行偏移索引，.pages 为分页索引"""
+        return envelope.line_offsets if suffix == ".lines" else envelope.page_table
+    
+    def _open_indexed_view(self, cache_id: str, suffix: str) -> Optional[Tuple[Any, Any, List[Any], Optional[str], Optional[str]]]:
+        """
+        打开缓存结果的数据与索引，返回 (数据, 索引表, 需关闭的资源, kind, 内容哈希)，不存在时返回 None
+        
+        内存缓存直接使用信封上惰性构建的索引；文件缓存通过 mmap 映射 blob（压缩的 blob 按块解压）与索引文件，
+        SQLite 后端通过增量 BLOB 句柄按需读取，都不把数据读入内存，索引缺失（如写入中断）时补建。
+        """
+        envelope = self._get_from_memory_cache(cache_id)
+        metadata = None
+        if envelope is None:
+            metadata = self._get_file_cache_metadata(cache_id)
+            if metadata is None:
+                return None
+            if not metadata.get("blob"):
+                # 旧格式缓存没有索引文件，载入后在内存中构建
+                envelope = self._get_from_file_cache(cache_id)
+                if envelope is None:
+                    return None
+        
+        if envelope is not None:
+            digest = envelope.digest if metadata is None else None
+            return envelope.data, self._build_sidecar(envelope, suffix), [], envelope.kind, digest
+        
+        digest = metadata["blob"]
+        kind = metadata.get("kind")
+        store = self._blob_store(metadata)
+        resources: List[Any] = []
+        try:
+            data = self._open_blob_data(digest, resources, store)
+            if not self._has_sidecar(digest, suffix, store):
+                table = self._build_sidecar(ResultEnvelope(bytes(data), kind), suffix)
+                self._write_sidecar(digest, suffix, table.tobytes(), store)
+            if store is not None:
+                table = SqliteUInt64Array(store.open_part(digest, suffix))
+                resources.append(table)
+                return data, table, resources, kind, digest
+            index_map = map_file_readonly(self._get_sidecar_path(digest, suffix), resources)
+            return data, memoryview(index_map).cast('Q'), resources, kind, digest
+        except Exception:
+            close_resources(resources)
             raise
+    
+    def _open_line_reader(self, cache_id: str) -> Optional[LineReader]:
+        """打开缓存结果的按行读取器，不存在时返回 None"""
+        view = self._open_indexed_view(cache_id, ".lines")
+        if view is None:
+            return None
+        data, table, resources, _, _ = view
+        return LineReader(data, table, resources)
+    
+    def _open_page_reader(self, cache_id: str) -> Optional[PageReader]:
+        """打开缓存结果的分页读取器，不存在时返回 None"""
+        view = self._open_indexed_view(cache_id, ".pages")
+        if view is None:
+            return None
+        data, table, resources, kind, digest = view
+        return PageReader(data, table, resources, kind, digest)
+    
+    def get_cache_lines(self, cache_id: str, start_line: int = 1,
+                        end_line: Optional[int] = None) -> Dict[str, Any]:
+        """
+        读取缓存结果的指定行范围
         
-        return {
-            "keyword": keyword,
-            "total_matches": len(matches),
-            "matches": matches,
-            "truncated": len(matches) >= max_results
-        }
+        Args:
+            cache_id: 缓存ID
+            start_line: 起始行号（从1开始，包含）
+            end_line: 结束行号（包含），None 表示到最后一行
+        
+        Returns:
+            包含实际行范围、总行数和内容的字典
+        """
+        reader = self._open_line_reader(cache_id)
+        if reader is None:
+            raise ValueError("缓存不存在或已过期")
+        
+        with reader:
+            total_lines = reader.total_lines
+            start_line = max(1, start_line)
+            end_line = total_lines if end_line is None else min(total_lines, end_line)
+            return {
+                "start_line": start_line,
+                "end_line": end_line,
+                "total_lines": total_lines,
+                "content": reader.read(start_line, end_line)
+            }
     
-    def _search_in_text(self, text: str, keyword: str,
-                       case_sensitive: bool, max_results: int) -> Dict[str, Any]:
-        """在文本中搜索关键词"""
-        matches = []
-        search_keyword = keyword if case_sensitive else keyword.lower()
-        lines = text.split('\n')
+    def query_cache(self, cache_id: str, query: JsonPathQuery, max_results: int = 100,
+                    count_only: bool = False) -> Dict[str, Any]:
+        """
+        在缓存结果的序列化字节上求值 JSONPath 查询
         
-        for line_num, line in enumerate(lines, 1):
-            search_line = line if case_sensitive else line.lower()
-            
-            # 查找所有匹配位置
-            pos = 0
-            while True:
-                idx = search_line.find(search_keyword, pos)
-                if idx == -1:
-                    break
-                
-                matches.append({
-                    "line": line_num,
-                    "column": idx,
-                    "content": line.strip()[:200]  # 限制长度
-                })
-                
-                if len(matches) >= max_results:
-                    break
-                
-                pos = idx + 1
-            
-            if len(matches) >= max_results:
-                break
+        未压缩的文件缓存通过 mmap 扫描（压缩的条目先解压到内存），只解析被选中的值，不会把整个结果解析成对象。
+        
+        Raises:
+            ValueError: 缓存不存在或已过期
+            JsonScanError: 缓存内容不是有效的 JSON
+        """
+        resources: List[Any] = []
+        envelope = self._get_from_memory_cache(cache_id)
+        if envelope is not None:
+            data, kind = envelope.data, envelope.kind
+        else:
+            metadata = self._get_file_cache_metadata(cache_id)
+            if metadata is None:
+                raise ValueError("缓存不存在或已过期")
+            kind = metadata.get("kind")
+            if self._should_offload(metadata.get("size", 0)):
+                # 大条目交给计算进程池扫描，由子进程自行打开数据
+                result = self._run_cpu("query", query_blob_task, self._cache_data_location(cache_id, metadata),
+                                       query.path, max(0, max_results), count_only, kind == "json")
+                return {"path": query.path, **result}
+            data = self._open_cache_data(cache_id, metadata, resources)
+            if isinstance(data, ByteRangeView):
+                # 扫描器基于正则，需要连续的缓冲区：压缩或存储在数据库中的条目读入内存中查询
+                data = bytes(data)
         
-        return {
-            "keyword": keyword,
-            "total_matches": len(matches),
-            "matches": matches,
-            "truncated": len(matches) >= max_results
-        }
+        try:
+            # 只有 JSON 类型的结果由 dumps_json_bytes 生成，可以利用缩进快速跳过容器
+            result = query.evaluate(data, max(0, max_results), count_only, indented=(kind == "json"))
+        finally:
+            close_resources(resources)
+        return {"path": query.path, **result}
     
     def get_context_around_line(self, cache_id: str, line_num: int,
                                 context_lines: int = 3) -> Dict[str, Any]:
         """
-        获取指定行及其上下文
+        获取指定行及其上下文（通过行偏移索引只读取所需的行）
         
         Args:
             cache_id: 缓存ID
@@ -1221,25 +4902,19 @@ class MCPManager:
         Returns:
             包含目标行及上下文的内容
         """
-        content = self.get_cached_result(cache_id)
-        if content is None:
+        reader = self._open_line_reader(cache_id)
+        if reader is None:
             raise ValueError("缓存不存在或已过期")
         
-        # 转换为字符串
-        if isinstance(content, str):
-            text = content
-        else:
-            text = json.dumps(content, ensure_ascii=False, indent=2)
-        
-        lines = text.split('\n')
-        total_lines = len(lines)
-        
-        # 计算上下文范围
-        start_line = max(1, line_num - context_lines)
-        end_line = min(total_lines, line_num + context_lines)
-        
-        # 提取上下文内容
-        context_content = '\n'.join(lines[start_line-1:end_line])
+        with reader:
+            total_lines = reader.total_lines
+            
+            # 计算上下文范围
+            start_line = max(1, line_num - context_lines)
+            end_line = min(total_lines, line_num + context_lines)
+            
+            # 提取上下文内容
+            context_content = reader.read(start_line, end_line)
         
         return {
             "target_line": line_num,
@@ -1257,16 +4932,353 @@ class MCPManager:
                 raise ValueError(f"服务器 {server_name} 的配置不存在")
             server_config = self.config_cache["mcpServers"][server_name]
         
-        # 先关闭
-        await self.shutdown_server(server_name)
+        client_data = self.clients.get(server_name)
+        if client_data is not None and client_data["config"] == server_config:
+            standby = self._take_standby(client_data)
+            if standby is not None:
+                # 热备：直接切换到已初始化的备用会话，会话池中的其余成员在后台逐个重启
+                self.tool_memo.invalidate(server_name)
+                self._replace_member(server_name, client_data, client_data["pool"][0], standby)
+                for member in client_data["pool"][1:]:
+                    self._restart_in_background(server_name, member)
+                print(f"[热备] 服务 {server_name} 已切换到备用会话")
+                return
         
-        # 等待一下确保资源释放
-        await asyncio.sleep(0.5)
+        # 先关闭（返回时旧的子进程已退出）
+        await self.shutdown_server(server_name)
         
         # 重新初始化
         await self.init_server(server_name, server_config)
 
 
+SUPERVISOR_ADDRESS_ENV = "MCP_BRIDGE_SUPERVISOR"  # 多进程模式下传给工作进程的监督者 IPC 地址
+SUPERVISOR_AUTHKEY_ENV = "MCP_BRIDGE_SUPERVISOR_KEY"  # 监督者 IPC 连接的认证密钥（十六进制）
+
+
+class WorkerSupervisor:
+    """
+    多进程模式下的监督者（运行在主进程的后台线程中，有独立的事件循环）
+    
+    持有全部 MCP 会话、并发限制与记忆化结果，通过本地 IPC（Unix 套接字或 Windows 命名管道，
+    连接时校验认证密钥）为各 HTTP 工作进程调用工具、提供服务目录、执行重载/重启/关闭。
+    每个请求为 (请求ID, 方法, 参数)，响应为 (请求ID, 是否成功, 结果或异常, 服务目录版本)；
+    服务目录变化时向所有连接推送请求ID 为 None 的消息，结果为新的服务目录。
+    """
+    
+    METHODS = ("invoke_tool", "catalog", "reload", "restart_server", "shutdown_server",
+               "reset_tool_call_history", "get_stats")
+    
+    def __init__(self, manager: MCPManager, config_path: Path):
+        self.manager = manager
+        self.config_path = config_path
+        self.authkey = secrets.token_bytes(32)
+        self.listener = Listener(authkey=self.authkey)
+        self.address = self.listener.address
+        self.version = 0  # 服务目录版本，重载、重启或关闭服务后递增
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.ready = threading.Event()
+        self.startup_error: Optional[BaseException] = None
+        self.background_tasks: List[asyncio.Task] = []
+        self.connections: Dict[Any, threading.Lock] = {}  # 工作进程连接 → 发送锁
+    
+    def start(self):
+        """在后台线程中启动事件循环并初始化全部服务，初始化完成后返回"""
+        self.thread = threading.Thread(target=self._run, name="mcp-supervisor", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.startup_error is not None:
+            raise self.startup_error
+        threading.Thread(target=self._accept_loop, name="mcp-supervisor-accept", daemon=True).start()
+    
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._startup())
+        except BaseException as e:
+            self.startup_error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+    
+    async def _startup(self):
+        print(f"读取配置文件: {self.config_path}")
+        config = await self.manager.load_config(self.config_path)
+        await self.manager.run_io(self.manager.open_storage)
+        await self.manager.init_all_servers(config)
+        
+        # 工作进程启动前清理孤立缓存文件，之后由监督者统一执行后台清理
+        try:
+            await self.manager.run_io(self.manager.cleanup_orphan_cache_files)
+        except Exception as e:
+            print(f"[缓存清理] 清理孤立文件失败: {e}")
+        self.background_tasks = [asyncio.create_task(self.manager.run_health_monitor()),
+                                 asyncio.create_task(self.manager.run_cache_janitor())]
+    
+    def _accept_loop(self):
+        """接受工作进程的连接，每个连接由单独的线程接收请求"""
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                # 监听已关闭
+                return
+            except Exception as e:
+                print(f"[监督者] 拒绝连接: {e}")
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+    
+    def _serve_connection(self, conn: Any):
+        """接收一个工作进程的请求并提交到监督者事件循环中并发执行，响应按完成顺序发回"""
+        self.connections[conn] = threading.Lock()
+        while True:
+            try:
+                request_id, method, args = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = asyncio.run_coroutine_threadsafe(self._dispatch(method, args), self.loop)
+            future.add_done_callback(functools.partial(self._reply, conn, request_id))
+        self.connections.pop(conn, None)
+        conn.close()
+    
+    def _reply(self, conn: Any, request_id: int, future: Any):
+        try:
+            response = (request_id, True, future.result(), self.version)
+        except BaseException as e:
+            response = (request_id, False, e, self.version)
+        # 大结果的序列化与发送放到 I/O 线程中，不占用监督者的事件循环
+        self.manager._get_io_executor().submit(self._send, conn, response)
+    
+    def _send(self, conn: Any, response: Tuple[Any, bool, Any, int]):
+        send_lock = self.connections.get(conn)
+        if send_lock is None:
+            # 工作进程已断开
+            return
+        with send_lock:
+            try:
+                conn.send(response)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                # 结果或异常无法序列化时，以运行时错误返回
+                conn.send((response[0], False, RuntimeError(f"{type(e).__name__}: {e}"), response[3]))
+            except OSError:
+                pass
+    
+    async def _dispatch(self, method: str, args: Tuple[Any, ...]) -> Any:
+        manager = self.manager
+        if method not in self.METHODS:
+            raise ValueError(f"未知的监督者方法: {method}")
+        if method == "invoke_tool":
+            return await manager.invoke_tool(*args)
+        if method == "catalog":
+            return self.catalog()
+        if method == "get_stats":
+            return manager.get_stats()
+        if method == "reset_tool_call_history":
+            manager.reset_tool_call_history()
+            return None
+        
+        result = None
+        if method == "reload":
+            config = args[0] if args else None
+            if config is None:
+                config = await manager.run_io(manager._read_config_file, self.config_path)
+            result = await manager.reload_config(config)
+        elif method == "restart_server":
+            await manager.restart_server(*args)
+        else:
+            await manager.shutdown_server(*args)
+        self.version += 1
+        catalog = self.catalog()
+        # 通知所有工作进程更新服务目录
+        for conn in list(self.connections):
+            self.manager._get_io_executor().submit(self._send, conn, (None, True, catalog, self.version))
+        # 重载返回重载摘要，其余操作返回新的服务目录
+        return catalog if result is None else result
+    
+    def catalog(self) -> Dict[str, Any]:
+        """服务目录：各服务的配置与工具定义，以及当前配置（工作进程据此路由与列出工具）"""
+        return {
+            "version": self.version,
+            "config": self.manager.config_cache,
+            "servers": [
+                {"name": name, "config": client_data["config"], "tools": client_data["tools"]}
+                for name, client_data in self.manager.clients.items()
+            ]
+        }
+    
+    def stop(self):
+        """停止接受连接，关闭全部服务与缓存存储，然后结束事件循环"""
+        self.listener.close()
+        if self.loop is None or not self.loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+    
+    async def _shutdown(self):
+        for task in self.background_tasks:
+            task.cancel()
+        print("\n正在关闭服务...")
+        await self.manager.shutdown()
+        self.manager.close_storage()
+        print("服务器已关闭")
+
+
+class SupervisorClient:
+    """工作进程到监督者的 IPC 客户端：单个连接上可以并发多个请求，后台线程接收响应并按请求 ID 分发"""
+    
+    def __init__(self, address: str, authkey: bytes):
+        self.conn = Client(address, authkey=authkey)
+        self.loop = asyncio.get_running_loop()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.request_ids = itertools.count()
+        self.send_lock = threading.Lock()
+        self.on_catalog: Optional[Callable[[Dict[str, Any]], None]] = None  # 收到监督者推送的服务目录时调用
+        threading.Thread(target=self._receive_loop, name="mcp-supervisor-client", daemon=True).start()
+    
+    async def call(self, method: str, *args: Any) -> Tuple[Any, int]:
+        """调用监督者的方法，返回 (结果, 服务目录版本)；监督者上抛出的异常在这里重新抛出"""
+        request_id = next(self.request_ids)
+        future = self.loop.create_future()
+        self.pending[request_id] = future
+        try:
+            with self.send_lock:
+                self.conn.send((request_id, method, args))
+        except OSError as e:
+            self.pending.pop(request_id, None)
+            raise ConnectionError(f"与监督者的连接已断开: {e}")
+        
+        ok, value, version = await future
+        if not ok:
+            raise value
+        return value, version
+    
+    def _receive_loop(self):
+        while True:
+            try:
+                request_id, ok, value, version = self.conn.recv()
+            except (EOFError, OSError):
+                self.loop.call_soon_threadsafe(self._fail_pending)
+                return
+            self.loop.call_soon_threadsafe(self._resolve, request_id, (ok, value, version))
+    
+    def _resolve(self, request_id: Optional[int], response: Tuple[bool, Any, int]):
+        if request_id is None:
+            if self.on_catalog is not None:
+                self.on_catalog(response[1])
+            return
+        future = self.pending.pop(request_id, None)
+        # 调用方已取消（如客户端断开）时丢弃响应
+        if future is not None and not future.done():
+            future.set_result(response)
+    
+    def _fail_pending(self):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("与监督者的连接已断开"))
+        self.pending.clear()
+    
+    def close(self):
+        self.conn.close()
+
+
+class WorkerManager(MCPManager):
+    """
+    多进程模式下 HTTP 工作进程中的管理器
+    
+    工具调用、服务重载/重启/关闭与调用历史都转发给监督者；本地只保留服务目录的副本（用于列出工具与解析工具名）。
+    结果不使用进程内的内存缓存，全部写入各进程共享的文件缓存（或 SQLite）后端，任一工作进程都能读取。
+    """
+    
+    def __init__(self, supervisor: SupervisorClient):
+        super().__init__()
+        self.supervisor = supervisor
+        self.supervisor.on_catalog = self._apply_catalog
+        self.catalog_version = -1
+    
+    def apply_settings(self, config: Dict[str, Any]):
+        super().apply_settings(config)
+        # 内存缓存不在进程间共享，缓存结果一律写入文件缓存
+        with self.memory_cache.lock:
+            self.memory_cache.max_bytes = 0
+    
+    def _apply_catalog(self, catalog: Dict[str, Any]):
+        """用监督者的服务目录替换本地副本（忽略比当前更旧的目录）"""
+        if catalog["version"] < self.catalog_version:
+            return
+        for server_name in list(self.clients):
+            self._unregister_server_tools(server_name)
+        self.clients = {}
+        for server in catalog["servers"]:
+            self.clients[server["name"]] = {"config": server["config"], "tools": server["tools"],
+                                            "session": None, "pool": []}
+            self._register_server_tools(server["name"])
+        
+        if catalog["config"] != self.config_cache:
+            # 其他工作进程更新了配置
+            self.config_cache = catalog["config"]
+            self.apply_settings(self.config_cache)
+        self.catalog_version = catalog["version"]
+    
+    async def sync_catalog(self):
+        """从监督者同步服务目录"""
+        catalog, _ = await self.supervisor.call("catalog")
+        self._apply_catalog(catalog)
+    
+    async def _call_supervisor(self, method: str, *args: Any) -> Any:
+        """调用监督者；服务目录版本变化（其他工作进程重载或重启了服务）时顺带同步"""
+        result, version = await self.supervisor.call(method, *args)
+        if version != self.catalog_version:
+            await self.sync_catalog()
+        return result
+    
+    async def init_all_servers(self, config: Dict[str, Any]):
+        """由监督者按新配置重载服务"""
+        await self.reload_config(config)
+    
+    async def reload_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """由监督者增量重载服务，返回重载摘要"""
+        self.config_cache = config
+        self.apply_settings(config)
+        return await self._call_supervisor("reload", config)
+    
+    async def shutdown(self):
+        """会话由监督者持有，工作进程无需关闭"""
+    
+    async def shutdown_server(self, server_name: str):
+        catalog, _ = await self.supervisor.call("shutdown_server", server_name)
+        self._apply_catalog(catalog)
+    
+    async def restart_server(self, server_name: str, server_config: Optional[Dict[str, Any]] = None):
+        catalog, _ = await self.supervisor.call("restart_server", server_name, server_config)
+        self._apply_catalog(catalog)
+    
+    async def invoke_tool(self, tool_name: str, args: Dict[str, Any], server_name: Optional[str] = None,
+                          timeout: Optional[float] = None) -> Dict[str, Any]:
+        """由监督者调用工具（并发限制、会话池与记忆化都在监督者中）"""
+        return await self._call_supervisor("invoke_tool", tool_name, args, server_name, timeout)
+    
+    async def reset_history(self):
+        await self._call_supervisor("reset_tool_call_history")
+    
+    async def collect_stats(self) -> Dict[str, Any]:
+        """合并本进程的缓存统计与监督者的服务、记忆化统计"""
+        stats = self.get_stats()
+        remote = await self._call_supervisor("get_stats")
+        stats["servers"] = remote["servers"]
+        stats["tool_memo"] = remote["tool_memo"]
+        stats["cache_janitor"] = remote["cache_janitor"]
+        stats["worker"] = {"pid": os.getpid()}
+        return stats
+    
+    def close_storage(self):
+        super().close_storage()
+        self.supervisor.close()
+
+
 # 全局管理器实例
 manager: Optional[MCPManager] = None
 config_path: Optional[Path] = None
@@ -1280,45 +5292,80 @@ def log(message: str, log_type: str = "info", *args):
     print(f"{color}[{timestamp}] {message}{reset}", *args)
 
 
+def resolve_config_path() -> Path:
+    """获取配置文件路径（优先使用 MCP_CONFIG_PATH 环境变量）"""
+    env_config_path = os.environ.get("MCP_CONFIG_PATH", "")
+    if env_config_path:
+        return Path(env_config_path)
+    return get_config_path()
+
+
+def print_startup_banner(service_count: int, workers: int = 1):
+    """打印启动信息与可用接口"""
+    mode = f"（多进程模式，{workers} 个工作进程）" if workers > 1 else ""
+    print(f"\n🚀 MCP 桥接服务已启动{mode}")
+    print(f"   地址: http://localhost:{PORT}")
+    print(f"   已加载服务数量: {service_count}")
+    print(f"\n可用接口:")
+    print(f"   GET  /health                     - 健康检查")
+    print(f"   GET  /tools                      - 获取所有[服务]的列表和描述")
+    print(f"   GET  /tools?serverName=<name>    - 获取指定服务下的[工具]列表")
+    print(f"   GET  /tool-detail?toolName=<n>   - 获取工具的详细参数定义")
+    print(f"   POST /execute                    - 执行工具（可选 serverName 参数）")
+    print(f"   POST /execute/batch              - 批量并发执行多个工具")
+    print(f"   POST /result                     - 获取缓存结果（分段）")
+    print(f"   GET  /result/{'{cache_id}'}            - 获取缓存结果（分段，简单接口）")
+    print(f"   POST /search-cache               - 在缓存中搜索关键词")
+    print(f"   POST /query-cache                - 按 JSONPath 查询缓存的 JSON 内容")
+    print(f"   POST /get-cache-context          - 获取缓存指定行的上下文")
+    print(f"   POST /get-cache-lines            - 按行范围读取缓存内容")
+    print(f"   GET  /config                     - 读取配置文件内容")
+    print(f"   POST /config                     - 更新配置文件并重载")
+    print(f"   POST /reload                     - 手动重载所有服务")
+    print(f"   POST /restart-server             - 重启指定服务")
+    print(f"   POST /shutdown-server            - 关闭指定服务")
+    print(f"   GET  /stats                      - 获取运行统计信息")
+    print(f"   POST /reset-history              - 重置调用历史\n")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     global manager, config_path
     
     # 启动时初始化
+    background_tasks = []
     try:
-        manager = MCPManager()
-        
         # 获取配置路径
-        env_config_path = os.environ.get("MCP_CONFIG_PATH", "")
-        if env_config_path:
-            config_path = Path(env_config_path)
+        config_path = resolve_config_path()
+        
+        supervisor_address = os.environ.get(SUPERVISOR_ADDRESS_ENV)
+        if supervisor_address:
+            # 多进程模式的工作进程：MCP 会话由监督者持有，这里只同步服务目录
+            client = SupervisorClient(supervisor_address, bytes.fromhex(os.environ[SUPERVISOR_AUTHKEY_ENV]))
+            manager = WorkerManager(client)
+            await manager.load_config(config_path)
+            await manager.run_io(manager.open_storage)
+            await manager.sync_catalog()
+            print(f"✓ 工作进程 {os.getpid()} 已就绪，已加载服务数量: {len(manager.get_services())}")
         else:
-            config_path = get_config_path()
-        
-        print(f"读取配置文件: {config_path}")
-        config = await manager.load_config(config_path)
-        await manager.init_all_servers(config)
-        
-        print(f"\n🚀 MCP 桥接服务已启动")
-        print(f"   地址: http://localhost:{PORT}")
-        print(f"   已加载服务数量: {len(manager.get_services())}")
-        print(f"\n可用接口:")
-        print(f"   GET  /health                     - 健康检查")
-        print(f"   GET  /tools                      - 获取所有[服务]的列表和描述")
-        print(f"   GET  /tools?serverName=<name>    - 获取指定服务下的[工具]列表")
-        print(f"   GET  /tool-detail?toolName=<n>   - 获取工具的详细参数定义")
-        print(f"   POST /execute                    - 执行工具（可选 serverName 参数）")
-        print(f"   POST /result                     - 获取缓存结果（分段）")
-        print(f"   GET  /result/{'{cache_id}'}            - 获取缓存结果（分段，简单接口）")
-        print(f"   POST /search-cache               - 在缓存中搜索关键词")
-        print(f"   POST /get-cache-context          - 获取缓存指定行的上下文")
-        print(f"   GET  /config                     - 读取配置文件内容")
-        print(f"   POST /config                     - 更新配置文件并重载")
-        print(f"   POST /reload                     - 手动重载所有服务")
-        print(f"   POST /restart-server             - 重启指定服务")
-        print(f"   POST /shutdown-server            - 关闭指定服务")
-        print(f"   POST /reset-history              - 重置调用历史\n")
+            manager = MCPManager()
+            print(f"读取配置文件: {config_path}")
+            config = await manager.load_config(config_path)
+            await manager.run_io(manager.open_storage)
+            await manager.init_all_servers(config)
+            
+            # 清理上次运行遗留的孤立缓存文件
+            try:
+                await manager.run_io(manager.cleanup_orphan_cache_files)
+            except Exception as e:
+                print(f"[缓存清理] 清理孤立文件失败: {e}")
+            
+            # 启动后台健康检查与缓存清理
+            background_tasks.append(asyncio.create_task(manager.run_health_monitor()))
+            background_tasks.append(asyncio.create_task(manager.run_cache_janitor()))
+            
+            print_startup_banner(len(manager.get_services()))
     
     except Exception as e:
         print(f"启动失败: {e}")
@@ -1328,10 +5375,14 @@ async def lifespan(app: FastAPI):
     
     yield
     
+    for task in background_tasks:
+        task.cancel()
+    
     # 关闭时清理
     if manager:
         print("\n正在关闭服务...")
         await manager.shutdown()
+        manager.close_storage()
         print("服务器已关闭")
 
 
@@ -1365,7 +5416,7 @@ async def get_tools(serverName: Optional[str] = Query(None)):
         else:
             # 获取所有服务列表
             services = manager.get_services()
-            return {"success": True, "services": services}
+            return {"success": True, "services": services, "ambiguous_tools": manager.get_ambiguous_tools()}
     
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -1397,8 +5448,124 @@ async def get_tool_detail(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def format_execute_result(result: Any) -> Dict[str, Any]:
+    """将 execute_tool 的返回值转换为 /execute 响应体"""
+    # 检查结果类型
+    if isinstance(result, dict) and result.get("result_type") == "cached_reference":
+        # 返回缓存引用
+        return {
+            "success": True,
+            "result_type": result["result_type"],
+            "cache_id": result["cache_id"],
+            "cache_type": result["cache_type"],
+            "total_size": result["total_size"],
+            "message": result["message"],
+            "queue_wait_ms": result.get("queue_wait_ms", 0.0),
+            "cache_hit": result.get("cache_hit", False)
+        }
+    else:
+        # 返回直接结果
+        content = result.get("result") if isinstance(result, dict) and "result" in result else result
+        return {
+            "success": True,
+            "result": content,
+            "queue_wait_ms": result.get("queue_wait_ms", 0.0),
+            "cache_hit": result.get("cache_hit", False)
+        }
+
+
+def format_execute_error(e: Exception) -> Tuple[int, Dict[str, Any]]:
+    """将工具执行异常转换为 (HTTP 状态码, 错误详情)"""
+    if isinstance(e, ServerBusyError):
+        return 429, {"error": str(e), "type": type(e).__name__, "serverName": e.server_name}
+    if isinstance(e, ToolTimeoutError):
+        return 504, {"error": str(e), "type": type(e).__name__, "serverName": e.server_name, "timeout": e.timeout}
+    
+    import traceback
+    return 500, {
+        "error": str(e),
+        "type": type(e).__name__,
+        "traceback": "".join(traceback.format_exception(type(e), e, e.__traceback__))
+    }
+
+
+STREAM_CHUNK_SIZE = 65536  # 流式响应中单个文本块的最大字符数
+
+
+def encode_stream_event(event: Dict[str, Any], stream_format: str = "ndjson") -> str:
+    """将事件编码为 NDJSON 行或 SSE 消息"""
+    data = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event.get('event', 'message')}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def stream_media_type(stream_format: str) -> str:
+    """流式响应的 Content-Type"""
+    return "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+
+
+def iter_tool_result_events(invocation: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    将工具调用结果拆分为流式事件
+    
+    事件依次为 start、content（每个内容项一条，超长文本拆为多条 content_chunk）、
+    structured（如有 structuredContent，超长时拆为多条 structured_chunk，内容为 JSON 文本片段）和 end
+    """
+    result = invocation["result"]
+    yield {
+        "event": "start",
+        "serverName": invocation["server"],
+        "queue_wait_ms": round(invocation["queue_wait"] * 1000, 3),
+        "cache_hit": invocation.get("cache_hit", False)
+    }
+    
+    if not isinstance(result, dict) or not isinstance(result.get("content"), list):
+        # 非 CallToolResult 结构，整体作为一个内容项输出
+        yield {"event": "content", "index": 0, "item": result}
+        yield {"event": "end"}
+        return
+    
+    for index, item in enumerate(result["content"]):
+        text = item.get("text") if isinstance(item, dict) else None
+        if isinstance(text, str) and len(text) > STREAM_CHUNK_SIZE:
+            # 超长文本分块输出，避免单条消息过大
+            header = {k: v for k, v in item.items() if k != "text"}
+            for offset in range(0, len(text), STREAM_CHUNK_SIZE):
+                yield {
+                    "event": "content_chunk",
+                    "index": index,
+                    "offset": offset,
+                    "text": text[offset:offset + STREAM_CHUNK_SIZE],
+                    "item": header if offset == 0 else None,
+                    "final": offset + STREAM_CHUNK_SIZE >= len(text)
+                }
+        else:
+            yield {"event": "content", "index": index, "item": item}
+    
+    structured = result.get("structuredContent")
+    if structured is not None:
+        structured_json = json.dumps(structured, ensure_ascii=False)
+        if len(structured_json) > STREAM_CHUNK_SIZE:
+            for offset in range(0, len(structured_json), STREAM_CHUNK_SIZE):
+                yield {
+                    "event": "structured_chunk",
+                    "offset": offset,
+                    "json": structured_json[offset:offset + STREAM_CHUNK_SIZE],
+                    "final": offset + STREAM_CHUNK_SIZE >= len(structured_json)
+                }
+        else:
+            yield {"event": "structured", "structuredContent": structured}
+    
+    yield {"event": "end", "isError": result.get("isError", False), "meta": result.get("meta")}
+
+
 @app.post("/execute")
-async def execute_tool(request: ExecuteRequest):
+async def execute_tool(
+    request: ExecuteRequest,
+    stream: bool = Query(False, description="是否流式返回结果（不经过缓存）"),
+    format: str = Query("ndjson", description="流式格式：ndjson 或 sse")
+):
     """
     执行工具
     
@@ -1407,6 +5574,10 @@ async def execute_tool(request: ExecuteRequest):
         - arguments: 工具参数（可选，默认为空对象）
         - serverName: 服务名称（可选，指定从哪个服务调用工具）
     
+    查询参数:
+        - stream: 为 true 时以 NDJSON/SSE 分块返回结果的各个内容项，不写入缓存
+        - format: 流式格式，ndjson（默认）或 sse
+    
     示例:
         不指定服务（兼容旧版本）:
         {"name": "read_file", "arguments": {"path": "/tmp/test.txt"}}
@@ -1415,46 +5586,104 @@ async def execute_tool(request: ExecuteRequest):
         {"name": "read_file", "arguments": {"path": "/tmp/test.txt"}, "serverName": "filesystem"}
     """
     try:
+        if stream:
+            invocation = await manager.invoke_tool(
+                request.name,
+                request.arguments,
+                request.serverName,
+                request.timeout
+            )
+            return StreamingResponse(
+                (encode_stream_event(event, format) for event in iter_tool_result_events(invocation)),
+                media_type=stream_media_type(format)
+            )
+        
         result = await manager.execute_tool(
             request.name, 
             request.arguments,
-            request.serverName  # 传递可选的服务名称
+            request.serverName,  # 传递可选的服务名称
+            request.timeout
         )
-        
-        # 检查结果类型
-        if isinstance(result, dict) and result.get("result_type") == "cached_reference":
-            # 返回缓存引用
-            return {
-                "success": True,
-                "result_type": result["result_type"],
-                "cache_id": result["cache_id"],
-                "cache_type": result["cache_type"],
-                "total_size": result["total_size"],
-                "message": result["message"]
-            }
-        else:
-            # 返回直接结果
-            content = result.get("result") if isinstance(result, dict) and "result" in result else result
-            return {"success": True, "result": content}
+        return format_execute_result(result)
     
     except Exception as e:
-        import traceback
-        error_traceback = traceback.format_exc()
-        error_detail = {
-            "error": str(e),
-            "type": type(e).__name__,
-            "traceback": error_traceback
+        status_code, error_detail = format_execute_error(e)
+        if status_code == 429:
+            log(f"服务繁忙，拒绝调用: {e}", "error")
+            raise HTTPException(status_code=status_code, detail=error_detail, headers={"Retry-After": "1"})
+        if status_code == 504:
+            log(f"工具执行超时: {e}", "error")
+        else:
+            log(f"工具执行错误: {error_detail}", "error")
+        raise HTTPException(status_code=status_code, detail=error_detail)
+
+
+async def _execute_batch_item(index: int, call: ExecuteRequest) -> Dict[str, Any]:
+    """执行批量请求中的单个调用，异常转换为该项的错误结果"""
+    start_time = time.perf_counter()
+    try:
+        result = await manager.execute_tool(call.name, call.arguments, call.serverName, call.timeout)
+        item = format_execute_result(result)
+        item["status"] = 200
+    except Exception as e:
+        status_code, error_detail = format_execute_error(e)
+        log(f"批量调用第 {index} 项失败: {error_detail['error']}", "error")
+        item = {"success": False, "status": status_code, "error": error_detail}
+    
+    item["index"] = index
+    item["name"] = call.name
+    item["serverName"] = call.serverName
+    item["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+    return item
+
+
+@app.post("/execute/batch")
+async def execute_tool_batch(request: BatchExecuteRequest):
+    """
+    批量执行工具（一次 HTTP 请求并发执行多个调用）
+    
+    请求体:
+        - calls: 调用列表，每项与 /execute 请求体相同（name、arguments、serverName、timeout）
+        - stream: 是否以 NDJSON 流式返回，每完成一项立即输出一行（可选，默认false）
+    
+    返回:
+        按请求顺序排列的结果列表，每项包含 index、success、status、elapsed_ms 及结果或错误信息；
+        各服务的并发上限与排队规则同样适用于批量调用
+    """
+    if not request.stream:
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *[_execute_batch_item(i, call) for i, call in enumerate(request.calls)]
+        )
+        return {
+            "success": True,
+            "results": results,
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 3)
         }
-        log(f"工具执行错误: {error_detail}", "error")
-        raise HTTPException(status_code=500, detail=error_detail)
+    
+    async def stream_results():
+        # 按完成顺序逐项输出，客户端通过 index 对应到请求
+        tasks = [asyncio.ensure_future(_execute_batch_item(i, call)) for i, call in enumerate(request.calls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 
 @app.get("/config")
 async def get_config():
     """读取配置文件"""
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        def read_config():
+            with open(config_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        
+        config = await manager.run_io(read_config)
         return {"success": True, "config": config}
     
     except Exception as e:
@@ -1466,14 +5695,12 @@ async def update_config(request: ConfigUpdateRequest):
     """更新配置文件并重载"""
     try:
         # 保存配置
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(request.config, f, indent=2, ensure_ascii=False)
+        await manager.run_io(manager._write_config_file, config_path, request.config)
         
-        # 重载服务
-        await manager.shutdown()
-        await manager.init_all_servers(request.config)
+        # 增量重载服务（只重启配置变化的服务）
+        summary = await manager.reload_config(request.config)
         
-        return {"success": True, "message": "配置已保存并重载"}
+        return {"success": True, "message": "配置已保存并重载", "reload": summary}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1483,20 +5710,26 @@ async def update_config(request: ConfigUpdateRequest):
 async def reload_config():
     """重载配置"""
     try:
-        await manager.shutdown()
-        config = await manager.load_config(config_path)
-        await manager.init_all_servers(config)
+        # 配置文件读取失败时直接报错，不按空配置关闭全部服务
+        config = await manager.run_io(manager._read_config_file, config_path)
+        summary = await manager.reload_config(config)
         
-        return {"success": True, "message": "配置已重载"}
+        return {"success": True, "message": "配置已重载", "reload": summary}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/stats")
+async def get_stats():
+    """获取运行统计信息（并发、排队等）"""
+    return {"success": True, "stats": await manager.collect_stats()}
+
+
 @app.post("/reset-history")
 async def reset_history():
     """重置调用历史"""
-    manager.reset_tool_call_history()
+    await manager.reset_history()
     return {"success": True, "message": "调用历史已重置"}
 
 
@@ -1555,7 +5788,7 @@ async def shutdown_server(request: ServerRestartRequest):
 async def get_cached_result(request: GetResultRequest):
     """获取缓存的结果"""
     try:
-        result = manager.get_cached_result_partial(request.cache_id, request.start, request.end)
+        result = await manager.run_io(manager.get_cached_result_partial, request.cache_id, request.start, request.end)
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         
@@ -1569,18 +5802,97 @@ async def get_cached_result(request: GetResultRequest):
                 "has_more": result["has_more"]
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围的 Range 请求头，返回 [start, end) 范围
+    
+    不支持的格式（如多个范围）返回 None，按普通请求处理；范围无法满足时抛出 ValueError
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    
+    first, last = match.group(1), match.group(2)
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+        if last and int(last) < start:
+            return None
+    else:
+        # bytes=-N 表示最后 N 个字节
+        start = max(0, size - int(last))
+        end = size
+    if start >= size or start >= end:
+        raise ValueError("请求的范围无法满足")
+    return start, end
+
+
 @app.get("/result/{cache_id}")
-async def get_cached_result_simple(cache_id: str, start: int = 0, end: Optional[int] = None):
-    """获取缓存结果的简单接口"""
+async def get_cached_result_simple(cache_id: str, response: Response, start: int = 0, end: Optional[int] = None,
+                                   stream: bool = False, format: str = "ndjson",
+                                   if_none_match: Optional[str] = Header(None),
+                                   range_header: Optional[str] = Header(None, alias="Range")):
+    """
+    获取缓存结果的简单接口
+    
+    stream 为 true 时按块流式返回 [start, end) 范围内的文本（NDJSON 或 SSE），
+    文件缓存逐块读取，不会把整个结果载入内存。
+    
+    响应带有 ETag（内容哈希），If-None-Match 匹配时返回 304；
+    带 Range: bytes=a-b 请求头时返回 206 与序列化字节的对应范围。
+    """
+    info = await manager.run_io(manager.get_cache_info, cache_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="缓存ID不存在或已过期")
+    
+    etag = info["etag"]
+    headers = {"Accept-Ranges": "bytes"}
+    if etag:
+        headers["ETag"] = etag
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+    
+    if range_header and not stream:
+        try:
+            byte_range = parse_byte_range(range_header, info["size"])
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info['size']}"})
+        
+        if byte_range is not None:
+            content = await manager.run_io(manager.read_cached_bytes, cache_id, *byte_range)
+            if content is None:
+                raise HTTPException(status_code=404, detail="缓存ID不存在或已过期")
+            headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1] - 1}/{info['size']}"
+            media_type = "application/json" if info["kind"] == "json" else "text/plain; charset=utf-8"
+            return Response(content=content, status_code=206, media_type=media_type, headers=headers)
+    
+    if stream:
+        chunks = await manager.run_io(manager.open_cached_result_stream, cache_id, start, end, STREAM_CHUNK_SIZE)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail="缓存ID不存在或已过期")
+        
+        def stream_chunks():
+            yield encode_stream_event({"event": "start", "cache_id": cache_id, "start": max(0, start)}, format)
+            position = max(0, start)
+            for offset, text in chunks:
+                position = offset + len(text)
+                yield encode_stream_event({"event": "chunk", "offset": offset, "content": text}, format)
+            yield encode_stream_event({"event": "end", "end": position}, format)
+        
+        return StreamingResponse(stream_chunks(), media_type=stream_media_type(format), headers=headers)
+    
     try:
-        result = manager.get_cached_result_partial(cache_id, start, end)
+        result = await manager.run_io(manager.get_cached_result_partial, cache_id, start, end)
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         
+        response.headers.update(headers)
         return {
             "success": True,
             "result": result["content"],
@@ -1591,6 +5903,8 @@ async def get_cached_result_simple(cache_id: str, start: int = 0, end: Optional[
                 "has_more": result["has_more"]
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1603,20 +5917,72 @@ async def search_cache(request: SearchCacheRequest):
     请求体:
         - cache_id: 缓存ID
         - keyword: 搜索关键词
+        - keywords: 多个关键词（可选，与 keyword 一起匹配）
+        - regex: 关键词是否为正则表达式（可选，默认false）
+        - whole_word: 是否只匹配完整单词（可选，默认false）
         - case_sensitive: 是否区分大小写（可选，默认false）
         - max_results: 最大返回结果数（可选，默认50）
+        - context_lines: 每个匹配附带的上下文行数（可选，默认0）
     
     返回:
-        搜索结果，包含匹配的行号、列号和内容片段
+        搜索结果，包含精确的总匹配数、各关键词匹配数，以及匹配的行号、列号和内容片段
     """
+    # 先校验搜索模式，区分参数错误（400）与缓存不存在（404）
+    try:
+        SearchMatcher(([request.keyword] if request.keyword else []) + request.keywords,
+                      request.regex, request.whole_word, request.case_sensitive)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"正则表达式无效: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        result = manager.search_in_cache(
+        result = await manager.run_io(lambda: manager.search_in_cache(
             request.cache_id,
             request.keyword,
             request.case_sensitive,
-            request.max_results
-        )
+            request.max_results,
+            keywords=request.keywords,
+            regex=request.regex,
+            whole_word=request.whole_word,
+            context_lines=request.context_lines
+        ))
+        return {"success": True, "result": result}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/query-cache")
+async def query_cache(request: QueryCacheRequest):
+    """
+    按 JSONPath 查询缓存的 JSON 内容，只返回被选中的字段
+    
+    请求体:
+        - cache_id: 缓存ID
+        - path: JSONPath 查询路径（字段、通配、下标、切片、递归下降与过滤条件）
+        - max_results: 最多返回的匹配值数（可选，默认100）
+        - count_only: 只统计匹配数（可选，默认false）
+    
+    返回:
+        精确的总匹配数，以及各匹配值的规范化路径与值
+    """
+    # 先校验查询路径，区分参数错误（400）与缓存不存在（404）
+    try:
+        query = JsonPathQuery(request.path)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"正则表达式无效: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        result = await manager.run_io(manager.query_cache, request.cache_id, query, request.max_results, request.count_only)
         return {"success": True, "result": result}
+    except JsonScanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -1639,7 +6005,8 @@ async def get_cache_context(request: GetCacheContextRequest):
         目标行及其上下文内容
     """
     try:
-        result = manager.get_context_around_line(
+        result = await manager.run_io(
+            manager.get_context_around_line,
             request.cache_id,
             request.line_num,
             request.context_lines
@@ -1653,13 +6020,66 @@ async def get_cache_context(request: GetCacheContextRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/get-cache-lines")
+async def get_cache_lines(request: GetCacheLinesRequest):
+    """
+    按行范围读取缓存内容（基于行偏移索引，只读取请求的行）
+    
+    请求体:
+        - cache_id: 缓存ID
+        - start_line: 起始行号（从1开始，可选，默认1）
+        - end_line: 结束行号（包含，可选，默认到最后一行）
+    
+    返回:
+        指定行范围的内容及总行数
+    """
+    try:
+        result = await manager.run_io(
+            manager.get_cache_lines,
+            request.cache_id,
+            request.start_line,
+            request.end_line
+        )
+        return {"success": True, "result": result}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 def signal_handler(sig, frame):
     """处理终止信号"""
     print("\n接收到终止信号，正在关闭...")
     sys.exit(0)
 
 
+def run_multi_worker(workers: int):
+    """
+    多进程模式：主进程的后台线程运行监督者（持有全部 MCP 会话），uvicorn 启动 workers 个 HTTP 工作进程，
+    工作进程通过环境变量中的 IPC 地址与密钥连接监督者，结果缓存写入各进程共享的缓存目录
+    """
+    global manager, config_path
+    config_path = resolve_config_path()
+    manager = MCPManager()
+    supervisor = WorkerSupervisor(manager, config_path)
+    supervisor.start()
+    
+    os.environ[SUPERVISOR_ADDRESS_ENV] = supervisor.address
+    os.environ[SUPERVISOR_AUTHKEY_ENV] = supervisor.authkey.hex()
+    print_startup_banner(len(manager.get_services()), workers)
+    try:
+        # 多个工作进程需要以导入字符串的方式加载应用
+        uvicorn.run(f"{Path(__file__).stem}:app", host="0.0.0.0", port=PORT, workers=workers, log_level="info")
+    finally:
+        supervisor.stop()
+
+
 if __name__ == "__main__":
+    # 打包为可执行文件后，计算进程池的子进程需要由此进入
+    multiprocessing.freeze_support()
+    
     import argparse
     
     # 解析命令行参数
@@ -1688,8 +6108,19 @@ if __name__ == "__main__":
         type=str,
         help='配置文件路径'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='HTTP 工作进程数，大于 1 时由主进程持有 MCP 会话并通过本地 IPC 为各工作进程调用工具 (默认: 1)'
+    )
     args = parser.parse_args()
     
+    if args.workers > 1 and getattr(sys, "frozen", False):
+        # 打包后的可执行文件无法按模块名导入应用
+        print("⚠️ 可执行文件暂不支持多进程模式，以单进程运行")
+        args.workers = 1
+    
     # 更新端口
     PORT = args.port
     
@@ -1707,18 +6138,22 @@ if __name__ == "__main__":
     
     print(f"✓ 端口 {PORT} 可用\n")
     
-    # 注册信号处理
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     # 启动服务器
     try:
-        uvicorn.run(
-            app,
-            host="0.0.0.0",
-            port=PORT,
-            log_level="info"
-        )
+        if args.workers > 1:
+            # 信号由 uvicorn 的多进程管理器处理，退出后再关闭监督者
+            run_multi_worker(args.workers)
+        else:
+            # 注册信号处理
+            signal.signal(signal.SIGINT, signal_handler)
+            signal.signal(signal.SIGTERM, signal_handler)
+            
+            uvicorn.run(
+                app,
+                host="0.0.0.0",
+                port=PORT,
+                log_level="info"
+            )
     except OSError as e:
         if "address already in use" in str(e).lower():
             print(f"\n✗ 错误: 端口 {PORT} 已被占用")